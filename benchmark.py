@@ -0,0 +1,410 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Benchmarks for zen.script's core editor operations.
+#
+# Every measurement runs in a fresh Python process that drives a real
+# ZenScriptEditor, so peak RSS is per benchmark and one run can't warm
+# caches for the next. On Linux without a display, an Xvfb server is
+# started for the duration of the suite.
+#
+#   python benchmark.py                            # run everything, write benchmark_results.json
+#   python benchmark.py --sizes 1,100 --repeat 5   # skip the 1 GB file
+#   python benchmark.py --baseline old.json        # run, then flag regressions against old.json
+#   python benchmark.py --results new.json --baseline old.json   # compare only
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(tempfile.gettempdir(), "zen_script_bench")
+DEFAULT_SIZES_MB = (1, 100, 1024)
+EDIT_DOC_MB = 10         # Size of the in-memory document the editing benchmarks work on
+THEME_SWITCHES = 20
+TYPED_CHARS = 5000
+OPEN_TABS = 8            # Tabs of EDIT_DOC_MB each that tab_switch cycles through
+SEED = 20240601          # Synthetic files are identical on every machine and run
+DEFAULT_THRESHOLD = 10   # Percent slower (or bigger) than the baseline that counts as a regression
+BENCH_TIMEOUT = 900      # Seconds before a single benchmark run is abandoned
+METRICS = {}             # Extra measurements a benchmark reports next to its wall time
+
+WORDS = ("def", "return", "self", "value", "index", "for", "in", "if", "else", "buffer",
+         "line", "offset", "import", "class", "None", "True", "text", "count", "=", "+",
+         "(", ")", ":", "#", "\"zen\"", "0", "42", "3.14")
+
+
+def synthetic_block(rng, size):
+    """About size bytes of code-like ASCII lines of varying length"""
+    lines, total = [], 0
+    while total < size:
+        indent = "    " * rng.randrange(4)
+        line = indent + " ".join(rng.choice(WORDS) for _ in range(rng.randrange(1, 24)))
+        lines.append(line)
+        total += len(line) + 1
+    return "\n".join(lines) + "\n"
+
+
+def synthetic_file(size_mb):
+    """Path of a deterministic size_mb MiB text file, generated on first use"""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    path = os.path.join(DATA_DIR, f"synthetic_{size_mb}mb.txt")
+    size = size_mb * 1024 * 1024
+    if os.path.exists(path) and os.path.getsize(path) == size:
+        return path
+    print(f"Generating {path}...")
+    rng = random.Random(SEED)
+    blocks = [synthetic_block(rng, 1024 * 1024).encode("ascii") for _ in range(8)]
+    with open(path + ".tmp", "wb") as f:
+        written = 0
+        while written < size:
+            data = blocks[rng.randrange(len(blocks))][:size - written]
+            f.write(data)
+            written += len(data)
+    os.replace(path + ".tmp", path)
+    return path
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None  # Windows
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak / (1024 * 1024) if platform.system() == "Darwin" else peak / 1024
+
+
+# --- Child side: one benchmark in this process --------------------------------
+
+def pump(root, done, timeout=BENCH_TIMEOUT):
+    """Run the Tk event loop until done() is true"""
+    deadline = time.perf_counter() + timeout
+    while not done():
+        if time.perf_counter() > deadline:
+            raise TimeoutError("benchmark did not finish")
+        root.update()
+
+
+def make_editor():
+    import tkinter as tk
+    import zen_script
+    root = tk.Tk()
+    root.geometry("800x600")
+    # An enabled profiler also skips the crash-recovery prompt
+    editor = zen_script.ZenScriptEditor(root, zen_script.StartupProfiler(enabled=True))
+    root.update()
+    return root, editor
+
+
+def open_and_wait(root, editor, path):
+    editor._open_file(path)
+    pump(root, lambda: editor.loader is None)
+    if editor.large_view is not None:
+        pump(root, lambda: editor.large_view.indexed)
+
+
+def fill_editor(root, editor, size_mb=EDIT_DOC_MB):
+    rng = random.Random(SEED)
+    editor.text.insert("1.0", synthetic_block(rng, size_mb * 1024 * 1024))
+    editor.undo.separator()  # The editor's own history; the Text runs with undo=False
+    root.update()
+
+
+def bench_first_frame(started):
+    import tkinter as tk
+    import zen_script
+    root = tk.Tk()
+    root.geometry("800x600")
+    editor = zen_script.ZenScriptEditor(root, zen_script.StartupProfiler(enabled=True))
+    drawn = []
+    editor.text.bind("<Expose>", lambda e: drawn.append(time.perf_counter()), add="+")
+    pump(root, lambda: drawn)
+    return drawn[0] - started
+
+
+def bench_open(size_mb):
+    path = synthetic_file(size_mb)
+    root, editor = make_editor()
+    start = time.perf_counter()
+    open_and_wait(root, editor, path)
+    return time.perf_counter() - start
+
+
+def bench_save(size_mb):
+    path = synthetic_file(size_mb)
+    root, editor = make_editor()
+    open_and_wait(root, editor, path)
+    if editor.large_view is not None:
+        return None  # Files this big open read-only
+    start = time.perf_counter()
+    editor._save_file()
+    pump(root, lambda: editor._save_poll_job is None and not editor.writer.busy)
+    return time.perf_counter() - start
+
+
+def bench_insert_bulk():
+    root, editor = make_editor()
+    text = synthetic_block(random.Random(SEED), EDIT_DOC_MB * 1024 * 1024)
+    start = time.perf_counter()
+    editor.text.insert("1.0", text)
+    root.update()
+    return time.perf_counter() - start
+
+
+def bench_insert_typing():
+    root, editor = make_editor()
+    fill_editor(root, editor)
+    editor.text.mark_set("insert", "1000.0")
+    start = time.perf_counter()
+    for i in range(TYPED_CHARS):
+        editor.text.insert("insert", "\n" if i % 60 == 59 else "x")
+        if i % 20 == 0:
+            root.update()  # Let idle work (highlighting, status) run as it would while typing
+    root.update()
+    wall = time.perf_counter() - start
+    if editor.journal:
+        # UI-thread cost of crash recovery per keystroke; should stay in microseconds
+        METRICS["journal_record_us"] = editor.journal.mean_record_us
+    return wall
+
+
+def bench_undo_redo():
+    root, editor = make_editor()
+    fill_editor(root, editor)
+    editor.text.delete("1.0", "end")  # One large edit to undo and redo
+    editor.undo.separator()
+    root.update()
+    start = time.perf_counter()
+    editor._undo()
+    root.update()
+    editor._redo()
+    root.update()
+    return time.perf_counter() - start
+
+
+def bench_select_all_copy():
+    root, editor = make_editor()
+    fill_editor(root, editor)
+    start = time.perf_counter()
+    editor._select_all()
+    editor._copy_text()
+    root.update()
+    return time.perf_counter() - start
+
+
+def bench_scroll_to_end():
+    root, editor = make_editor()
+    fill_editor(root, editor)
+    editor.text.see("1.0")
+    root.update()
+    start = time.perf_counter()
+    editor.text.see("end")
+    root.update()
+    return time.perf_counter() - start
+
+
+def bench_theme_switch():
+    root, editor = make_editor()
+    fill_editor(root, editor)
+    bases = ("#1e1e2e", "#fdf6e3")
+    start = time.perf_counter()
+    for i in range(THEME_SWITCHES):
+        editor.colors["base"] = bases[i % 2]
+        editor.apply_current_theme()
+        root.update()
+    return (time.perf_counter() - start) / THEME_SWITCHES
+
+
+def bench_tab_switch():
+    root, editor = make_editor()
+    fill_editor(root, editor)
+    for _ in range(OPEN_TABS - 1):
+        editor._new_tab()
+        fill_editor(root, editor)
+    start = time.perf_counter()
+    for tab in editor.tabs:  # The oldest tabs were evicted: switching to them starts a restore
+        editor._switch_tab(tab)
+        root.update()
+    return (time.perf_counter() - start) / len(editor.tabs)
+
+
+def benchmarks(sizes):
+    """Names of every benchmark in the suite, in run order"""
+    names = ["first_frame"]
+    for size in sizes:
+        names += [f"open_{size}mb", f"save_{size}mb"]
+    names += ["insert_bulk", "insert_typing", "undo_redo", "select_all_copy",
+              "scroll_to_end", "theme_switch", "tab_switch"]
+    return names
+
+
+def run_child(name, started):
+    sys.path.insert(0, BASE_DIR)
+    kind, _, size = name.rpartition("_")
+    if name == "first_frame":
+        wall = bench_first_frame(started)
+    elif kind in ("open", "save"):
+        bench = bench_open if kind == "open" else bench_save
+        wall = bench(int(size[:-2]))
+    else:
+        wall = globals()[f"bench_{name}"]()
+    print(json.dumps(dict(METRICS, wall_s=wall, peak_rss_mb=peak_rss_mb())))
+
+
+# --- Parent side: orchestration, results and comparison -----------------------
+
+def start_xvfb():
+    """Start a private Xvfb if there is no display; returns the process or None"""
+    if platform.system() != "Linux" or os.environ.get("DISPLAY"):
+        return None
+    if not shutil.which("Xvfb"):
+        print("[ERROR] No $DISPLAY and Xvfb is not installed.", file=sys.stderr)
+        sys.exit(1)
+    display = f":{100 + os.getpid() % 800}"
+    server = subprocess.Popen(["Xvfb", display, "-screen", "0", "1280x1024x24", "-nolisten", "tcp"],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(0.5)
+    if server.poll() is not None:
+        print(f"[ERROR] Xvfb could not start on display {display}.", file=sys.stderr)
+        sys.exit(1)
+    os.environ["DISPLAY"] = display
+    return server
+
+
+def run_suite(names, repeat):
+    # Keep recovery journals out of the real state directory
+    state_dir = tempfile.mkdtemp(prefix="zen_bench_state_")
+    env = dict(os.environ, XDG_STATE_HOME=state_dir, LOCALAPPDATA=state_dir)
+    results = {}
+    try:
+        for name in names:
+            runs = []
+            for _ in range(repeat):
+                child = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", name],
+                                       capture_output=True, text=True, env=env, timeout=BENCH_TIMEOUT)
+                if child.returncode != 0:
+                    print(f"[ERROR] {name} failed:\n{child.stderr}", file=sys.stderr)
+                    break
+                runs.append(json.loads(child.stdout.strip().splitlines()[-1]))
+            walls = [run["wall_s"] for run in runs if run["wall_s"] is not None]
+            if not walls:
+                print(f"  {name:<20} skipped")
+                continue
+            rss = [run["peak_rss_mb"] for run in runs if run["peak_rss_mb"] is not None]
+            results[name] = {
+                "wall_s": statistics.median(walls),
+                "wall_min_s": min(walls),
+                "runs": walls,
+                "peak_rss_mb": max(rss) if rss else None,
+            }
+            extras = sorted({key for run in runs for key in run} - {"wall_s", "peak_rss_mb"})
+            for key in extras:
+                results[name][key] = statistics.median(run[key] for run in runs if key in run)
+            print(f"  {name:<20} {results[name]['wall_s'] * 1000:10.1f} ms"
+                  f"{'' if not rss else f'  {max(rss):8.1f} MB'}"
+                  + "".join(f"  {key} {results[name][key]:.2f}" for key in extras))
+    finally:
+        shutil.rmtree(state_dir, ignore_errors=True)
+    return results
+
+
+def metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    import tkinter
+    return {
+        "commit": commit,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "tk": str(tkinter.TkVersion),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Print a comparison table; returns the names of regressed benchmarks"""
+    regressions = []
+    print(f"\n{'benchmark':<20}{'baseline':>12}{'current':>12}{'change':>9}   rss change")
+    for name, current in results.items():
+        old = baseline.get(name)
+        if old is None:
+            print(f"{name:<20}{'-':>12}{current['wall_s'] * 1000:10.1f}ms      new")
+            continue
+        change = (current["wall_s"] / old["wall_s"] - 1) * 100 if old["wall_s"] else 0.0
+        rss_change = None
+        if current.get("peak_rss_mb") and old.get("peak_rss_mb"):
+            rss_change = (current["peak_rss_mb"] / old["peak_rss_mb"] - 1) * 100
+        regressed = change > threshold or (rss_change is not None and rss_change > threshold)
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<20}{old['wall_s'] * 1000:10.1f}ms{current['wall_s'] * 1000:10.1f}ms"
+              f"{change:+8.1f}%   {'' if rss_change is None else f'{rss_change:+.1f}%'}"
+              f"{'   REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main():
+    started = time.perf_counter()
+    parser = argparse.ArgumentParser(description="Benchmark zen.script's core editor operations.")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES_MB)),
+                        help="comma-separated file sizes in MiB for the open/save benchmarks")
+    parser.add_argument("--only", help="comma-separated benchmark names to run")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark (median is reported)")
+    parser.add_argument("--output", default="benchmark_results.json", help="where to write the results")
+    parser.add_argument("--results", help="compare this results file instead of running the suite")
+    parser.add_argument("--baseline", help="results file to flag regressions against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="percent slowdown or RSS growth that counts as a regression")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, started)
+        return 0
+
+    if args.results:
+        with open(args.results) as f:
+            report = json.load(f)
+    else:
+        names = benchmarks([int(size) for size in args.sizes.split(",") if size])
+        if args.only:
+            wanted = set(args.only.split(","))
+            names = [name for name in names if name in wanted]
+        for name in names:
+            if name.startswith(("open_", "save_")):
+                synthetic_file(int(name.rpartition("_")[2][:-2]))  # Generate outside the timings
+        server = start_xvfb()
+        try:
+            print(f"Running {len(names)} benchmarks x {args.repeat}...")
+            report = {"meta": metadata(), "results": run_suite(names, args.repeat)}
+        finally:
+            if server is not None:
+                server.terminate()
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report["results"], baseline["results"], args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:g}%: {', '.join(regressions)}")
+            return 1
+        print("\nNo regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,31 @@
+import os
+import sys
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import zen_script
+
+
+def make_editor(**tab):
+    # No display here: the editor's per-tab fields are exercised without building its UI
+    editor = zen_script.ZenScriptEditor.__new__(zen_script.ZenScriptEditor)
+    fields = dict(loader=None, large_view=None, follower=None)
+    fields.update(tab)
+    editor.tab = types.SimpleNamespace(**fields)
+    editor.messages = []
+    editor.set_status = editor.messages.append
+    editor._follow_job = None
+    return editor
+
+
+def test_save_without_follower_reaches_the_load_check():
+    editor = make_editor(loader=object())
+    assert editor._save_file() == "break"
+    assert editor.messages == ["Still loading, save is unavailable until the file is open"]
+
+
+def test_follow_without_follower_does_nothing():
+    editor = make_editor()
+    assert editor._follow() is None
+    assert editor.messages == []
@@ -0,0 +1,43 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import zen_script
+
+
+def follow(path):
+    return zen_script.LogFollower(str(path), "utf-8", zen_script.file_state(str(path)))
+
+
+def test_append_keeps_buffer_in_step(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_bytes(b"one\n")
+    follower = follow(path)
+    with open(path, "ab") as file:
+        file.write(b"two\n")
+    assert follower.read()[:2] == ("two\n", None)
+    assert not follower.dropped
+    follower.close()
+
+
+def test_truncate_marks_buffer_stale(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_bytes(b"one\ntwo\n")
+    follower = follow(path)
+    path.write_bytes(b"3\n")
+    assert follower.read()[:2] == ("3\n", "truncated")
+    assert follower.dropped
+    follower.close()
+
+
+def test_rotate_marks_buffer_stale(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_bytes(b"one\n")
+    follower = follow(path)
+    follower.read()
+    os.rename(path, tmp_path / "app.log.1")
+    path.write_bytes(b"new\n")
+    assert follower.read()[:2] == ("new\n", "rotated")
+    assert follower.dropped
+    follower.close()
@@ -0,0 +1,42 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import zen_script
+
+
+def read_all(path, chunk_bytes):
+    reader = zen_script.ChunkedFileReader(path, chunk_bytes=chunk_bytes).start()
+    parts = []
+    while True:
+        kind, payload = reader.chunks.get(timeout=10)
+        if kind == "data":
+            parts.append(payload[0])
+        elif kind == "done":
+            return reader, "".join(parts)
+        else:
+            raise payload
+
+
+def test_crlf_split_across_chunks_is_detected(tmp_path):
+    original = "héllo\r\nwörld\r\nx".encode("utf-8")
+    path = tmp_path / "split.txt"
+    path.write_bytes(original)
+    # Every chunk size, so the "\r" and "\n" land in different chunks for some
+    for chunk_bytes in range(1, len(original) + 2):
+        reader, text = read_all(str(path), chunk_bytes)
+        assert text == "héllo\nwörld\nx"
+        assert reader.newline == "\r\n", chunk_bytes
+        saved = tmp_path / "saved.txt"
+        zen_script.BackgroundWriter.write_atomic(str(saved), text, reader.encoding, newline=reader.newline)
+        assert saved.read_bytes() == original
+
+
+def test_lone_cr_at_end_of_file(tmp_path):
+    path = tmp_path / "cr.txt"
+    path.write_bytes(b"one\rtwo\r")
+    for chunk_bytes in (1, 4, 64):
+        reader, text = read_all(str(path), chunk_bytes)
+        assert text == "one\ntwo\n"
+        assert reader.newline == "\r"
@@ -0,0 +1,31 @@
+import json
+import os
+import sys
+import tkinter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import zen_script
+
+
+def test_newer_settings_are_not_written_over(tmp_path):
+    path = tmp_path / "settings.json"
+    text = json.dumps({"version": zen_script.SETTINGS_SCHEMA_VERSION + 1, "theme": "dark", "added": [1]})
+    path.write_text(text, encoding="utf-8")
+    store = zen_script.SettingsStore(tkinter.Tcl(), str(path))
+    assert store.read_only and store.get("theme") == "dark"
+    store.update(theme="light")
+    store.flush()
+    assert store.get("theme") == "light"
+    assert path.read_text(encoding="utf-8") == text
+
+
+def test_older_settings_are_migrated(tmp_path):
+    legacy = tmp_path / ".zenscript_settings.json"
+    legacy.write_text(json.dumps({"theme": "dark"}), encoding="utf-8")
+    path = tmp_path / "config" / "settings.json"
+    store = zen_script.SettingsStore(tkinter.Tcl(), str(path), (str(legacy),))
+    assert not store.read_only
+    store.flush()
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert data == {"theme": "dark", "version": zen_script.SETTINGS_SCHEMA_VERSION}
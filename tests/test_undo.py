@@ -0,0 +1,29 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import zen_script
+
+
+def push(undo, steps, text):
+    step = zen_script._UndoStep()
+    step.sealed = True
+    step.ops.append(["insert", 0, text])
+    steps.append(step)
+    undo._charge(step, undo._cost(text))
+
+
+def test_redo_steps_are_spilled_and_read_back():
+    undo = zen_script.UndoManager(None, budget_mb=0)
+    undo.budget = 4096
+    texts = [str(i) * 1000 for i in range(10)]
+    for text in texts:
+        push(undo, undo.redo_steps, text)
+    assert undo.memory <= undo.budget
+    assert 0 < undo.redo_steps.spilled < len(texts) and undo.spilled
+    while undo.redo_steps:
+        step = undo.redo_steps.pop()
+        assert undo._load(undo.redo_steps, step) == [["insert", 0, texts.pop()]]
+    assert undo.spilled == 0
+    undo.clear()
@@ -1,10 +1,95 @@
 import tkinter as tk
-from tkinter import font, messagebox, filedialog, ttk
+from tkinter import font
 import platform
 import os
 import re
 import json
+import io
+import codecs
 import sys
+import mmap
+import socket
+import select
+import struct
+import bisect
+import collections
+import marshal
+import zlib
+import itertools
+import operator
+from array import array
+import queue
+import threading
+import time
+import fnmatch
+import tempfile  # Used by the writer, settings and snapshot threads, so not lazy
+import importlib.util
+import keyword
+import builtins
+
+
+def lazy_import(name):
+    """Return a module whose real import runs on first attribute access.
+
+    LazyLoader isn't thread-safe: only use the module on the UI thread, or
+    touch it there before a worker thread can.
+    """
+    if name in sys.modules:
+        return sys.modules[name]  # Already imported: don't run it a second time
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+# Not needed to show an editable window: dialogs, the font options combo
+# boxes and Find in Files load these the first time they're used
+messagebox = lazy_import("tkinter.messagebox")
+filedialog = lazy_import("tkinter.filedialog")
+ttk = lazy_import("tkinter.ttk")
+futures = lazy_import("concurrent.futures")
+multiprocessing = lazy_import("multiprocessing")
+ctypes = lazy_import("ctypes")  # inotify, once a file is watched; Windows process and DPI calls
+
+# Streaming open: files are read in fixed-size chunks on a worker thread and
+# handed to the Tk main loop, which inserts them in small time-boxed batches.
+STREAM_CHUNK_BYTES = 64 * 1024
+STREAM_QUEUE_DEPTH = 32          # Chunks buffered ahead of the UI (bounds memory)
+STREAM_BATCH_BUDGET_MS = 12      # Max time spent inserting per main loop tick
+STREAM_POLL_MS = 5
+STREAM_IDLE_POLL_MS = 100        # Polling backs off to this while a stream (e.g. a pipe) is quiet
+
+# Encoding detection only sniffs the first chunk. Without a BOM, the first
+# encoding here that decodes it is used; if it fails further into the file
+# the load restarts with the next one (latin-1 accepts any byte sequence).
+ENCODING_FALLBACKS = ("utf-8", "cp1252", "latin-1")
+TEXT_BOMS = (  # UTF-32 LE first: its BOM starts with the UTF-16 LE one
+    (codecs.BOM_UTF32_LE, "utf-32-le"),
+    (codecs.BOM_UTF32_BE, "utf-32-be"),
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+)
+NEWLINE_NAMES = {"\r\n": "CRLF", "\n": "LF", "\r": "CR"}
+STATUS_FRAME_MS = 16  # The cursor and counts readout is refreshed at most once per frame
+SELECTION_COUNT_CHARS = 4 * 1024 * 1024  # Larger selections show lines and characters only
+
+# Files at or above this size open in the read-only, memory-mapped viewer
+LARGE_FILE_THRESHOLD = 256 * 1024 * 1024
+LARGE_FILE_MARGIN_LINES = 100    # Lines kept above and below the viewport
+LARGE_FILE_LINE_CAP = 16 * 1024  # Longer lines are shown as fixed-size segments
+
+# Tk lays out a logical line as a whole, so one huge line (minified JSON, a
+# single-line dump) makes every keystroke and scroll slow. A tab with lines
+# this long shows them unwrapped, with all but their start folded away.
+LONG_LINE_CHARS = 10000
+LONG_LINE_SHOWN = 1000  # Characters of a folded line left on screen
+LONG_LINE_TAG = "long_fold"
+JSON_INDENT = 2
+JSON_FORMAT_POLL_MS = 50
 
 def get_application_path():
     """Returns the base path for the application, whether running as a script or frozen."""
@@ -17,36 +102,3788 @@ def get_application_path():
         # Running as a normal Python script
         return os.path.dirname(os.path.abspath(__file__))
 
+class LineIndex:
+    """Start offset of every line, stored as blocks of 64-bit integers.
+
+    Offsets inside a block are relative to the block's base, so an edit only
+    rewrites the entries of one block and shifts the bases of the blocks
+    after it. Looking up a line is a bisect over the block list.
+    """
+
+    BLOCK_LINES = 2048
+
+    def __init__(self):
+        self.blocks = [array("q", [0])]
+        self.bases = [0]
+        self.firsts = [0]  # Line number (0-based) of each block's first entry
+        self.size = 0      # Total length of the indexed text
+
+    def __len__(self):
+        return self.firsts[-1] + len(self.blocks[-1])
+
+    # -- Building --------------------------------------------------------
+
+    @staticmethod
+    def scan(chunk, base):
+        """Return the absolute start of every line beginning inside chunk"""
+        starts = array("q")
+        newline = "\n" if isinstance(chunk, str) else b"\n"
+        find = chunk.find
+        i = find(newline)
+        while i >= 0:
+            starts.append(base + i + 1)
+            i = find(newline, i + 1)
+        return starts
+
+    def extend(self, starts, size):
+        """Append line starts produced by scan() and grow the indexed length to size"""
+        last = self.blocks[-1]
+        base = self.bases[-1]
+        position = 0
+        while position < len(starts):
+            room = self.BLOCK_LINES - len(last)
+            if room <= 0:
+                self.firsts.append(self.firsts[-1] + len(last))
+                last = array("q")
+                base = 0
+                self.blocks.append(last)
+                self.bases.append(base)
+                room = self.BLOCK_LINES
+            piece = starts[position:position + room]
+            last.extend(piece if not base else array("q", (s - base for s in piece)))
+            position += room
+        self.size = size
+
+    def feed(self, chunk):
+        """Index a chunk of text appended to the end of the document"""
+        self.extend(self.scan(chunk, self.size), self.size + len(chunk))
+
+    # -- Lookups ---------------------------------------------------------
+
+    def _locate(self, line):
+        block = bisect.bisect_right(self.firsts, line) - 1
+        return block, line - self.firsts[block]
+
+    def line_start(self, line):
+        """Offset of the first character of a 1-based line"""
+        line = max(1, min(line, len(self)))
+        block, j = self._locate(line - 1)
+        return self.bases[block] + self.blocks[block][j]
+
+    def offset(self, line, col):
+        return self.line_start(line) + col
+
+    def line_of(self, offset):
+        """Return the 1-based line containing offset"""
+        lo, hi = 0, len(self.blocks) - 1
+        while lo < hi:  # Last block whose first line starts at or before offset
+            mid = (lo + hi + 1) // 2
+            if self.bases[mid] + self.blocks[mid][0] <= offset:
+                lo = mid
+            else:
+                hi = mid - 1
+        block, base = self.blocks[lo], self.bases[lo]
+        return self.firsts[lo] + bisect.bisect_right(block, offset - base)
+
+    def long_lines(self, limit, first=1, last=None):
+        """1-based numbers of the lines from first to last that are longer
+        than limit characters, counting the line break"""
+        last = len(self) if last is None else min(last, len(self))
+        found = []
+        line = max(1, first)
+        while line <= last:
+            block, j = self._locate(line - 1)
+            entries = self.blocks[block]
+            stop = min(len(entries), j + last - line + 1)
+            if stop < len(entries):
+                end = entries[stop]
+            elif block + 1 < len(self.blocks):
+                end = self.bases[block + 1] + self.blocks[block + 1][0] - self.bases[block]
+            else:
+                end = self.size - self.bases[block]
+            starts = entries[j:stop]
+            ends = entries[j + 1:stop]
+            ends.append(end)
+            # Measured at C speed; only a block that has a long line is walked
+            if max(map(operator.sub, ends, starts)) > limit:
+                found.extend(self.firsts[block] + k + 1
+                             for k, length in enumerate(map(operator.sub, ends, starts), j)
+                             if length > limit)
+            line = self.firsts[block] + stop + 1
+        return found
+
+    # -- Incremental updates ---------------------------------------------
+
+    def _shift_after(self, line, delta):
+        """Add delta to the start of every line after the 0-based line"""
+        block, j = self._locate(line)
+        entries = self.blocks[block]
+        if j + 1 < len(entries):
+            entries[j + 1:] = array("q", map(delta.__add__, entries[j + 1:]))
+        self.bases[block + 1:] = map(delta.__add__, self.bases[block + 1:])
+
+    def _renumber(self, block):
+        block = max(block, 0)
+        firsts = itertools.accumulate(map(len, self.blocks[block:-1]), initial=self.firsts[block])
+        next(firsts)  # Skip the unchanged first line of block itself
+        self.firsts[block + 1:] = firsts
+
+    def insert(self, line, col, text):
+        """Record text inserted at the 1-based line and column"""
+        if not text:
+            return
+        k = line - 1
+        offset = self.offset(line, col)
+        self._shift_after(k, len(text))
+        new = self.scan(text, offset)
+        if new:
+            block, j = self._locate(k)
+            base = self.bases[block]
+            entries = self.blocks[block]
+            entries[j + 1:j + 1] = array("q", (s - base for s in new))
+            if len(entries) > 2 * self.BLOCK_LINES:
+                # Split oversized blocks (e.g. after a big paste) back to BLOCK_LINES
+                pieces = [entries[i:i + self.BLOCK_LINES]
+                          for i in range(self.BLOCK_LINES, len(entries), self.BLOCK_LINES)]
+                del entries[self.BLOCK_LINES:]
+                self.blocks[block + 1:block + 1] = pieces
+                self.bases[block + 1:block + 1] = [base] * len(pieces)
+                self.firsts[block + 1:block + 1] = [0] * len(pieces)
+            self._renumber(block)
+        self.size += len(text)
+
+    def delete(self, line, col, length, newlines):
+        """Record length characters, spanning newlines line breaks, deleted at line/col"""
+        if length <= 0:
+            return
+        k = line - 1
+        remaining = newlines
+        while remaining:
+            block, j = self._locate(k + 1)
+            entries = self.blocks[block]
+            count = min(remaining, len(entries) - j)
+            del entries[j:j + count]
+            remaining -= count
+            if not entries:
+                del self.blocks[block], self.bases[block], self.firsts[block]
+                block -= 1
+            self._renumber(block)
+        self._shift_after(k, -length)
+        self.size -= length
+
+
+def get_user_data_dir():
+    """Returns the per-user directory for zen.script's state (recovery journals etc.)."""
+    system = platform.system()
+    if system == "Windows":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~\\AppData\\Local")
+    elif system == "Darwin":
+        base = os.path.expanduser("~/Library/Application Support")
+    else:
+        base = os.environ.get("XDG_STATE_HOME") or os.path.expanduser("~/.local/state")
+    return os.path.join(base, "zen.script")
+
+def get_user_config_dir():
+    """Returns the per-user directory for zen.script's settings."""
+    system = platform.system()
+    if system == "Windows":
+        base = os.environ.get("APPDATA") or os.path.expanduser("~\\AppData\\Roaming")
+    elif system == "Darwin":
+        base = os.path.expanduser("~/Library/Application Support")
+    else:
+        base = os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config")
+    return os.path.join(base, "zen.script")
+
+def process_alive(pid):
+    """Best-effort check whether another process with this pid is still running."""
+    if pid == os.getpid():
+        return True
+    if platform.system() == "Windows":
+        try:
+            kernel32 = ctypes.windll.kernel32
+            handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+            if not handle:
+                return False
+            code = ctypes.c_ulong()
+            kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+            kernel32.CloseHandle(handle)
+            return code.value == 259  # STILL_ACTIVE
+        except Exception:
+            return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class EditJournal:
+    """Append-only crash-recovery log of the edits made to one open document.
+
+    The journal starts with a header naming its base (the file as it is on
+    disk, or an inline text snapshot) followed by one JSON line per insert
+    or delete. The UI thread only enqueues tuples; formatting and writing
+    happen on a worker thread. Replaying the records on top of the base
+    reproduces the buffer. Every tab has its own journal, so a modified
+    background tab stays recoverable too.
+    """
+
+    MAGIC = "zen-journal"
+    VERSION = 1
+    COMPACT_RECORDS = 20000  # Fold the log into a snapshot after this many edits
+
+    def __init__(self, directory, tab_id):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"journal-{os.getpid()}-{tab_id}.jsonl")
+        self.records = 0  # Records appended since the current base
+        self.record_ns = 0  # Time the UI thread has spent recording, for mean_record_us
+        self.recorded = 0
+        self._tokens = itertools.count(1)
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="zen-journal", daemon=True)
+        self._thread.start()
+
+    # -- UI thread -------------------------------------------------------
+
+    def start(self, file_path=None, text=None):
+        """Start a fresh journal based on file_path as it is on disk, or on text if given"""
+        self.records = 0
+        file_base = text is None and file_path is not None
+        self._queue.put(("start", self._header(file_path, file_base),
+                         None if file_base else text or "", False))
+
+    def compact(self, text, file_path=None):
+        """Replace the log with text (a str or DocumentSnapshot), still saving to file_path"""
+        self.records = 0
+        self._queue.put(("start", self._header(file_path, False), text, True))
+
+    def on_insert(self, offset, text):
+        started = time.perf_counter_ns()
+        self._queue.put(("i", offset, text))
+        self.records += 1
+        self.recorded += 1
+        self.record_ns += time.perf_counter_ns() - started
+
+    def on_delete(self, offset, length):
+        started = time.perf_counter_ns()
+        self._queue.put(("d", offset, length))
+        self.records += 1
+        self.recorded += 1
+        self.record_ns += time.perf_counter_ns() - started
+
+    @property
+    def mean_record_us(self):
+        return self.record_ns / max(1, self.recorded) / 1000
+
+    def mark(self):
+        """Remember the current end of the log, e.g. when a save snapshot is taken"""
+        token = next(self._tokens)
+        self._queue.put(("mark", token))
+        return token
+
+    def rebase(self, token, file_path):
+        """The snapshot taken at mark token is now on disk as file_path: drop
+        everything logged before it and base the journal on that file"""
+        self.records = 0
+        self._queue.put(("rebase", token, file_path))
+
+    def discard(self):
+        self.records = 0
+        self._queue.put(("discard",))
+
+    def close(self, timeout=5):
+        self._queue.put(("close",))
+        self._thread.join(timeout)
+
+    def _header(self, file_path, file_base):
+        header = {"path": file_path, "base": "file" if file_base else "text"}
+        if file_base:
+            stat = os.stat(file_path)
+            header.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+        return header
+
+    # -- Worker thread ---------------------------------------------------
+
+    def _run(self):
+        self._file = None
+        self._pending = None  # (header, text) not yet written; created on first edit
+        self._records_start = 0
+        self._marks = {}
+        while True:
+            item = self._queue.get()
+            while True:
+                try:
+                    if item[0] == "close":
+                        self._close_file()
+                        return
+                    self._handle(item)
+                except Exception:
+                    pass  # Recovery is best effort; never take the editor down
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if self._file is not None:
+                self._file.flush()  # Hand the batch to the OS so a crash keeps it
+
+    def _handle(self, item):
+        kind = item[0]
+        if kind in ("i", "d"):
+            if self._file is None and self._pending is not None:
+                self._write_new(*self._pending)
+            if self._file is not None:
+                self._file.write(self._line(list(item)))
+        elif kind == "start":
+            _, header, text, eager = item
+            self._marks.clear()  # Pending rebases refer to the old log
+            if eager:
+                self._write_new(header, text)
+            else:
+                self._remove_file()
+                self._pending = (header, text)
+        elif kind == "mark":
+            # "start" means "where the records will begin once the file exists"
+            self._marks[item[1]] = self._file.tell() if self._file is not None else "start"
+        elif kind == "rebase":
+            self._rebase(item[1], item[2])
+        elif kind == "discard":
+            self._remove_file()
+            self._pending = None
+
+    def _rebase(self, token, file_path):
+        if token not in self._marks:
+            return  # The log was compacted since; the snapshot journal stays valid
+        if self._file is not None:
+            self._file.flush()
+            self._marks = {t: self._records_start if p == "start" else p
+                           for t, p in self._marks.items()}
+        position = self._marks.pop(token)
+        newer = {t: p for t, p in self._marks.items() if t > token}
+        tail = b""
+        if self._file is not None:
+            with open(self.path, "rb") as source:
+                source.seek(position)
+                tail = source.read()
+        header = self._header(file_path, True)
+        if tail:
+            self._write_new(header, None, tail)
+            self._marks = {t: self._records_start + p - position for t, p in newer.items()}
+        else:
+            self._remove_file()
+            self._pending = (header, None)
+            self._marks = {t: "start" for t in newer}
+
+    def _line(self, record):
+        return (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+
+    def _write_new(self, header, text, tail=b""):
+        """Atomically replace the journal with header, optional snapshot text and tail"""
+        self._close_file()
+        head = self._line([self.MAGIC, self.VERSION, header])
+        if text is not None:
+            if not isinstance(text, str):
+                text = text.text()  # Snapshots are joined here, off the UI thread
+            head += self._line(["t", text])
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "wb") as file:
+            file.write(head + tail)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.path)
+        self._file = open(self.path, "ab")
+        self._records_start = len(head)
+        self._pending = None
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _remove_file(self):
+        self._close_file()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    # -- Recovery --------------------------------------------------------
+
+    @classmethod
+    def orphans(cls, directory):
+        """Journals left behind by zen.script processes that are no longer running"""
+        found = []
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            return found
+        for name in names:
+            match = re.fullmatch(r"journal-(\d+)(?:-\d+)?\.jsonl", name)
+            if match and not process_alive(int(match.group(1))):
+                found.append(os.path.join(directory, name))
+        return sorted(found, key=os.path.getmtime, reverse=True)
+
+    @classmethod
+    def read(cls, path):
+        """Return (header, base_text, records); base_text is None for file-based journals"""
+        header, base_text, records = None, None, []
+        with open(path, "rb") as file:
+            for raw in file:
+                try:
+                    record = json.loads(raw)
+                except ValueError:
+                    break  # Torn final write from the crash
+                if header is None:
+                    if record[:2] != [cls.MAGIC, cls.VERSION]:
+                        raise ValueError("Not a zen.script recovery journal")
+                    header = record[2]
+                elif record[0] == "t":
+                    base_text = record[1]
+                else:
+                    records.append(record)
+        if header is None:
+            raise ValueError("Empty recovery journal")
+        if header.get("base") == "text" and base_text is None:
+            base_text = ""
+        return header, base_text, records
+
+
+class _PieceView:
+    """Read access shared by PieceTable and its snapshots.
+
+    A document is a list of (source, start, length) pieces over immutable
+    strings, plus the document offset each piece begins at.
+    """
+
+    def __init__(self, pieces, starts, length):
+        self._pieces = pieces
+        self._starts = starts
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+    def _find(self, offset):
+        """Index of the piece containing offset (the last piece for offset == length)"""
+        return max(0, bisect.bisect_right(self._starts, offset) - 1)
+
+    def chunks(self, start=0, end=None):
+        """Yield the text between start and end piece by piece, without joining it"""
+        end = self.length if end is None else min(end, self.length)
+        if start >= end:
+            return
+        i = self._find(start)
+        while i < len(self._pieces) and self._starts[i] < end:
+            source, first, length = self._pieces[i]
+            piece_start = self._starts[i]
+            lo = max(start, piece_start) - piece_start
+            hi = min(end, piece_start + length) - piece_start
+            if lo == 0 and hi == len(source) and first == 0:
+                yield source
+            else:
+                yield source[first + lo:first + hi]
+            i += 1
+
+    def slice(self, start, end):
+        return "".join(self.chunks(start, end))
+
+    def text(self):
+        return "".join(self.chunks())
+
+
+class DocumentSnapshot(_PieceView):
+    """Immutable view of a PieceTable, safe to read from worker threads."""
+
+
+class PieceTable(_PieceView):
+    """Document model that mirrors every edit made to the Text widget.
+
+    Pieces only ever point into immutable strings, so a snapshot is a copy
+    of the piece list rather than of the text, and slices never touch more
+    than the pieces they span.
+    """
+
+    COALESCE_CHARS = 4096  # Typing extends the previous piece up to this size
+    MAX_PIECES = 8192      # Merge small neighbouring pieces beyond this count
+
+    def __init__(self, text=""):
+        super().__init__([], [], 0)
+        if text:
+            self.append(text)
+
+    def snapshot(self):
+        return DocumentSnapshot(list(self._pieces), list(self._starts), self.length)
+
+    def append(self, text):
+        self.insert(self.length, text)
+
+    def insert(self, offset, text):
+        if not text:
+            return
+        offset = max(0, min(offset, self.length))
+        i = self._find(offset)
+        if self._pieces:
+            source, first, length = self._pieces[i]
+            inner = offset - self._starts[i]
+            if inner == length:
+                i, inner = i + 1, 0  # Between pieces: insert after piece i
+        else:
+            inner = 0
+        if inner == 0:
+            previous = self._pieces[i - 1] if i > 0 else None
+            if previous is not None and previous[2] < self.COALESCE_CHARS:
+                # Extend the previous piece so a run of typing stays one piece
+                source, first, length = previous
+                self._pieces[i - 1] = (source[first:first + length] + text, 0, length + len(text))
+                self._renumber(i)
+            else:
+                self._pieces.insert(i, (text, 0, len(text)))
+                self._starts.insert(i, 0)
+                self._renumber(i)
+        else:
+            self._pieces[i:i + 1] = [(source, first, inner), (text, 0, len(text)),
+                                     (source, first + inner, length - inner)]
+            self._starts[i:i + 1] = [0, 0, 0]
+            self._renumber(i)
+        self.length += len(text)
+        if len(self._pieces) > self.MAX_PIECES:
+            self._merge_small_pieces()
+
+    def delete(self, offset, length):
+        end = min(offset + length, self.length)
+        if offset >= end:
+            return
+        first_index = self._find(offset)
+        last_index = self._find(end - 1)
+        keep = []
+        source, first, size = self._pieces[first_index]
+        head = offset - self._starts[first_index]
+        if head:
+            keep.append((source, first, head))
+        source, first, size = self._pieces[last_index]
+        tail = self._starts[last_index] + size - end
+        if tail:
+            keep.append((source, first + size - tail, tail))
+        self._pieces[first_index:last_index + 1] = keep
+        self._starts[first_index:last_index + 1] = [0] * len(keep)
+        self.length -= end - offset
+        self._renumber(first_index)
+
+    # Edit-listener protocol used by the editor's Text proxy
+    on_insert = insert
+    on_delete = delete
+
+    def _renumber(self, i):
+        i = max(0, i - 1)
+        if i >= len(self._pieces):
+            return
+        starts = itertools.accumulate((p[2] for p in self._pieces[i:-1]),
+                                      initial=self._starts[i] if i else 0)
+        self._starts[i:] = starts
+
+    def _merge_small_pieces(self):
+        merged, run, run_length = [], [], 0
+        for source, first, length in self._pieces:
+            if length >= self.COALESCE_CHARS:
+                if run:
+                    merged.append(("".join(run), 0, run_length))
+                    run, run_length = [], 0
+                merged.append((source, first, length))
+                continue
+            run.append(source[first:first + length])
+            run_length += length
+            if run_length >= 16 * self.COALESCE_CHARS:
+                merged.append(("".join(run), 0, run_length))
+                run, run_length = [], 0
+        if run:
+            merged.append(("".join(run), 0, run_length))
+        self._pieces = merged
+        self._starts = [0] * len(merged)
+        self._renumber(0)
+
+
+def detect_encoding(head):
+    """Guess (encoding, bom) from the first block of a file; bom is b"" if absent"""
+    for bom, encoding in TEXT_BOMS:
+        if head.startswith(bom):
+            return encoding, bom
+    # BOM-less UTF-16 text is mostly ASCII, so every other byte is NUL
+    if len(head) >= 4 and head.count(0) * 3 > len(head):
+        even, odd = head[0::2].count(0), head[1::2].count(0)
+        if odd > 2 * even:
+            return "utf-16-le", b""
+        if even > 2 * odd:
+            return "utf-16-be", b""
+    for encoding in ENCODING_FALLBACKS:
+        try:
+            # Not final: a multi-byte character may straddle the end of the block
+            codecs.getincrementaldecoder(encoding)().decode(head, False)
+        except UnicodeDecodeError:
+            continue
+        return encoding, b""
+    return ENCODING_FALLBACKS[-1], b""
+
+
+def detect_newline(text):
+    """The most common line ending in text, or None if it has none"""
+    crlf = text.count("\r\n")
+    lf = text.count("\n") - crlf
+    cr = text.count("\r") - crlf
+    if not (crlf or lf or cr):
+        return None
+    return max((crlf, "\r\n"), (lf, "\n"), (cr, "\r"))[1]
+
+
+# Compressed files are recognised by their magic bytes, decompressed as they
+# stream in and recompressed in the same format, at the same level, on save
+COMPRESSION_MAGIC = ((b"\x1f\x8b", "gzip"), (b"BZh", "bz2"), (b"\xfd7zXZ\x00", "xz"),
+                     (b"\x28\xb5\x2f\xfd", "zstd"))
+COMPRESSION_HEAD_BYTES = 64  # Enough to read the level back from any of their headers
+# LZMA2 dictionary size -> the xz preset that uses it (3 and 5 share theirs with 4 and 6)
+XZ_PRESET_DICTS = {1 << 18: 0, 1 << 20: 1, 1 << 21: 2, 1 << 22: 4, 1 << 23: 6,
+                   1 << 24: 7, 1 << 25: 8, 1 << 26: 9}
+
+
+def _xz_options(head):
+    """preset and check of an xz stream, from its stream and first block headers"""
+    options = {"preset": 6, "check": head[7] & 0x0F if len(head) > 7 else 4}
+
+    def varint(position):
+        value = shift = 0
+        while position < len(head):
+            byte = head[position]
+            value |= (byte & 0x7F) << shift
+            position += 1
+            if not byte & 0x80:
+                return value, position
+            shift += 7
+        raise IndexError(position)
+
+    try:
+        flags = head[13]
+        position = 14
+        for present in (flags & 0x40, flags & 0x80):  # Compressed and uncompressed sizes
+            if present:
+                _, position = varint(position)
+        for _ in range((flags & 3) + 1):
+            filter_id, position = varint(position)
+            size, position = varint(position)
+            if filter_id == 0x21 and size == 1:  # LZMA2: one byte encoding the dictionary size
+                bits = head[position]
+                dict_size = (2 | (bits & 1)) << (bits // 2 + 11)
+                options["preset"] = XZ_PRESET_DICTS.get(dict_size, 6)
+            position += size
+    except IndexError:
+        pass  # Truncated or unusual header: the defaults will do
+    return options
+
+
+def detect_compression(head):
+    """(format, options) for data starting with head, or None if it isn't compressed.
+    options are the keyword arguments that recompress it the same way."""
+    for magic, name in COMPRESSION_MAGIC:
+        if head.startswith(magic):
+            break
+    else:
+        return None
+    if name == "gzip":
+        # Only the extremes are recorded (XFL): 2 for -9, 4 for -1
+        return name, {"compresslevel": {2: 9, 4: 1}.get(head[8] if len(head) > 8 else 0, 6)}
+    if name == "bz2":
+        level = head[3:4]
+        return name, {"compresslevel": int(level) if level.isdigit() else 9}
+    if name == "xz":
+        return name, _xz_options(head)
+    return name, {"level": 3}  # zstd frames don't record their level: use zstd's default
+
+
+def _zstd_module():
+    try:
+        from compression import zstd  # Python 3.14+
+        return zstd
+    except ImportError:
+        pass
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        raise OSError("Opening and saving .zst files needs the zstandard package "
+                      "(pip install zstandard)") from None
+
+
+def open_compressed(raw, compression, mode):
+    """Binary stream that (de)compresses through the open file raw; closing it leaves raw open"""
+    name, options = compression
+    if name == "gzip":
+        import gzip
+        if mode == "r":
+            return gzip.GzipFile(fileobj=raw, mode="rb")
+        return gzip.GzipFile(fileobj=raw, mode="wb", filename="", **options)
+    if name == "bz2":
+        import bz2
+        return bz2.BZ2File(raw, mode, **(options if mode == "w" else {}))
+    if name == "xz":
+        import lzma
+        return lzma.LZMAFile(raw, mode, **(options if mode == "w" else {}))
+    zstd = _zstd_module()
+    if zstd.__name__ != "zstandard":
+        return zstd.ZstdFile(raw, mode, **(options if mode == "w" else {}))
+    if mode == "r":
+        return zstd.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=False)
+    return zstd.ZstdCompressor(**options).stream_writer(raw, closefd=False)
+
+
+class DocumentStats:
+    """Word and byte counts of a document, kept current from edit deltas.
+
+    Counted once while a file is read, on the reader's thread; after that
+    each insert or delete only looks at the changed text and the character
+    on either side of it. Lines and characters come from the line index
+    and the document model, which are already maintained the same way.
+    Bytes are what saving would write: the text in the document's encoding
+    with the line ending and BOM added.
+    """
+
+    def __init__(self, encoding="utf-8"):
+        self.words = 0
+        self.encoded = 0  # Bytes of the text in encoding, each line break counted as "\n"
+        self.encoding = encoding
+
+    @staticmethod
+    def count_words(text, before=" "):
+        """Whitespace-separated words that start in text, given the character before it"""
+        words = len(text.split())
+        if words and not before.isspace() and not text[0].isspace():
+            words -= 1  # Continues a word begun before text
+        return words
+
+    def encoded_length(self, text):
+        return len(text.encode(self.encoding, "replace"))
+
+    def reset(self, words=0, encoded=0, encoding=None):
+        self.words, self.encoded = words, encoded
+        self.encoding = encoding or self.encoding
+
+    def recount(self, document, encoding=None):
+        """Count a whole document again (slow path)"""
+        self.reset(encoding=encoding)
+        before = " "
+        for chunk in document.chunks():
+            self.words += self.count_words(chunk, before)
+            self.encoded += self.encoded_length(chunk)
+            before = chunk[-1]
+
+    @staticmethod
+    def _around(document, start, end):
+        before = document.slice(start - 1, start) if start > 0 else ""
+        return before or " ", document.slice(end, end + 1)
+
+    def inserted(self, document, offset, text):
+        """Account for text just inserted into document at offset"""
+        before, after = self._around(document, offset, offset + len(text))
+        self.words += self.count_words(text + after, before) - self.count_words(after, before)
+        self.encoded += self.encoded_length(text)
+
+    def deleted(self, document, offset, text):
+        """Account for text just deleted from document at offset"""
+        before, after = self._around(document, offset, offset)
+        self.words += self.count_words(after, before) - self.count_words(text + after, before)
+        self.encoded -= self.encoded_length(text)
+
+    def saved_bytes(self, encoded, line_breaks, newline, bom):
+        """Size on disk of text measuring encoded bytes with line_breaks "\n"s"""
+        size = encoded + (len(newline) - 1) * self.encoded_length("\n") * line_breaks
+        return size + (self.encoded_length("\ufeff") if bom else 0)
+
+
+class ChunkedFileReader:
+    """Reads and decodes a file in fixed-size chunks on a worker thread.
+
+    The encoding and line ending are sniffed from the first chunk, then the
+    rest is decoded incrementally with newlines translated to "\n". Decoded
+    chunks are passed to the UI thread through a bounded queue, so memory
+    use follows the chunk size instead of the file size.
+    """
+
+    restoring = False  # True for SnapshotReader, which refills a tab rather than opening a file
+    decode_errors = "strict"  # A decode error retries the file with the next fallback encoding
+    source = None  # What is read, for the status bar, if not a file (StdinReader)
+    formatted = False  # True for FormattedReader, which swaps in Format JSON's result
+    cancel_label = "Cancel"
+
+    def __init__(self, file_path, encoding=None, chunk_bytes=STREAM_CHUNK_BYTES):
+        self.file_path = file_path
+        self.encoding = encoding  # None: detect from the first chunk
+        self.bom = False
+        self.newline = None  # Dominant line ending, once one has been seen
+        self.chunk_bytes = chunk_bytes
+        self.total_bytes = os.path.getsize(file_path) if file_path is not None else 0  # 0: unknown
+        self.bytes_read = 0
+        self.chars_read = 0
+        self.disk_state = None  # file_state of the bytes read, once all were
+        self.compression = None  # detect_compression() result for a compressed file
+        self.words = self.encoded = 0  # DocumentStats counts of the text read so far
+        self.poll_ms = STREAM_POLL_MS  # Grows while nothing arrives (a quiet pipe)
+        self.chunks = queue.Queue(maxsize=STREAM_QUEUE_DEPTH)
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="zen-open", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def _put(self, item):
+        # Block while the UI catches up, but give up promptly once cancelled
+        while not self._cancelled.is_set():
+            try:
+                self.chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def fallback_encoding(self):
+        """Encoding to retry with after a decode error, or None if there is none"""
+        if self.bom:
+            return None  # The BOM is authoritative
+        if self.encoding not in ENCODING_FALLBACKS:
+            return ENCODING_FALLBACKS[0]
+        position = ENCODING_FALLBACKS.index(self.encoding) + 1
+        return ENCODING_FALLBACKS[position] if position < len(ENCODING_FALLBACKS) else None
+
+    def _open(self):
+        """(raw, file): the file on disk, and the stream to decode, which
+        decompresses raw if the file is compressed"""
+        raw = open(self.file_path, "rb")
+        try:
+            self.compression = detect_compression(raw.read(COMPRESSION_HEAD_BYTES))
+            raw.seek(0)
+            # Decompressed as it is read: only a chunk is ever held uncompressed
+            return raw, open_compressed(raw, self.compression, "r") if self.compression else raw
+        except BaseException:
+            raw.close()
+            raise
+
+    def _run(self):
+        try:
+            raw, file = self._open()
+            with raw:
+                block = file.read(self.chunk_bytes)
+                if self.encoding is None:
+                    self.encoding, bom = detect_encoding(block)
+                    self.bom = bool(bom)
+                    block = block[len(bom):]
+                decoder = codecs.getincrementaldecoder(self.encoding)(self.decode_errors)
+                # Holds back a trailing "\r" until it knows whether "\n" follows
+                newlines = io.IncrementalNewlineDecoder(None, translate=True)
+                last_char = " "
+                held = ""  # A "\r" that ended the text so far, while the style is undecided
+                while not self._cancelled.is_set():
+                    final = not block
+                    text = decoder.decode(block, final)
+                    if self.newline is None:
+                        # A CRLF can be split across chunks: a trailing "\r" waits for the next one
+                        sample = held + text
+                        held = "\r" if sample.endswith("\r") and not final else ""
+                        self.newline = detect_newline(sample[:len(sample) - len(held)])
+                    data = newlines.decode(text, final)
+                    self.bytes_read = raw.tell()  # Of the file on disk, for progress
+                    if data:
+                        # Line starts and counts are found here so the UI thread only appends them
+                        starts = LineIndex.scan(data, self.chars_read)
+                        self.words += DocumentStats.count_words(data, last_char)
+                        self.encoded += len(data.encode(self.encoding, "replace"))
+                        last_char = data[-1]
+                        self.chars_read += len(data)
+                        if not self._put(("data", (data, starts, self.chars_read))):
+                            return
+                    if final:
+                        if self.file_path is not None:
+                            # The size is what was read: a file still growing
+                            # then shows up as changed once it is watched
+                            stat = os.fstat(raw.fileno())
+                            self.disk_state = (stat.st_dev, stat.st_ino, self.bytes_read, stat.st_mtime_ns)
+                        break
+                    block = file.read(self.chunk_bytes)
+            self._put(("done", None))
+        except Exception as e:
+            self._put(("error", e))
+
+
+class _PipeStream:
+    """A pipe read like a file, except that read(n) returns whatever has
+    arrived (up to n bytes) instead of waiting for all n"""
+
+    def __init__(self, stream):
+        self.stream = stream  # A buffered binary stream, e.g. sys.stdin.buffer
+        self.position = 0
+
+    def read(self, size):
+        data = self.stream.read1(size)
+        self.position += len(data)
+        return data
+
+    def tell(self):
+        return self.position
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False  # Standard input stays open
+
+
+class StdinReader(ChunkedFileReader):
+    """Streams standard input into a new buffer as it arrives ("zen_script.py -").
+
+    Works like ChunkedFileReader, but each read takes whatever the producer
+    has written so far, so a slow command's output shows up as it is made.
+    The stream may never end: Stop Reading keeps what has arrived. A pipe
+    can't be read twice, so undecodable bytes are replaced instead of
+    retrying with another encoding.
+    """
+
+    decode_errors = "replace"
+    source = "standard input"
+    cancel_label = "Stop Reading"
+
+    def __init__(self, stream, encoding=None, chunk_bytes=STREAM_CHUNK_BYTES):
+        super().__init__(None, encoding, chunk_bytes)
+        self.stream = stream
+        self._thread.name = "zen-stdin"
+
+    def _open(self):
+        pipe = _PipeStream(self.stream)
+        return pipe, pipe
+
+    def fallback_encoding(self):
+        return None
+
+
+class MappedFile:
+    """Read-only memory map of a file that steps between line starts.
+
+    Every lookup scans at most LARGE_FILE_LINE_CAP bytes, so the cost of
+    moving around never depends on the size of the file.
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._file = open(file_path, "rb")
+        try:
+            self.size = os.fstat(self._file.fileno()).st_size
+            self.map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+
+    def close(self):
+        self.map.close()
+        self._file.close()
+
+    def line_start(self, offset):
+        """Return the start of the line (or line segment) containing offset"""
+        offset = max(0, min(offset, self.size))
+        low = max(0, offset - LARGE_FILE_LINE_CAP)
+        newline = self.map.rfind(b"\n", low, offset)
+        return newline + 1 if newline >= 0 else low
+
+    def next_line(self, start):
+        """Return the start of the line after the one at start, or the file size"""
+        end = min(self.size, start + LARGE_FILE_LINE_CAP)
+        newline = self.map.find(b"\n", start, end)
+        return newline + 1 if newline >= 0 else end
+
+    def prev_line(self, start):
+        return self.line_start(start - 1) if start > 0 else 0
+
+    def step(self, start, count):
+        """Move count lines forward (or backward if negative) from start"""
+        for _ in range(abs(count)):
+            moved = self.next_line(start) if count > 0 else self.prev_line(start)
+            if moved == start or moved >= self.size:
+                break
+            start = moved
+        return start
+
+    def last_page(self, lines):
+        """Return the offset of the first line of the final screenful"""
+        return self.step(self.line_start(self.size - 1), -(lines - 1))
+
+    def read_lines(self, start, count):
+        """Return (offsets, text) for up to count lines beginning at start"""
+        offsets, lines = [], []
+        while len(offsets) < count and start < self.size:
+            end = self.next_line(start)
+            offsets.append(start)
+            lines.append(self.map[start:end].decode("utf-8", errors="replace").rstrip("\r\n"))
+            start = end
+        return offsets, "\n".join(lines)
+
+
+class LargeFileView:
+    """Virtualized read-only view of a MappedFile inside the editor's Text widget.
+
+    Only the lines around the viewport live in the widget; scrolling, the
+    scrollbar and offset jumps all move a byte-offset window over the map.
+    """
+
+    BINDTAG = "ZenLargeFile"
+
+    def __init__(self, editor, mapped):
+        self.editor = editor
+        self.text = editor.text
+        self.mapped = mapped
+        self.offsets = []  # Byte offset of each line currently in the widget
+        self.top = 0
+        self.line_index = LineIndex()  # Byte offsets, filled in by a worker thread
+        self.indexed = False
+        self._stop = threading.Event()
+        self._indexer = threading.Thread(target=self._build_index, name="zen-index", daemon=True)
+        self.install_bindings(editor.root)
+
+    @classmethod
+    def install_bindings(cls, root):
+        if getattr(cls, "_bound", False):
+            return
+        for sequence, lines in (("<Up>", -1), ("<Down>", 1)):
+            root.bind_class(cls.BINDTAG, sequence, lambda e, n=lines: cls._dispatch(e, "lines", n))
+        for sequence, pages in (("<Prior>", -1), ("<Next>", 1)):
+            root.bind_class(cls.BINDTAG, sequence, lambda e, n=pages: cls._dispatch(e, "pages", n))
+        root.bind_class(cls.BINDTAG, "<Control-Home>", lambda e: cls._dispatch(e, "moveto", 0))
+        root.bind_class(cls.BINDTAG, "<Control-End>", lambda e: cls._dispatch(e, "moveto", 1))
+        root.bind_class(cls.BINDTAG, "<MouseWheel>", lambda e: cls._dispatch(
+            e, "lines", -3 if e.delta > 0 else 3))
+        root.bind_class(cls.BINDTAG, "<Button-4>", lambda e: cls._dispatch(e, "lines", -3))
+        root.bind_class(cls.BINDTAG, "<Button-5>", lambda e: cls._dispatch(e, "lines", 3))
+        root.bind_class(cls.BINDTAG, "<Configure>", lambda e: cls._dispatch(e, "refresh", 0))
+        cls._bound = True
+
+    @classmethod
+    def _dispatch(cls, event, action, amount):
+        view = getattr(event.widget, "large_view", None)
+        if view is None:
+            return None
+        if action == "lines":
+            view.scroll(amount)
+        elif action == "pages":
+            view.scroll(amount * view.visible_lines())
+        elif action == "moveto":
+            view.moveto(amount)
+        else:
+            view.render(view.top)
+            return None  # Let the widget handle its own resize too
+        return "break"
+
+    def attach(self, scrollbar):
+        self.scrollbar = scrollbar
+        scrollbar.configure(command=self.on_scrollbar)
+        self.text.large_view = self
+        self.text.bindtags((self.BINDTAG,) + self.text.bindtags())
+        self.text.configure(state="normal", wrap="none")
+        self.render(0)
+        self._indexer.start()
+
+    def _build_index(self):
+        step = 4 * 1024 * 1024
+        size = self.mapped.size
+        for position in range(0, size, step):
+            if self._stop.is_set():
+                return
+            chunk = self.mapped.map[position:position + step]
+            self.line_index.extend(LineIndex.scan(chunk, position), position + len(chunk))
+        self.indexed = True
+
+    def index_progress(self):
+        return 100 if self.indexed else self.line_index.size * 100 // max(1, self.mapped.size)
+
+    def goto_line(self, line):
+        self.goto_offset(self.line_index.line_start(line))
+
+    def detach(self):
+        self._stop.set()
+        if self._indexer.is_alive():
+            self._indexer.join(timeout=1.0)
+        self.text.large_view = None
+        self.text.bindtags(tuple(t for t in self.text.bindtags() if t != self.BINDTAG))
+        self.text.configure(state="normal")
+        self.text.delete(1.0, tk.END)
+        self.mapped.close()
+
+    def visible_lines(self):
+        linespace = max(1, self.editor.custom_font.metrics("linespace"))
+        return max(1, self.text.winfo_height() // linespace)
+
+    def render(self, top):
+        """Refill the widget with the window of lines around top"""
+        visible = self.visible_lines()
+        first = self.mapped.step(top, -LARGE_FILE_MARGIN_LINES)
+        self.offsets, content = self.mapped.read_lines(
+            first, visible + 2 * LARGE_FILE_MARGIN_LINES)
+        self.text.configure(state="normal")
+        self.text.delete(1.0, tk.END)
+        self.text.insert(1.0, content)
+        self.text.configure(state="disabled")
+        self._show(self._index_of(top))
+
+    def _index_of(self, offset):
+        # Window offsets are sorted, so a bisect would do; the window is tiny
+        for i, start in enumerate(self.offsets):
+            if start > offset:
+                return max(0, i - 1)
+        return max(0, len(self.offsets) - 1)
+
+    def _show(self, index):
+        self.top = self.offsets[index] if self.offsets else 0
+        self.text.yview(f"{index + 1}.0")
+        self.update_scrollbar()
+
+    def scroll(self, lines):
+        visible = self.visible_lines()
+        current = int(self.text.index("@0,0").split(".")[0]) - 1
+        target = current + lines
+        at_start = not self.offsets or self.offsets[0] == 0
+        at_end = not self.offsets or self.mapped.next_line(self.offsets[-1]) >= self.mapped.size
+        if at_start:
+            target = max(0, target)
+        if at_end:
+            target = min(target, max(0, len(self.offsets) - visible))
+        if 0 <= target <= len(self.offsets) - visible:
+            self._show(target)  # Still inside the rendered window
+        else:
+            top = self.mapped.step(self.top, lines)
+            self.render(min(top, self.mapped.last_page(visible)))
+
+    def moveto(self, fraction):
+        fraction = max(0.0, min(1.0, float(fraction)))
+        limit = self.mapped.last_page(self.visible_lines())
+        self.render(min(self.mapped.line_start(int(fraction * self.mapped.size)), limit))
+
+    def goto_offset(self, offset):
+        self.render(self.mapped.line_start(offset))
+        index = self._index_of(offset)
+        column = len(self.mapped.map[self.offsets[index]:offset].decode("utf-8", errors="replace"))
+        self.text.mark_set(tk.INSERT, f"{index + 1}.{column}")
+
+    def on_scrollbar(self, action, *args):
+        if action == "moveto":
+            self.moveto(args[0])
+        elif action == "scroll":
+            amount = int(args[0])
+            self.scroll(amount * self.visible_lines() if args[1] == "pages" else amount)
+
+    def update_scrollbar(self):
+        size = max(1, self.mapped.size)
+        shown = self.mapped.step(self.top, self.visible_lines()) - self.top
+        first = self.top / size
+        self.scrollbar.set(first, min(1.0, first + max(shown, 1) / size))
+        line = f"line {self.line_index.line_of(self.top):,} - " if self.indexed else ""
+        self.editor.set_status(
+            f"Large file (read-only): {os.path.basename(self.mapped.file_path)} - "
+                 f"{line}offset {self.top:,} of {self.mapped.size:,} ({first * 100:.1f}%)")
+
+
+class BackgroundWriter:
+    """Writes files atomically on a single worker thread.
+
+    Each save goes to a temp file in the target directory, is fsynced and
+    then os.replace()d over the original, so a crash mid-write never leaves
+    a truncated file. Only the newest pending save per path is kept: saves
+    requested while one is in flight coalesce instead of queueing up.
+    """
+
+    def __init__(self):
+        self.results = queue.Queue()  # (path, error, token) tuples for the UI thread
+        self._pending = {}
+        self._busy = False
+        self._lock = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="zen-save", daemon=True)
+        self._thread.start()
+
+    def submit(self, file_path, content, encoding="utf-8", token=None, newline=None, bom=False,
+               compression=None):
+        """Queue content for file_path; token comes back with the result of the write"""
+        with self._lock:
+            # Replaces any older snapshot
+            self._pending[file_path] = (content, encoding, newline, bom, compression, token)
+            self._lock.notify()
+
+    @property
+    def busy(self):
+        with self._lock:
+            return self._busy or bool(self._pending)
+
+    def flush(self, timeout=None):
+        """Wait until every submitted save has been written; returns False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while self._busy or self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._lock.wait(remaining)
+        return True
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._pending:
+                    self._lock.wait()
+                file_path = next(iter(self._pending))
+                content, encoding, newline, bom, compression, token = self._pending.pop(file_path)
+                self._busy = True
+            error = None
+            try:
+                self.write_atomic(file_path, content, encoding, newline, bom, compression)
+            except Exception as e:
+                error = e
+            with self._lock:
+                self._busy = False
+                self._lock.notify_all()
+            self.results.put((file_path, error, token))
+
+    @staticmethod
+    def write_atomic(file_path, content, encoding="utf-8", newline=None, bom=False, compression=None):
+        directory = os.path.dirname(os.path.abspath(file_path))
+        fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(file_path)}.",
+                                         suffix=".tmp", dir=directory)
+        try:
+            with open(fd, "wb") as raw:
+                # Compressed as it is written, so no compressed copy is built in memory
+                stream = open_compressed(raw, compression, "w") if compression else None
+                # newline: "\n" in the content is written as this line ending
+                file = io.TextIOWrapper(stream or raw, encoding=encoding, newline=newline)
+                if bom:
+                    file.write("\ufeff")
+                if isinstance(content, str):
+                    file.write(content)
+                else:
+                    for chunk in content.chunks():  # DocumentSnapshot: no full copy
+                        file.write(chunk)
+                file.flush()
+                file.detach()
+                if stream is not None:
+                    stream.close()  # Writes the format's trailer; raw stays open
+                raw.flush()
+                os.fsync(raw.fileno())
+            try:
+                # mkstemp creates the file 0600; keep the original's permissions
+                os.chmod(temp_path, os.stat(file_path).st_mode & 0o7777)
+            except OSError:
+                pass
+            os.replace(temp_path, file_path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        if hasattr(os, "O_DIRECTORY"):
+            # Persist the rename itself (POSIX only)
+            try:
+                dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+                try:
+                    os.fsync(dir_fd)
+                finally:
+                    os.close(dir_fd)
+            except OSError:
+                pass
+
+
+# External changes: open files are watched on a worker thread, through
+# inotify on Linux and by polling stat() elsewhere
+WATCH_POLL_MS = 1000  # stat() interval where inotify is unavailable
+WATCH_APPEND_MAX_BYTES = 8 * 1024 * 1024  # A file that grew by more is reloaded in full
+
+
+def file_state(file_path):
+    """(device, inode, size, mtime_ns) of a file, or None if it is gone"""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+class Inotify:
+    """Just enough of Linux's inotify, through ctypes; raises OSError elsewhere"""
+
+    MODIFY, ATTRIB, CLOSE_WRITE = 0x2, 0x4, 0x8
+    MOVED_FROM, MOVED_TO, CREATE, DELETE = 0x40, 0x80, 0x100, 0x200
+    Q_OVERFLOW = 0x4000
+    ONLYDIR = 0x1000000
+    # Everything that can change a file, as seen from its directory
+    FILE_EVENTS = MODIFY | ATTRIB | CLOSE_WRITE | MOVED_FROM | MOVED_TO | CREATE | DELETE
+    _EVENT = struct.Struct("iIII")  # wd, mask, cookie, name length
+
+    def __init__(self):
+        if platform.system() != "Linux":
+            raise OSError("inotify is only available on Linux")
+        libc = ctypes.CDLL(None, use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._rm_watch = libc.inotify_rm_watch
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add_watch(self, path, mask):
+        wd = self._add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed: {path}")
+        return wd
+
+    def rm_watch(self, wd):
+        self._rm_watch(self.fd, wd)
+
+    def read(self):
+        """[(wd, mask, name)] of the events waiting to be read"""
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        position = 0
+        while position < len(data):
+            wd, mask, _, length = self._EVENT.unpack_from(data, position)
+            position += self._EVENT.size
+            name = data[position:position + length].rstrip(b"\0")
+            position += length
+            events.append((wd, mask, os.fsdecode(name)))
+        return events
+
+
+class FileWatcher:
+    """Notices when open files change on disk, without using the UI thread.
+
+    One worker thread serves every watched file. With inotify it sleeps
+    until the kernel reports activity in the directory of a watched file
+    (the directory, so replacing a file by renaming another over it is seen
+    too, and one watch covers any number of files in it). Without inotify
+    it stat()s each file every WATCH_POLL_MS. A file is only reported when
+    its identity, size or modification time really changed, and reports
+    are coalesced until the UI collects them, so a burst of writes costs
+    the UI one callback.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._files = {}  # Path -> file_state last seen
+        self._changed = {}  # Path -> file_state, not yet collected by the UI
+        self._dirs = {}  # inotify: directory -> watch descriptor
+        self._wds = {}  # inotify: watch descriptor -> directory
+        try:
+            self._inotify = Inotify()
+        except (OSError, AttributeError):
+            self._inotify = None  # Not Linux, or a libc without inotify: poll
+        self._wake_read = self._wake_write = None  # Pipe written to when there are changes
+        self._root = self._callback = None
+        self._thread = threading.Thread(target=self._run, name="zen-watch", daemon=True)
+        self._thread.start()
+
+    def attach(self, root, callback):
+        """Call callback({path: file_state or None}) on the Tk thread when watched files change"""
+        self._root, self._callback = root, callback
+        if platform.system() == "Windows":
+            root.after(WATCH_POLL_MS, self._poll)  # Tk can't watch pipes there
+        else:
+            self._wake_read, self._wake_write = os.pipe()
+            os.set_blocking(self._wake_read, False)
+            root.tk.createfilehandler(self._wake_read, tk.READABLE, self._wakeup)
+
+    def watch(self, file_path, state):
+        """Watch file_path, whose contents are known as of state; a file
+        already different from state is reported right away"""
+        file_path = os.path.abspath(file_path)
+        directory = os.path.dirname(file_path)
+        with self._lock:
+            self._files[file_path] = state
+            if self._inotify is not None and directory not in self._dirs:
+                try:
+                    wd = self._inotify.add_watch(directory, Inotify.FILE_EVENTS | Inotify.ONLYDIR)
+                    self._dirs[directory] = wd
+                    self._wds[wd] = directory
+                except OSError:
+                    pass  # E.g. out of watches: the file is still checked on overflow
+        self._check([file_path])
+
+    def unwatch(self, file_path):
+        file_path = os.path.abspath(file_path)
+        directory = os.path.dirname(file_path)
+        with self._lock:
+            self._files.pop(file_path, None)
+            self._changed.pop(file_path, None)
+            if (directory in self._dirs
+                    and not any(os.path.dirname(path) == directory for path in self._files)):
+                wd = self._dirs.pop(directory)
+                del self._wds[wd]
+                self._inotify.rm_watch(wd)
+
+    def changes(self):
+        """Collect the changes reported since the last call"""
+        with self._lock:
+            changed, self._changed = self._changed, {}
+        return changed
+
+    def _check(self, paths):
+        for file_path in paths:
+            state = file_state(file_path)
+            with self._lock:
+                if file_path not in self._files or self._files[file_path] == state:
+                    continue
+                self._files[file_path] = state
+                wake = not self._changed
+                self._changed[file_path] = state
+            if wake and self._wake_write is not None:
+                os.write(self._wake_write, b"!")
+
+    def _run(self):
+        inotify = self._inotify
+        while True:
+            if inotify is None:
+                time.sleep(WATCH_POLL_MS / 1000)
+                with self._lock:
+                    paths = list(self._files)
+                self._check(paths)
+                continue
+            select.select([inotify.fd], [], [])
+            paths = set()
+            with self._lock:
+                for wd, mask, name in inotify.read():
+                    if mask & Inotify.Q_OVERFLOW:
+                        paths.update(self._files)  # Events were lost: check everything
+                    elif wd in self._wds:
+                        paths.add(os.path.join(self._wds[wd], name))
+                paths.intersection_update(self._files)
+            self._check(paths)
+
+    def _wakeup(self, fd, mask):
+        try:
+            os.read(self._wake_read, 4096)
+        except BlockingIOError:
+            pass
+        self._deliver()
+
+    def _poll(self):
+        self._root.after(WATCH_POLL_MS, self._poll)
+        self._deliver()
+
+    def _deliver(self):
+        changed = self.changes()
+        if changed and self._callback is not None:
+            self._callback(changed)
+
+
+# Follow mode (tail -F): only what is appended to the file is read, and the
+# oldest lines are dropped past FOLLOW_MAX_LINES, so memory and insert cost
+# stay flat however long the log runs
+FOLLOW_MAX_LINES = 20000
+FOLLOW_READ_BYTES = 1024 * 1024  # Read per main loop tick, so a burst can't stall the UI
+FOLLOW_CATCHUP_BYTES = 8 * 1024 * 1024  # A bigger backlog is skipped, keeping only its tail
+
+
+class LogFollower:
+    """Reads what is appended to a file, following it across rotation.
+
+    Keeps the byte offset read up to and the file's identity. Once the
+    open file is read to the end, the path is checked: a different inode
+    means the log was rotated and the new file is read from its start; a
+    size below the offset means it was truncated in place. Decoding is
+    incremental, so a character or CRLF split between two reads comes out
+    whole.
+    """
+
+    def __init__(self, file_path, encoding, state):
+        self.file_path = file_path
+        self.encoding = encoding
+        self.identity = state[:2]
+        self.offset = state[2]
+        self.dropped = False  # Lines were dropped or replaced: the buffer is no longer the file
+        # Windows won't rename a file that is open, which would break rotation there
+        self._keep_open = platform.system() != "Windows"
+        self._file = None
+        self._reset_decoders()
+
+    def _reset_decoders(self):
+        self._decoder = codecs.getincrementaldecoder(self.encoding)(errors="replace")
+        self._newlines = io.IncrementalNewlineDecoder(None, translate=True)
+        self._skip_line = False  # Started mid-file: drop the partial first line
+
+    def _open(self):
+        self._file = open(self.file_path, "rb")
+        stat = os.fstat(self._file.fileno())
+        if (stat.st_dev, stat.st_ino) != self.identity:
+            self.identity = (stat.st_dev, stat.st_ino)  # Rotated while closed
+            self.offset = 0
+            self._reset_decoders()
+            self.dropped = True  # The buffer still holds the old file's lines
+            return "rotated"
+        return None
+
+    def read(self, limit=FOLLOW_READ_BYTES):
+        """Read newly appended text; returns (text, event, more) where event
+        is None, "rotated" or "truncated" and more says there is more to read"""
+        event = None
+        try:
+            if self._file is None:
+                event = self._open()
+            state = file_state(self.file_path)
+            if state is not None and state[:2] == self.identity and state[2] < self.offset:
+                event = "truncated"
+                self.offset = 0
+                self._reset_decoders()
+                self.dropped = True
+            size = os.fstat(self._file.fileno()).st_size
+            if size - self.offset > FOLLOW_CATCHUP_BYTES:
+                self.offset = size - FOLLOW_CATCHUP_BYTES
+                self._reset_decoders()
+                self._skip_line = self.dropped = True
+            self._file.seek(self.offset)
+            data = self._file.read(limit)
+            if not data and state is not None and state[:2] != self.identity:
+                # The old file is drained: move on to the one now at the path
+                self.close()
+                event = self._open() or event
+                data = self._file.read(limit)
+        except OSError:
+            self.close()  # Rotated away and not recreated yet: wait for it
+            return "", event, False
+        self.offset += len(data)
+        more = len(data) == limit
+        if not self._keep_open:
+            self.close()
+        text = self._newlines.decode(self._decoder.decode(data))
+        if self._skip_line:
+            newline = text.find("\n")
+            if newline < 0:
+                return "", event, more
+            text = text[newline + 1:]
+            self._skip_line = False
+        return text, event, more
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+# Settings are saved this long after the last change, so bursts coalesce
+SETTINGS_SAVE_DELAY_MS = 500
+SETTINGS_SCHEMA_VERSION = 2  # 1: unversioned .zenscript_settings.json next to the executable
+
+
+class SettingsStore:
+    """The editor's settings, cached in memory and kept in the per-user config dir.
+
+    The file is parsed once, at startup. Changes are written a moment after
+    the last one, on a worker thread, atomically, and only if the saved
+    text would actually differ. A file from an older version is rewritten
+    in the current format and place; one from a newer version is used as
+    far as it is understood, but never written over.
+    """
+
+    def __init__(self, root, path, legacy_paths=()):
+        self.root = root
+        self.path = path
+        self._written = None  # Text the file has, or will have once queued writes finish
+        self._latest = None  # Newest text handed to a writer thread
+        self._on_disk = None  # Text the file has (writer threads only)
+        self._job = None
+        self._lock = threading.Lock()  # One write at a time, always of the newest text
+        self.read_only = False  # The file is from a newer version: saving would lose what it added
+        self.data = self._load(legacy_paths)
+        self._on_disk = self._written
+        if self._written is None and self.data and not self.read_only:
+            self._schedule()  # Migrated: write it out in the current format and place
+
+    def _load(self, legacy_paths):
+        for path in (self.path,) + tuple(legacy_paths):
+            try:
+                with open(path, "r", encoding="utf-8") as file:
+                    text = file.read()
+                data = json.loads(text)
+            except (OSError, ValueError):
+                continue
+            if not isinstance(data, dict):
+                continue
+            # Version 1 has the same keys; only the place and the version stamp
+            # changed. The old file is left alone for older builds that read it.
+            version = data.pop("version", 1)
+            if not isinstance(version, int):
+                continue
+            self.read_only = version > SETTINGS_SCHEMA_VERSION
+            if path == self.path and version == SETTINGS_SCHEMA_VERSION:
+                self._written = text
+            return data
+        return {}
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def update(self, **values):
+        """Change settings; a save is scheduled if any value is new"""
+        changed = False
+        for key, value in values.items():
+            if self.data.get(key) != value:
+                self.data[key] = value
+                changed = True
+        if changed:
+            self._schedule()
+
+    def _schedule(self):
+        if self._job is None:
+            self._job = self.root.after(SETTINGS_SAVE_DELAY_MS, self._save)
+
+    def _serialize(self):
+        return json.dumps(dict(self.data, version=SETTINGS_SCHEMA_VERSION), indent=2, sort_keys=True)
+
+    def _save(self, wait=False):
+        self._job = None
+        if self.read_only:
+            return  # Changes last until exit
+        text = self._serialize()
+        if text == self._written:
+            return  # Changed and changed back
+        self._written = self._latest = text
+        if wait:
+            self._write()
+        else:
+            threading.Thread(target=self._write, name="zen-settings", daemon=True).start()
+
+    def _write(self):
+        with self._lock:
+            text = self._latest
+            if text is None or text == self._on_disk:
+                return  # An earlier thread already wrote the newest text
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                BackgroundWriter.write_atomic(self.path, text)
+                self._on_disk = text
+            except OSError:
+                pass  # Settings are best effort
+
+    def flush(self):
+        """Write any pending change now, e.g. on exit"""
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._save(wait=True)
+        else:
+            self._write()  # Wait for a write that is still in flight
+
+
+class SearchJob:
+    """Scans a DocumentSnapshot on a worker thread, streaming match offsets back.
+
+    With a replacement, the job instead builds the replaced text of the span
+    from the first to the last match, so Replace All becomes a single edit.
+    """
+
+    BATCH_MATCHES = 2000
+
+    def __init__(self, snapshot, regex, replacement=None):
+        self.snapshot = snapshot
+        self.regex = regex
+        self.replacement = replacement
+        self.results = queue.SimpleQueue()
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="zen-search", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def _run(self):
+        try:
+            text = self.snapshot.text()  # Joined here so the UI thread never copies it
+            if self.replacement is None:
+                self._find(text)
+            else:
+                self._replace(text)
+        except Exception as e:
+            self.results.put(("error", e))
+
+    def _find(self, text):
+        batch = array("q")
+        for match in self.regex.finditer(text):
+            start, end = match.span()
+            if start == end:
+                continue  # Zero-width matches can't be highlighted or replaced
+            batch.append(start)
+            batch.append(end)
+            if len(batch) >= 2 * self.BATCH_MATCHES:
+                if self._cancelled.is_set():
+                    return
+                self.results.put(("matches", batch))
+                batch = array("q")
+        if not self._cancelled.is_set():
+            self.results.put(("matches", batch))
+            self.results.put(("done", None))
+
+    def _replace(self, text):
+        parts, first, last, count = [], None, 0, 0
+        for match in self.regex.finditer(text):
+            start, end = match.span()
+            if start == end:
+                continue
+            if self._cancelled.is_set():
+                return
+            if first is None:
+                first = last = start
+            parts.append(text[last:start])
+            parts.append(self.replacement(match))
+            last = end
+            count += 1
+        if first is not None:
+            self.results.put(("replace", (first, last, "".join(parts), count)))
+        self.results.put(("done", None))
+
+
+class FindBar:
+    """Find/Replace bar that searches a snapshot of the document off the UI thread.
+
+    Match offsets stream in from a SearchJob; only the matches inside the
+    visible part of the Text widget carry highlight tags, and the tags are
+    reapplied as the view scrolls.
+    """
+
+    MAX_VISIBLE_TAGS = 2000
+    REPLACE_CONTEXT = 4096  # Characters around a match that anchors and lookarounds can see
+
+    def __init__(self, editor):
+        self.editor = editor
+        self.starts = array("q")
+        self.ends = array("q")
+        self.job = None
+        self.regex = None
+        self.current = None  # Index of the selected match
+        self.searched_at = -1  # editor.edit_count the matches belong to
+        self.advance_after_search = False
+        self._search_job = None
+        self._poll_job = None
+        self.visible = False
+        self._build()
+
+    @property
+    def text(self):
+        return self.editor.text  # Follows the active tab
+
+    def _build(self):
+        colors = self.editor.menu_colors
+        self.frame = tk.Frame(self.editor.root, bg=colors["menu_bg"])
+        entry_options = dict(bg=colors["menu_surface"], fg=colors["menu_text"],
+                             insertbackground=colors["menu_text"], borderwidth=1,
+                             relief=tk.FLAT, font=("Consolas", 10))
+        button_options = dict(bg=colors["menu_surface"], fg=colors["menu_text"],
+                              activebackground=colors["menu_surface"],
+                              activeforeground=colors["menu_blue"],
+                              borderwidth=0, relief=tk.FLAT, padx=8)
+        label_options = dict(bg=colors["menu_bg"], fg=colors["menu_text"])
+
+        find_row = tk.Frame(self.frame, bg=colors["menu_bg"])
+        find_row.pack(fill="x", padx=5, pady=(4, 2))
+        tk.Label(find_row, text="Find:", width=8, anchor="w", **label_options).pack(side="left")
+        self.find_var = tk.StringVar()
+        self.find_entry = tk.Entry(find_row, textvariable=self.find_var, **entry_options)
+        self.find_entry.pack(side="left", fill="x", expand=True, padx=(0, 5))
+        tk.Button(find_row, text="Prev", command=self.find_previous, **button_options).pack(side="left")
+        tk.Button(find_row, text="Next", command=self.find_next, **button_options).pack(side="left", padx=2)
+        self.regex_var = tk.BooleanVar(value=False)
+        self.case_var = tk.BooleanVar(value=False)
+        for text, var in (("Regex", self.regex_var), ("Match case", self.case_var)):
+            tk.Checkbutton(find_row, text=text, variable=var, command=self.schedule_search,
+                           selectcolor=colors["menu_surface"],
+                           activebackground=colors["menu_bg"],
+                           activeforeground=colors["menu_blue"], **label_options).pack(side="left")
+        tk.Button(find_row, text="✕", command=self.hide, **button_options).pack(side="right")
+        self.count_label = tk.Label(find_row, text="", width=18, anchor="e", **label_options)
+        self.count_label.pack(side="right")
+
+        self.replace_row = tk.Frame(self.frame, bg=colors["menu_bg"])
+        tk.Label(self.replace_row, text="Replace:", width=8, anchor="w", **label_options).pack(side="left")
+        self.replace_var = tk.StringVar()
+        self.replace_entry = tk.Entry(self.replace_row, textvariable=self.replace_var, **entry_options)
+        self.replace_entry.pack(side="left", fill="x", expand=True, padx=(0, 5))
+        tk.Button(self.replace_row, text="Replace", command=self.replace_one,
+                  **button_options).pack(side="left")
+        tk.Button(self.replace_row, text="Replace All", command=self.replace_all,
+                  **button_options).pack(side="left", padx=2)
+
+        self.find_var.trace_add("write", lambda *a: self.schedule_search())
+        for entry in (self.find_entry, self.replace_entry):
+            entry.bind("<Return>", lambda e: self.find_next())
+            entry.bind("<Shift-Return>", lambda e: self.find_previous())
+            entry.bind("<Escape>", lambda e: (self.hide(), "break")[1])
+
+    # -- Showing and hiding ----------------------------------------------
+
+    def show(self, replace=False):
+        if not self.visible:
+            self.frame.pack(side="bottom", fill="x", after=self.editor.bottom_frame)
+            self.visible = True
+        if replace:
+            self.replace_row.pack(fill="x", padx=5, pady=(0, 4))
+        else:
+            self.replace_row.pack_forget()
+        try:
+            selected = self.text.get(tk.SEL_FIRST, tk.SEL_LAST)
+        except tk.TclError:
+            selected = ""
+        if selected and "\n" not in selected and len(selected) < 200:
+            self.find_var.set(selected)
+        self.find_entry.focus_set()
+        self.find_entry.select_range(0, tk.END)
+        self.schedule_search(delay=0)
+
+    def hide(self):
+        self._cancel()
+        self.frame.pack_forget()
+        self.visible = False
+        self.starts, self.ends = array("q"), array("q")
+        self.text.tag_remove("find_match", "1.0", tk.END)
+        self.text.tag_remove("find_current", "1.0", tk.END)
+        self.text.focus_set()
+
+    # -- Searching -------------------------------------------------------
+
+    def _compile(self):
+        pattern = self.find_var.get()
+        if not pattern:
+            return None
+        flags = 0 if self.case_var.get() else re.IGNORECASE
+        return re.compile(pattern if self.regex_var.get() else re.escape(pattern), flags)
+
+    def schedule_search(self, delay=150):
+        """Restart the search after a short pause in typing"""
+        if self._search_job is not None:
+            self.editor.root.after_cancel(self._search_job)
+        self._search_job = self.editor.root.after(delay, self.search)
+
+    def _prepare(self):
+        """Reset results and compile the pattern; returns False if there is nothing to run"""
+        self._search_job = None
+        self._cancel()
+        self.starts, self.ends = array("q"), array("q")
+        self.current = None
+        self.text.tag_remove("find_match", "1.0", tk.END)
+        self.text.tag_remove("find_current", "1.0", tk.END)
+        if not self.visible or self.editor.large_view is not None or self.editor.loader is not None:
+            return False
+        try:
+            self.regex = self._compile()
+        except re.error as e:
+            self.count_label.config(text="Invalid pattern")
+            self.editor.set_status(f"Invalid pattern: {e}")
+            return False
+        if self.regex is None:
+            self.count_label.config(text="")
+            return False
+        self.searched_at = self.editor.edit_count
+        return True
+
+    def search(self):
+        if self._prepare():
+            self._run(SearchJob(self.editor.document.snapshot(), self.regex), "Searching...")
+
+    def _run(self, job, label):
+        self.job = job.start()
+        self.count_label.config(text=label)
+        self._poll_job = self.editor.root.after(15, self._poll)
+
+    def _cancel(self):
+        if self.job is not None:
+            self.job.cancel()
+            self.job = None
+        if self._poll_job is not None:
+            self.editor.root.after_cancel(self._poll_job)
+            self._poll_job = None
+
+    def _poll(self):
+        self._poll_job = None
+        job = self.job
+        if job is None:
+            return
+        done = False
+        while True:
+            try:
+                kind, payload = job.results.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "matches":
+                self.starts.extend(payload[0::2])
+                self.ends.extend(payload[1::2])
+            elif kind == "replace":
+                self._apply_replace_all(*payload)
+            elif kind == "error":
+                self.editor.set_status(f"Search failed: {payload}")
+                done = True
+            else:
+                done = True
+        count = len(self.starts)
+        self.count_label.config(text=f"{count:,} match{'es' if count != 1 else ''}"
+                                     + ("" if done else "..."))
+        self.refresh_highlights()
+        if done:
+            self.job = None
+            if self.advance_after_search:
+                self.advance_after_search = False
+                self.find_next()
+        else:
+            self._poll_job = self.editor.root.after(15, self._poll)
+
+    # -- Viewport highlighting -------------------------------------------
+
+    def _index(self, offset):
+        index = self.editor.line_index
+        line = index.line_of(offset)
+        return f"{line}.{offset - index.line_start(line)}"
+
+    def refresh_highlights(self):
+        """Tag only the matches that intersect the visible lines"""
+        if not self.visible or self.searched_at != self.editor.edit_count:
+            return
+        self.text.tag_remove("find_match", "1.0", tk.END)
+        if not self.starts:
+            return
+        index = self.editor.line_index
+        top = int(self.text.index("@0,0").split(".")[0])
+        bottom = int(self.text.index(f"@0,{self.text.winfo_height()}").split(".")[0])
+        low = index.line_start(top)
+        high = index.line_start(bottom + 1) if bottom < len(index) else index.size
+        first = bisect.bisect_right(self.ends, low)
+        last = min(bisect.bisect_left(self.starts, high + 1), first + self.MAX_VISIBLE_TAGS)
+        ranges = []
+        for k in range(first, last):
+            ranges.append(self._index(self.starts[k]))
+            ranges.append(self._index(self.ends[k]))
+        if ranges:
+            self.text.tag_add("find_match", *ranges)
+
+    # Edit-listener protocol: any edit makes the offsets stale
+    def on_insert(self, offset, text):
+        if self.visible:
+            self.schedule_search(delay=300)
+
+    def on_delete(self, offset, length):
+        if self.visible:
+            self.schedule_search(delay=300)
+
+    # -- Navigation and replacing ----------------------------------------
+
+    def _cursor_offset(self, mark):
+        line, col = map(int, self.text.index(mark).split("."))
+        return self.editor.line_index.offset(line, col)
+
+    def _select(self, k):
+        self.current = k
+        start, end = self._index(self.starts[k]), self._index(self.ends[k])
+        self.text.tag_remove("find_current", "1.0", tk.END)
+        self.text.tag_remove(tk.SEL, "1.0", tk.END)
+        self.text.tag_add("find_current", start, end)
+        self.text.tag_add(tk.SEL, start, end)
+        self.text.mark_set(tk.INSERT, end)
+        self.text.see(start)
+        self.count_label.config(text=f"{k + 1:,} of {len(self.starts):,}")
+
+    def _results_ready(self):
+        if self.searched_at != self.editor.edit_count or self.job is not None:
+            self.advance_after_search = True
+            if self.searched_at != self.editor.edit_count:
+                self.schedule_search(delay=0)
+            return False
+        return bool(self.starts)
+
+    def find_next(self):
+        if not self._results_ready():
+            return "break"
+        k = bisect.bisect_left(self.starts, self._cursor_offset(tk.INSERT))
+        self._select(k if k < len(self.starts) else 0)
+        return "break"
+
+    def find_previous(self):
+        if not self._results_ready():
+            return "break"
+        try:
+            anchor = self._cursor_offset(tk.SEL_FIRST)
+        except tk.TclError:
+            anchor = self._cursor_offset(tk.INSERT)
+        k = bisect.bisect_left(self.starts, anchor) - 1
+        self._select(k if k >= 0 else len(self.starts) - 1)
+        return "break"
+
+    def _replacement(self):
+        template = self.replace_var.get()
+        if self.regex_var.get():
+            return lambda match: match.expand(template)
+        return lambda match: template
+
+    def replace_one(self):
+        k = self.current
+        if (k is None or self.searched_at != self.editor.edit_count
+                or k >= len(self.starts)):
+            self.find_next()
+            return
+        start, end = self.starts[k], self.ends[k]
+        # Matched again in its surroundings, so ^, $, \b and lookarounds see
+        # what the search saw; it must still be the same span
+        document = self.editor.document
+        first = max(0, start - self.REPLACE_CONTEXT)
+        window = document.slice(first, min(len(document), end + self.REPLACE_CONTEXT))
+        match = self.regex.match(window, start - first)
+        if match is None or match.end() != end - first:
+            self.find_next()
+            return
+        self.text.replace(self._index(start), self._index(end), self._replacement()(match))
+        self.advance_after_search = True
+        self.schedule_search(delay=0)
+
+    def replace_all(self):
+        if self._prepare():
+            self._run(SearchJob(self.editor.document.snapshot(), self.regex, self._replacement()),
+                      "Replacing...")
+
+    def _apply_replace_all(self, first, last, new_text, count):
+        if self.searched_at != self.editor.edit_count:
+            self.editor.set_status("Document changed during Replace All; nothing was replaced")
+            return
+        # One Tk edit over the span of all matches: one undo step, one proxy event
+        self.editor.undo.separator()
+        self.text.replace(self._index(first), self._index(last), new_text)
+        self.editor.undo.separator()
+        self.editor.set_status(f"Replaced {count:,} match{'es' if count != 1 else ''}")
+
+
+FIND_IN_FILES_SKIP_DIRS = {".git", ".hg", ".svn", "__pycache__", "node_modules", ".venv", "venv",
+                           ".tox", ".mypy_cache", ".pytest_cache"}
+FIND_IN_FILES_MAX_PER_FILE = 1000
+FIND_IN_FILES_MAX_RESULTS = 20000
+FIND_IN_FILES_MMAP_BYTES = 16 * 1024 * 1024  # Smaller files are read in one buffered read
+
+def search_files_worker(paths, pattern, flags):
+    """Process-pool entry point: search a batch of files for a bytes regex.
+
+    Returns (scanned_bytes, [(path, [(line, col, byte_offset, line_text), ...]), ...]).
+    Runs in a child process, so it must stay a top-level, picklable function.
+    """
+    regex = re.compile(pattern, flags)
+    scanned, results = 0, []
+    for path in paths:
+        try:
+            with open(path, "rb") as file:
+                size = os.fstat(file.fileno()).st_size
+                if size == 0:
+                    continue
+                if size >= FIND_IN_FILES_MMAP_BYTES:
+                    data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                else:
+                    data = file.read()
+                try:
+                    scanned += size
+                    if b"\0" in data[:8192]:
+                        continue  # Binary file
+                    matches = _search_buffer(data, regex)
+                finally:
+                    if isinstance(data, mmap.mmap):
+                        data.close()
+        except OSError:
+            continue
+        if matches:
+            results.append((path, matches))
+    return scanned, results
+
+def _search_buffer(data, regex):
+    matches = []
+    line, position = 1, 0
+    for match in regex.finditer(data):
+        start = match.start()
+        if match.end() == start:
+            continue
+        line += data[position:start].count(b"\n")
+        position = start
+        line_start = data.rfind(b"\n", 0, start) + 1
+        line_end = data.find(b"\n", start)
+        if line_end < 0:
+            line_end = len(data)
+        text = data[line_start:min(line_end, line_start + 300)].decode("utf-8", errors="replace")
+        col = len(data[line_start:start].decode("utf-8", errors="replace"))
+        matches.append((line, col, start, text.rstrip("\r")))
+        if len(matches) >= FIND_IN_FILES_MAX_PER_FILE:
+            break
+    return matches
+
+
+class FileSearch:
+    """Walks a directory tree and fans batches of files out to a process pool.
+
+    Finished batches land in `results` as ("batch", files, bytes, matches)
+    items, followed by a final ("done", None, None, None).
+    """
+
+    BATCH_FILES = 64
+    BATCH_BYTES = 32 * 1024 * 1024
+
+    def __init__(self, executor, root, pattern, flags, globs=()):
+        self.executor = executor
+        self.root = root
+        self.pattern = pattern
+        self.flags = flags
+        self.globs = globs
+        self.results = queue.SimpleQueue()
+        self.started = time.perf_counter()
+        self._futures = []
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="zen-find-files", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancelled.set()
+        for future, _ in list(self._futures):
+            future.cancel()
+
+    def _walk(self):
+        stack = [self.root]
+        while stack and not self._cancelled.is_set():
+            try:
+                entries = list(os.scandir(stack.pop()))
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in FIND_IN_FILES_SKIP_DIRS:
+                            stack.append(entry.path)
+                    elif entry.is_file():
+                        if not self.globs or any(fnmatch.fnmatch(entry.name, g) for g in self.globs):
+                            yield entry.path, entry.stat().st_size
+                except OSError:
+                    continue
+
+    def _run(self):
+        batch, batch_bytes = [], 0
+        try:
+            for path, size in self._walk():
+                batch.append(path)
+                batch_bytes += size
+                if len(batch) >= self.BATCH_FILES or batch_bytes >= self.BATCH_BYTES:
+                    self._submit(batch)
+                    batch, batch_bytes = [], 0
+                    self._drain(block=False)  # Stream early results while still walking
+            if batch and not self._cancelled.is_set():
+                self._submit(batch)
+            self._drain(block=True)
+        except Exception as e:
+            self.results.put(("error", e, None, None))
+            return
+        if not self._cancelled.is_set():
+            self.results.put(("done", None, None, None))
+
+    def _submit(self, paths):
+        future = self.executor.submit(search_files_worker, paths, self.pattern, self.flags)
+        self._futures.append((future, len(paths)))
+
+    def _drain(self, block):
+        if block:
+            counts = dict(self._futures)
+            for future in futures.as_completed(counts):
+                self._collect(future, counts[future])
+            self._futures = []
+        else:
+            pending = []
+            for future, count in self._futures:
+                if future.done():
+                    self._collect(future, count)
+                else:
+                    pending.append((future, count))
+            self._futures = pending
+
+    def _collect(self, future, count):
+        if self._cancelled.is_set() or future.cancelled():
+            return
+        try:
+            scanned, matches = future.result()
+        except Exception as e:
+            self.results.put(("error", e, None, None))
+            return
+        self.results.put(("batch", count, scanned, matches))
+
+
+class FindInFilesPanel:
+    """Toplevel "Find in Files" window: pattern, root directory and a results list."""
+
+    def __init__(self, editor):
+        self.editor = editor
+        self.search = None
+        self.hits = []  # (path, line, col, byte_offset) per results row
+        self._poll_job = None
+        self._build()
+
+    def _build(self):
+        colors = self.editor.menu_colors
+        self.window = dialog = tk.Toplevel(self.editor.root)
+        dialog.title("Find in Files")
+        dialog.geometry("760x480")
+        center_window(dialog)
+        dialog.configure(bg=colors["menu_bg"])
+        dialog.protocol("WM_DELETE_WINDOW", self.close)
+        label_options = dict(bg=colors["menu_bg"], fg=colors["menu_text"])
+        entry_options = dict(bg=colors["menu_surface"], fg=colors["menu_text"],
+                             insertbackground=colors["menu_text"], borderwidth=1,
+                             font=("Consolas", 10))
+        button_options = dict(bg=colors["menu_surface"], fg=colors["menu_text"],
+                              activebackground=colors["menu_surface"],
+                              activeforeground=colors["menu_blue"],
+                              borderwidth=0, relief=tk.FLAT, padx=10)
+
+        form = tk.Frame(dialog, bg=colors["menu_bg"])
+        form.pack(fill="x", padx=10, pady=(10, 5))
+        form.columnconfigure(1, weight=1)
+        tk.Label(form, text="Find:", **label_options).grid(row=0, column=0, sticky="w")
+        self.pattern_entry = tk.Entry(form, **entry_options)
+        self.pattern_entry.grid(row=0, column=1, sticky="ew", padx=5, pady=2)
+        tk.Label(form, text="In folder:", **label_options).grid(row=1, column=0, sticky="w")
+        self.root_entry = tk.Entry(form, **entry_options)
+        self.root_entry.grid(row=1, column=1, sticky="ew", padx=5, pady=2)
+        start_dir = os.path.dirname(self.editor.current_file_path or "") or os.getcwd()
+        self.root_entry.insert(0, start_dir)
+        tk.Button(form, text="Browse", command=self._browse, **button_options).grid(row=1, column=2)
+        tk.Label(form, text="Files:", **label_options).grid(row=2, column=0, sticky="w")
+        self.glob_entry = tk.Entry(form, **entry_options)
+        self.glob_entry.grid(row=2, column=1, sticky="ew", padx=5, pady=2)
+        self.glob_entry.insert(0, "*")
+
+        options = tk.Frame(dialog, bg=colors["menu_bg"])
+        options.pack(fill="x", padx=10)
+        self.regex_var = tk.BooleanVar(value=False)
+        self.case_var = tk.BooleanVar(value=False)
+        for text, var in (("Regex", self.regex_var), ("Match case", self.case_var)):
+            tk.Checkbutton(options, text=text, variable=var, selectcolor=colors["menu_surface"],
+                           activebackground=colors["menu_bg"],
+                           activeforeground=colors["menu_blue"], **label_options).pack(side="left")
+        tk.Button(options, text="Stop", command=self.stop, **button_options).pack(side="right")
+        tk.Button(options, text="Search", command=self.start,
+                  **button_options).pack(side="right", padx=5)
+
+        results = tk.Frame(dialog, bg=colors["menu_bg"])
+        results.pack(expand=True, fill="both", padx=10, pady=10)
+        scrollbar = tk.Scrollbar(results, orient="vertical")
+        self.listbox = tk.Listbox(results, bg=self.editor.colors["base"], fg=self.editor.colors["text"],
+                                  selectbackground=colors["menu_surface"],
+                                  selectforeground=colors["menu_blue"], borderwidth=0,
+                                  highlightthickness=0, font=("Consolas", 10), activestyle="none",
+                                  yscrollcommand=scrollbar.set)
+        scrollbar.configure(command=self.listbox.yview)
+        scrollbar.pack(side="right", fill="y")
+        self.listbox.pack(side="left", expand=True, fill="both")
+        self.listbox.bind("<Double-Button-1>", lambda e: self._open_selected())
+        self.listbox.bind("<Return>", lambda e: self._open_selected())
+        self.pattern_entry.bind("<Return>", lambda e: self.start())
+        dialog.bind("<Escape>", lambda e: self.stop())
+        self.pattern_entry.focus_set()
+
+    def _browse(self):
+        directory = filedialog.askdirectory(initialdir=self.root_entry.get() or None, parent=self.window)
+        if directory:
+            self.root_entry.delete(0, tk.END)
+            self.root_entry.insert(0, directory)
+
+    def start(self):
+        self.stop()
+        pattern = self.pattern_entry.get()
+        root = self.root_entry.get().strip()
+        if not pattern:
+            return
+        if not os.path.isdir(root):
+            messagebox.showerror("Find in Files", f"Not a folder:\n{root}", parent=self.window)
+            return
+        source = pattern if self.regex_var.get() else re.escape(pattern)
+        flags = 0 if self.case_var.get() else re.IGNORECASE
+        try:
+            source = source.encode("utf-8")
+            re.compile(source, flags)
+        except re.error as e:
+            messagebox.showerror("Find in Files", f"Invalid pattern:\n{e}", parent=self.window)
+            return
+        globs = tuple(g.strip() for g in re.split(r"[;,]", self.glob_entry.get()) if g.strip() not in ("", "*"))
+        self.listbox.delete(0, tk.END)
+        self.hits = []
+        self.files = self.bytes = self.matches = 0
+        self.search = FileSearch(self.editor.process_pool(), root, source, flags, globs).start()
+        self._poll_job = self.window.after(50, self._poll)
+
+    def stop(self):
+        if self.search is not None:
+            self.search.cancel()
+            self._report("stopped")
+            self.search = None
+        if self._poll_job is not None:
+            self.window.after_cancel(self._poll_job)
+            self._poll_job = None
+
+    def close(self):
+        self.stop()
+        self.window.destroy()
+        self.editor.find_in_files = None
+
+    def _poll(self):
+        self._poll_job = None
+        search = self.search
+        if search is None:
+            return
+        rows = []
+        done = False
+        while True:
+            try:
+                kind, files, scanned, found = search.results.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "batch":
+                self.files += files
+                self.bytes += scanned
+                for path, matches in found:
+                    for line, col, offset, text in matches:
+                        self.matches += 1
+                        if len(self.hits) < FIND_IN_FILES_MAX_RESULTS:
+                            self.hits.append((path, line, col, offset))
+                            rows.append(f"{os.path.relpath(path, search.root)}:{line}: {text.strip()}")
+            elif kind == "error":
+                self.editor.set_status(f"Find in Files: {files}")
+            else:
+                done = True
+        if rows:
+            self.listbox.insert(tk.END, *rows)
+        self._report("done" if done else "searching")
+        if done:
+            self.search = None
+        else:
+            self._poll_job = self.window.after(50, self._poll)
+
+    def _report(self, state):
+        elapsed = max(1e-6, time.perf_counter() - self.search.started)
+        megabytes = self.bytes / 1048576
+        self.editor.set_status(
+            f"Find in Files ({state}): {self.files:,} files, {megabytes:,.1f} MB in {elapsed:.2f}s - "
+            f"{megabytes / elapsed:,.1f} MB/s, {self.files / elapsed:,.0f} files/s - "
+            f"{self.matches:,} matches")
+
+    def _open_selected(self):
+        selection = self.listbox.curselection()
+        if selection:
+            path, line, col, offset = self.hits[selection[0]]
+            self.editor.open_file_at(path, line, col, offset)
+
+
+# Syntax token kinds -> keys of the theme's colors dict
+SYNTAX_COLORS = {
+    "keyword": "mauve",
+    "builtin": "sky",
+    "definition": "blue",
+    "decorator": "yellow",
+    "string": "green",
+    "number": "peach",
+    "comment": "overlay0",
+    "key": "blue",
+    "heading": "red",
+    "code": "green",
+    "strong": "peach",
+    "emphasis": "yellow",
+    "link": "sky",
+}
+
+SYNTAX_LANGUAGES = {
+    ".py": "python", ".pyw": "python",
+    ".json": "json",
+    ".md": "markdown", ".markdown": "markdown",
+    ".ini": "ini", ".cfg": "ini", ".conf": "ini", ".toml": "ini",
+}
+
+_UNLEXED = object()  # Start state of a line that hasn't been lexed yet
+
+_PY_KEYWORDS = frozenset(keyword.kwlist) | frozenset(getattr(keyword, "softkwlist", ()))
+_PY_BUILTINS = frozenset(name for name in dir(builtins) if not name.startswith("_"))
+_PY_TOKEN = re.compile(r"""
+    (?P<comment>\#.*)
+  | (?P<triple>[rRbBuUfF]{0,2}(?:\"\"\"|'''))
+  | (?P<string>[rRbBuUfF]{0,2}(?:"(?:[^"\\]|\\.)*"?|'(?:[^'\\]|\\.)*'?))
+  | (?P<number>\b(?:0[xXoObB][0-9a-fA-F_]+|\d[\d_]*(?:\.\d*)?(?:[eE][+-]?\d+)?[jJ]?)\b)
+  | (?P<decorator>^\s*@[\w.]+)
+  | (?P<name>[A-Za-z_]\w*)
+""", re.VERBOSE)
+
+def lex_python(line, state):
+    """Tokens for one line of Python; state is the open triple quote, if any"""
+    tokens, position = [], 0
+    if state is not None:
+        end = line.find(state)
+        if end < 0:
+            return [(0, len(line), "string")], state
+        position = end + 3
+        tokens.append((0, position, "string"))
+        state = None
+    previous = None
+    for match in _PY_TOKEN.finditer(line, position):
+        kind = match.lastgroup
+        start, end = match.span()
+        if kind == "triple":
+            quote = match.group()[-3:]
+            close = line.find(quote, end)
+            if close < 0:
+                tokens.append((start, len(line), "string"))
+                return tokens, quote
+            # Not a real token boundary for the master regex: resume after the close
+            tokens.append((start, close + 3, "string"))
+            tail, state = lex_python(line[close + 3:], None)
+            tokens.extend((s + close + 3, e + close + 3, k) for s, e, k in tail)
+            return tokens, state
+        if kind == "name":
+            word = match.group()
+            if previous in ("def", "class"):
+                tokens.append((start, end, "definition"))
+            elif word in _PY_KEYWORDS:
+                tokens.append((start, end, "keyword"))
+            elif word in _PY_BUILTINS:
+                tokens.append((start, end, "builtin"))
+            previous = word
+            continue
+        tokens.append((start, end, kind))
+        previous = None
+    return tokens, None
+
+_JSON_TOKEN = re.compile(r"""
+    (?P<key>"(?:[^"\\]|\\.)*"(?=\s*:))
+  | (?P<string>"(?:[^"\\]|\\.)*"?)
+  | (?P<number>-?\b\d+(?:\.\d+)?(?:[eE][+-]?\d+)?\b)
+  | (?P<keyword>\b(?:true|false|null)\b)
+""", re.VERBOSE)
+
+def lex_json(line, state):
+    return [(m.start(), m.end(), m.lastgroup) for m in _JSON_TOKEN.finditer(line)], None
+
+_MD_INLINE = re.compile(r"""
+    (?P<code>`[^`]+`)
+  | (?P<strong>\*\*[^*]+\*\*|__[^_]+__)
+  | (?P<emphasis>\*[^*\s][^*]*\*|\b_[^_\s][^_]*_\b)
+  | (?P<link>!?\[[^\]]*\]\([^)]*\))
+""", re.VERBOSE)
+_MD_FENCE = re.compile(r"\s{0,3}(```|~~~)")
+_MD_HEADING = re.compile(r"\s{0,3}#{1,6}(\s|$)")
+_MD_LIST = re.compile(r"\s*(?:[-*+]|\d+[.)])\s")
+
+def lex_markdown(line, state):
+    """Tokens for one line of Markdown; state is the open code fence, if any"""
+    fence = _MD_FENCE.match(line)
+    if state is not None:
+        if fence and fence.group(1) == state:
+            return [(0, len(line), "code")], None
+        return [(0, len(line), "code")], state
+    if fence:
+        return [(0, len(line), "code")], fence.group(1)
+    if _MD_HEADING.match(line):
+        return [(0, len(line), "heading")], None
+    if line.lstrip().startswith(">"):
+        return [(0, len(line), "comment")], None
+    tokens = []
+    marker = _MD_LIST.match(line)
+    if marker:
+        tokens.append((0, marker.end(), "keyword"))
+    tokens.extend((m.start(), m.end(), m.lastgroup) for m in _MD_INLINE.finditer(line))
+    return tokens, None
+
+_INI_LINE = re.compile(r"""
+    (?P<comment>\s*[;\#].*)
+  | (?P<heading>\s*\[[^\]]*\]\s*)
+  | (?P<key>\s*[^=:\s][^=:]*?)\s*[=:]\s*(?P<string>.*)
+""", re.VERBOSE)
+
+def lex_ini(line, state):
+    match = _INI_LINE.match(line)
+    if match is None:
+        return [], None
+    kind = match.lastgroup
+    if kind in ("comment", "heading"):
+        return [(match.start(kind), match.end(kind), kind)], None
+    tokens = [(match.start("key"), match.end("key"), "key")]
+    if match.group("string"):
+        tokens.append((match.start("string"), match.end("string"), "string"))
+    return tokens, None
+
+LEXERS = {"python": lex_python, "json": lex_json, "markdown": lex_markdown, "ini": lex_ini}
+
+_JSON_FORMAT_TOKEN = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[{}\[\],:]|[^\s{}\[\],:"]+')
+
+def format_json_worker(snapshot, indent=JSON_INDENT):
+    """Process-pool entry point: pretty-print a DocumentSnapshot as JSON.
+
+    The text is checked with json.loads, then re-indented token by token,
+    so numbers, escapes and key order come out exactly as they were written.
+    Runs in a child process, so it must stay a top-level, picklable function.
+    """
+    text = snapshot.text()  # Joined here: the editor only hands over its pieces
+    try:
+        json.loads(text)
+    except ValueError as e:
+        # JSONDecodeError would carry the whole document back to the editor
+        raise ValueError(str(e)) from None
+    breaks = ["\n"]  # breaks[depth]: a line break indented to depth
+    out = []
+    append = out.append
+    depth = 0
+    opened = False  # Just after { or [: an empty one stays on its line
+    for token in map(re.Match.group, _JSON_FORMAT_TOKEN.finditer(text)):
+        if opened:
+            opened = False
+            if token == "}" or token == "]":
+                depth -= 1
+                append(token)
+                continue
+            append(breaks[depth])
+        if token == ",":
+            append(",")
+            append(breaks[depth])
+        elif token == ":":
+            append(": ")
+        elif token == "{" or token == "[":
+            depth += 1
+            if depth == len(breaks):
+                breaks.append(breaks[-1] + " " * indent)
+            opened = True
+            append(token)
+        elif token == "}" or token == "]":
+            depth -= 1
+            append(breaks[depth])
+            append(token)
+        else:
+            append(token)
+    return "".join(out) + ("\n" if text.endswith("\n") else "")
+
+
+class SyntaxHighlighter:
+    """Incremental, viewport-driven syntax highlighting for the editor's Text.
+
+    The lexer state at the start of every line is checkpointed. After an
+    edit only the lines from the change until the state converges again are
+    re-lexed, in small after_idle slices; Tk tags are only ever applied to
+    the lines that are on screen.
+    """
+
+    SLICE_SECONDS = 0.004
+    BLOCK_LINES = 256
+
+    def __init__(self, editor):
+        self.editor = editor
+        self.text = editor.text
+        self.lexer = None
+        self.states = []  # states[i]: lexer state at the start of line i + 1
+        self.dirty_from = None  # First line whose end state needs re-lexing
+        self.dirty_until = 0   # Don't trust convergence before this line
+        self.repaint = None    # (first, last) lines whose tags are out of date
+        self._job = None
+
+    def set_language(self, language):
+        self.lexer = LEXERS.get(language)
+        self.reset()
+
+    def language_for(self, file_path):
+        return SYNTAX_LANGUAGES.get(os.path.splitext(file_path or "")[1].lower())
+
+    def reset(self):
+        """Forget all states (new document) and re-lex from the top"""
+        for tag in self.tags():
+            self.text.tag_remove(tag, "1.0", tk.END)
+        lines = len(self.editor.line_index)
+        self.states = [None] + [_UNLEXED] * (lines - 1)
+        self.dirty_from, self.dirty_until = (1, lines) if self.lexer else (None, 0)
+        self.repaint = None
+        self._schedule()
+
+    @staticmethod
+    def tags():
+        return [f"syn_{kind}" for kind in SYNTAX_COLORS]
+
+    def _active(self):
+        return self.lexer is not None and self.editor.large_view is None and self.editor.loader is None
+
+    # Edit-listener protocol. The line index is already up to date here.
+    def on_insert(self, offset, text):
+        self._edited(offset)
+
+    def on_delete(self, offset, length):
+        self._edited(offset)
+
+    def _edited(self, offset):
+        if self.lexer is None:
+            return
+        index = self.editor.line_index
+        line = index.line_of(offset)
+        delta = len(index) - len(self.states)
+        if delta > 0:
+            self.states[line:line] = [_UNLEXED] * delta
+        elif delta < 0:
+            del self.states[line:line - delta]
+        if self.dirty_from is None:
+            self.dirty_from, self.dirty_until = line, line + max(delta, 0)
+        else:
+            if line < self.dirty_from and delta:
+                self.dirty_until += delta  # Lines shifted under the pending range
+            self.dirty_from = min(self.dirty_from, line)
+            self.dirty_until = max(self.dirty_until, line + max(delta, 0))
+        self._mark_repaint(line, line + max(delta, 0))
+        self._schedule()
+
+    def on_viewport(self):
+        if self._active():
+            self.repaint = (1, len(self.states))  # Clipped to the viewport when painted
+            self._schedule()
+
+    def _mark_repaint(self, first, last):
+        if self.repaint is None:
+            self.repaint = (first, last)
+        else:
+            self.repaint = (min(first, self.repaint[0]), max(last, self.repaint[1]))
+
+    def _schedule(self):
+        if self._job is None and self.lexer is not None:
+            self._job = self.editor.root.after_idle(self._work)
+
+    def _lines(self, first, count):
+        """Text of count lines starting at first, read from the document model.
+
+        Lines over LONG_LINE_CHARS are cut short: lexing a whole one would
+        stall the UI, and all but its start is folded away anyway.
+        """
+        index = self.editor.line_index
+        document = self.editor.document
+        last = min(first + count, len(index) + 1)
+        end = index.line_start(last) if last <= len(index) else index.size
+        if not index.long_lines(LONG_LINE_CHARS, first, last - 1):
+            return document.slice(index.line_start(first), end).split("\n")[:last - first]
+        lines = []
+        for line in range(first, last):
+            start = index.line_start(line)
+            stop = index.line_start(line + 1) if line < len(index) else index.size
+            lines.append(document.slice(start, min(stop, start + LONG_LINE_CHARS)).rstrip("\n"))
+        return lines
+
+    def _work(self):
+        self._job = None
+        if not self._active():
+            return
+        deadline = time.perf_counter() + self.SLICE_SECONDS
+        lex, states = self.lexer, self.states
+        while self.dirty_from is not None and time.perf_counter() < deadline:
+            line = self.dirty_from
+            for text in self._lines(line, self.BLOCK_LINES):
+                _, state = lex(text, states[line - 1])
+                if line >= len(states):
+                    self.dirty_from = None  # Reached the end of the document
+                    break
+                if line >= self.dirty_until and states[line] == state:
+                    self.dirty_from = None  # Converged with the old states
+                    break
+                states[line] = state
+                line += 1
+                self._mark_repaint(line, line)
+            else:
+                self.dirty_from = line
+        self._paint()
+        if self.dirty_from is not None:
+            self._schedule()
+
+    def _paint(self):
+        """Re-tag the out-of-date lines that are both visible and already lexed"""
+        if self.repaint is None:
+            return
+        top = int(self.text.index("@0,0").split(".")[0])
+        bottom = int(self.text.index(f"@0,{self.text.winfo_height()}").split(".")[0])
+        first = max(self.repaint[0], top)
+        last = min(self.repaint[1], bottom)
+        # Off-screen lines are repainted by on_viewport when they scroll in;
+        # only visible lines the lexer hasn't reached yet stay pending
+        pending = None
+        if self.dirty_from is not None and last >= self.dirty_from:
+            pending = (max(first, self.dirty_from), last)
+            last = self.dirty_from - 1
+        self.repaint = pending
+        if first > last:
+            return
+        ranges = {}
+        for number, text in enumerate(self._lines(first, last - first + 1), first):
+            tokens, _ = self.lexer(text, self.states[number - 1])
+            for start, end, kind in tokens:
+                ranges.setdefault(kind, []).extend((f"{number}.{start}", f"{number}.{end}"))
+        for tag in self.tags():
+            self.text.tag_remove(tag, f"{first}.0", f"{last}.end")
+        for kind, spans in ranges.items():
+            self.text.tag_add(f"syn_{kind}", *spans)
+
+
+# Undo history. Edits made while handling one event form one undo step, and
+# consecutive single-character typing or deleting merges into a run.
+UNDO_MEMORY_MB = 64            # Default budget; "undo_memory_mb" in the settings file
+UNDO_SPILL_MB = 512            # Older steps beyond the budget go to a temp file up to this size
+UNDO_COALESCE_MS = 1000        # A pause this long ends a typing run
+UNDO_COMPRESS_CHARS = 64 * 1024  # Deleted text at least this long is kept zlib-compressed
+UNDO_OP_BYTES = 100            # Estimated overhead of one recorded edit
+
+
+class _UndoStep:
+    """One undo (or redo) step: the edits that revert it, in the order they were made"""
+
+    __slots__ = ("ops", "cost", "spilled", "time", "sealed")
+
+    def __init__(self):
+        self.ops = []       # [kind, offset, length or packed text]; None while spilled
+        self.cost = 0
+        self.spilled = None  # (position, size) in the spill file
+        self.time = time.monotonic()
+        self.sealed = False
+
+
+class _UndoStack(collections.deque):
+    """Undo or redo steps, oldest first. The oldest may be spilled to a temp
+    file of the stack's own, which is used as a stack too: a step is read
+    back only once every newer one has been"""
+
+    def __init__(self):
+        super().__init__()
+        self.file = None
+        self.end = 0  # Bytes in use in the file
+        self.spilled = 0  # Spilled steps are always the oldest ones
+
+
+class UndoManager:
+    """Bounded, coalescing undo/redo history for the editor's Text.
+
+    Each step stores only what reverting it needs: an insert is undone by
+    deleting its length, so pastes cost almost nothing, and a delete keeps
+    the removed text, compressed when it is large. Replaying a step yields
+    the step that reverts it again, which goes onto the other stack. When
+    the steps in memory (undo and redo) exceed the budget the oldest of
+    each stack are spilled to a temp file, and once those are full they
+    are dropped.
+    """
+
+    def __init__(self, editor, budget_mb=UNDO_MEMORY_MB):
+        self.editor = editor
+        self.budget = budget_mb * 1024 * 1024
+        self.undo_steps = _UndoStack()
+        self.redo_steps = _UndoStack()
+        self.memory = 0  # Estimated bytes held by steps in memory
+        self.recording = True  # Off while replaying a step or replacing the whole document
+        self._seal_job = None
+
+    # -- Recording (called by the editor with the line index up to date) --
+
+    def record_insert(self, offset, text):
+        self._record("delete", offset, len(text), len(text))
+
+    def record_delete(self, offset, text):
+        self._record("insert", offset, self._pack(text), len(text))
+
+    def _record(self, kind, offset, data, length):
+        if self.redo_steps:
+            self._drop(self.redo_steps)
+        step = self.undo_steps[-1] if self.undo_steps else None
+        if step is None or (step.sealed and not self._extends(step, kind, offset, length)):
+            step = _UndoStep()
+            self.undo_steps.append(step)
+        elif step.sealed:
+            self._merge(step, kind, offset, data, length)
+            return
+        step.ops.append([kind, offset, data])
+        self._charge(step, self._cost(data))
+        if self._seal_job is None:
+            self._seal_job = self.editor.root.after_idle(self._seal)
+
+    def _extends(self, step, kind, offset, length):
+        """Whether a one-character edit continues the typing run in step"""
+        if (length != 1 or step.ops is None or len(step.ops) != 1 or step.ops[0][0] != kind
+                or time.monotonic() - step.time > UNDO_COALESCE_MS / 1000):
+            return False
+        _, start, data = step.ops[0]
+        if kind == "delete":  # Typing: the new character lands right after the run
+            return offset == start + data
+        if isinstance(data, bytes):
+            return False
+        return offset == start or offset + 1 == start  # Delete forward, or backspace
+
+    def _merge(self, step, kind, offset, data, length):
+        op = step.ops[0]
+        if kind == "delete":
+            op[2] += 1
+        else:
+            before = self._cost(op[2])
+            op[2] = op[2] + data if offset == op[1] else data + op[2]
+            op[1] = min(op[1], offset)
+            self._charge(step, self._cost(op[2]) - before)
+        step.time = time.monotonic()
+
+    def _seal(self):
+        """End the step recorded while handling the current event"""
+        self._seal_job = None
+        if self.undo_steps:
+            self.undo_steps[-1].sealed = True
+
+    def separator(self):
+        """Force the next edit into a new step"""
+        self._seal()
+
+    # -- Undo / redo -----------------------------------------------------
+
+    def undo(self):
+        return self._replay(self.undo_steps, self.redo_steps)
+
+    def redo(self):
+        return self._replay(self.redo_steps, self.undo_steps)
+
+    def _replay(self, source, target):
+        if not source:
+            return False
+        self._seal()
+        step = source.pop()
+        if step.spilled is None:
+            self.memory -= step.cost
+        ops = self._load(source, step)
+        inverse = _UndoStep()
+        inverse.sealed = True
+        editor = self.editor
+        self.recording = False
+        try:
+            for kind, offset, data in reversed(ops):
+                if kind == "delete":
+                    text = editor.document.slice(offset, offset + data)
+                    editor.text.delete(self._index(offset), self._index(offset + data))
+                    inverse.ops.append(["insert", offset, self._pack(text)])
+                else:
+                    text = self._unpack(data)
+                    editor.text.insert(self._index(offset), text)
+                    inverse.ops.append(["delete", offset, len(text)])
+                    offset += len(text)
+                editor.text.mark_set(tk.INSERT, self._index(offset))
+        finally:
+            self.recording = True
+        target.append(inverse)
+        self._charge(inverse, sum(self._cost(op[2]) for op in inverse.ops))
+        editor.text.see(tk.INSERT)
+        return True
+
+    def clear(self):
+        self._drop(self.undo_steps)
+        self._drop(self.redo_steps)
+        self.memory = 0
+
+    def spill(self):
+        """Move the history out of memory, e.g. while its tab is in the background"""
+        self._enforce_budget(0)
+
+    @property
+    def spilled(self):
+        """Bytes of history in the spill files"""
+        return self.undo_steps.end + self.redo_steps.end
+
+    def footprint(self):
+        return (f"{len(self.undo_steps):,} undo / {len(self.redo_steps):,} redo steps, "
+                f"{self.memory / 1048576:.1f} MB in memory"
+                + (f", {self.spilled / 1048576:.1f} MB on disk" if self.spilled else ""))
+
+    # -- Storage ---------------------------------------------------------
+
+    def _index(self, offset):
+        index = self.editor.line_index
+        line = index.line_of(offset)
+        return f"{line}.{offset - index.line_start(line)}"
+
+    @staticmethod
+    def _pack(text):
+        if len(text) >= UNDO_COMPRESS_CHARS:
+            return zlib.compress(text.encode("utf-8", "surrogatepass"), 1)
+        return text
+
+    @staticmethod
+    def _unpack(data):
+        if isinstance(data, bytes):
+            return zlib.decompress(data).decode("utf-8", "surrogatepass")
+        return data
+
+    @staticmethod
+    def _cost(data):
+        # getsizeof is O(1) for str and bytes and includes their real width
+        return UNDO_OP_BYTES + (0 if isinstance(data, int) else sys.getsizeof(data))
+
+    def _charge(self, step, cost):
+        step.cost += cost
+        self.memory += cost
+        if self.memory > self.budget:
+            self._enforce_budget()
+
+    def _drop(self, steps):
+        for step in steps:
+            if step.spilled is None:
+                self.memory -= step.cost
+        steps.clear()
+        steps.spilled = steps.end = 0
+        if steps.file is not None:
+            steps.file.close()
+            steps.file = None
+
+    def _enforce_budget(self, budget=None):
+        budget = self.budget if budget is None else budget
+        limit = UNDO_SPILL_MB * 1024 * 1024
+        for steps in (self.undo_steps, self.redo_steps):
+            # Never the newest step: it may still be growing, or is the next to replay
+            while self.memory > budget and steps.spilled < len(steps) - 1:
+                step = steps[steps.spilled]
+                data = marshal.dumps(step.ops)
+                if self.spilled + len(data) > limit:
+                    self._forget_spilled(steps)  # Disk budget used up: the oldest history goes
+                    if self.spilled + len(data) > limit:
+                        steps.popleft()  # Too big to keep anywhere
+                        self.memory -= step.cost
+                        continue
+                if steps.file is None:
+                    steps.file = tempfile.TemporaryFile(prefix="zen-undo-")
+                steps.file.seek(steps.end)
+                steps.file.write(data)
+                step.spilled = (steps.end, len(data))
+                step.ops = None
+                steps.end += len(data)
+                steps.spilled += 1
+                self.memory -= step.cost
+
+    @staticmethod
+    def _forget_spilled(steps):
+        for _ in range(steps.spilled):
+            steps.popleft()
+        steps.spilled = steps.end = 0
+        if steps.file is not None:
+            steps.file.truncate(0)
+
+    @staticmethod
+    def _load(steps, step):
+        if step.spilled is None:
+            return step.ops
+        position, size = step.spilled
+        steps.file.seek(position)
+        ops = marshal.loads(steps.file.read(size))
+        step.spilled = None
+        # Popped from the newest end, so it was the newest spilled step
+        steps.spilled -= 1
+        steps.end = position
+        return ops
+
+
+# Performance HUD (Options > Performance HUD). Nothing is timed while it's off.
+PERF_HEARTBEAT_MS = 20       # Main-loop heartbeat used to detect stalls
+PERF_STALL_MS = 50           # A heartbeat at least this late counts as a stall
+PERF_HUD_REFRESH_MS = 500
+PERF_SAMPLES = 1000          # Recent latencies the percentiles are computed over
+PERF_TRACE_EVENTS = 200000   # Trace events kept for export (oldest are dropped)
+
+_tk_after = tk.Misc.after  # Untraced: the monitor's own timers must not time themselves
+
+
+class PerfMonitor:
+    """Input-latency instrumentation behind the performance HUD.
+
+    While enabled it records keypress-to-idle latency (a bindtag in front of
+    the Text's), main-loop stalls (a late heartbeat), key binding handlers
+    and every after()/after_idle() callback, as Chrome trace events. While
+    disabled the only cost is one attribute check per bound key.
+    """
+
+    BINDTAG = "ZenPerf"
+
+    def __init__(self, editor):
+        self.editor = editor
+        self.root = editor.root
+        self.enabled = False
+        self.events = collections.deque(maxlen=PERF_TRACE_EVENTS)
+        self.key_latencies = collections.deque(maxlen=PERF_SAMPLES)
+        self.stalls = 0
+        self.longest_stall = 0.0
+        self.slowest_callback = (0.0, "")
+        self.epoch = time.perf_counter()
+        self.hud = None
+        self._heartbeat_due = None
+        self._heartbeat_job = None
+        self._hud_job = None
+        self._class_bound = False
+
+    def bind(self, widget, sequence, func, add=None):
+        """widget.bind() with the handler timed while the monitor is enabled"""
+        name = f"key {sequence}"
+
+        def handler(event):
+            if not self.enabled:
+                return func(event)
+            start = time.perf_counter()
+            try:
+                return func(event)
+            finally:
+                self._complete("binding", name, start)
+
+        return widget.bind(sequence, handler, add)
+
+    def toggle(self):
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+
+    def enable(self):
+        if self.enabled:
+            return
+        self.enabled = True
+        if not self._class_bound:
+            self.root.bind_class(self.BINDTAG, "<KeyPress>", self._on_key)
+            self._class_bound = True
+        for text in self.editor.text_widgets():
+            self.attach(text)
+        monitor = self
+
+        def traced_after(widget, ms, func=None, *args):
+            if func is None:
+                return _tk_after(widget, ms)  # Plain sleep
+            name = getattr(func, "__qualname__", None) or repr(func)
+
+            def timed(*call_args):
+                start = time.perf_counter()
+                try:
+                    return func(*call_args)
+                finally:
+                    monitor._complete("after", name, start)
+
+            return _tk_after(widget, ms, timed, *args)
+
+        tk.Misc.after = traced_after  # after_idle() goes through after() too
+        if self.hud is None:
+            self.hud = tk.Label(self.editor.bottom_frame, anchor="e",
+                                bg=self.editor.menu_colors["menu_bg"],
+                                fg=self.editor.colors.get("blue", "#89b4fa"),
+                                font=("Consolas", 9))
+        self.hud.pack(side="right", padx=5, pady=(0, 2))
+        self._heartbeat_due = time.perf_counter() + PERF_HEARTBEAT_MS / 1000
+        self._heartbeat_job = _tk_after(self.root, PERF_HEARTBEAT_MS, self._heartbeat)
+        self._hud_job = _tk_after(self.root, PERF_HUD_REFRESH_MS, self._refresh_hud)
+        self._render_hud()
+
+    def attach(self, text):
+        """Time key presses in a Text; every tab's widget is attached while enabled"""
+        text.bindtags((self.BINDTAG,) + text.bindtags())
+
+    def disable(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        tk.Misc.after = _tk_after
+        for text in self.editor.text_widgets():
+            text.bindtags(tuple(t for t in text.bindtags() if t != self.BINDTAG))
+        self.root.after_cancel(self._heartbeat_job)
+        self.root.after_cancel(self._hud_job)
+        self.hud.pack_forget()
+
+    def _complete(self, category, name, start, args=None):
+        """Record a finished span that started at perf_counter() time start"""
+        now = time.perf_counter()
+        event = {"name": name, "cat": category, "ph": "X", "pid": os.getpid(), "tid": 1,
+                 "ts": round((start - self.epoch) * 1e6), "dur": round((now - start) * 1e6)}
+        if args:
+            event["args"] = args
+        self.events.append(event)
+        if category in ("after", "binding") and now - start > self.slowest_callback[0]:
+            self.slowest_callback = (now - start, name)
+        return now - start
+
+    def _on_key(self, event):
+        start = time.perf_counter()
+        keysym = event.keysym
+
+        # The handlers for this key and the Text's redisplay (itself an idle
+        # callback queued by the edit) run before the second idle pass
+        def idle():
+            _tk_after(self.root, "idle", done)
+
+        def done():
+            if self.enabled:
+                self.key_latencies.append(self._complete("latency", "keypress", start, {"keysym": keysym}))
+
+        _tk_after(self.root, "idle", idle)
+
+    def _heartbeat(self):
+        now = time.perf_counter()
+        late = now - self._heartbeat_due
+        if late * 1000 >= PERF_STALL_MS:
+            self.stalls += 1
+            self.longest_stall = max(self.longest_stall, late)
+            self._complete("stall", "main loop stall", self._heartbeat_due)
+        self._heartbeat_due = now + PERF_HEARTBEAT_MS / 1000
+        self._heartbeat_job = _tk_after(self.root, PERF_HEARTBEAT_MS, self._heartbeat)
+
+    def _refresh_hud(self):
+        self._render_hud()
+        self._hud_job = _tk_after(self.root, PERF_HUD_REFRESH_MS, self._refresh_hud)
+
+    def percentile(self, fraction):
+        samples = sorted(self.key_latencies)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+    def _render_hud(self):
+        p50, p99 = self.percentile(0.5), self.percentile(0.99)
+        keys = "key→idle --" if p50 is None else f"key→idle p50 {p50 * 1000:.1f} ms  p99 {p99 * 1000:.1f} ms"
+        parts = [keys, f"stalls {self.stalls}"]
+        if self.stalls:
+            parts[-1] += f" (max {self.longest_stall * 1000:.0f} ms)"
+        journal = self.editor.journal
+        if journal and journal.recorded:
+            parts.append(f"journal {journal.mean_record_us:.1f} µs/edit")
+        if self.slowest_callback[1]:
+            parts.append(f"slowest {self.slowest_callback[1]} {self.slowest_callback[0] * 1000:.1f} ms")
+        self.hud.config(text="  ·  ".join(parts))
+
+    def export_trace(self, file_path):
+        """Write the recorded events as Chrome trace-event JSON (chrome://tracing, Perfetto)"""
+        trace = {"traceEvents": list(self.events), "displayTimeUnit": "ms",
+                 "otherData": {"application": "zen.script"}}
+        with open(file_path, "w", encoding="utf-8") as file:
+            json.dump(trace, file)
+
+
+# Widget options set by the theme, by role: option -> palette key. A palette
+# is the editor's colors merged with its menu_colors.
+THEME_ROLES = {
+    "background": {"-bg": "base"},  # The root window and the text area around the Text
+    "text": {"-bg": "base", "-fg": "text", "-insertbackground": "blue",
+             "-selectbackground": "surface0", "-selectforeground": "text",
+             "-inactiveselectbackground": "surface0"},
+    "tag find_match": {"-background": "overlay0"},
+    "tag find_current": {"-background": "blue", "-foreground": "base"},
+    **{f"tag syn_{kind}": {"-foreground": color_key} for kind, color_key in SYNTAX_COLORS.items()},
+    "status": {"-bg": "menu_bg", "-fg": "subtext0"},
+    "chrome": {"-bg": "menu_bg"},  # Bottom bar and menu bar frames
+    "menubutton": {"-bg": "menu_bg", "-fg": "menu_text",
+                   "-activebackground": "menu_surface", "-activeforeground": "menu_blue"},
+}
+
+
+class ThemeEngine:
+    """Applies palettes to registered widgets, writing only what changed.
+
+    Each palette is compiled once into the option values of every role.
+    Applying one diffs it against the palette already on screen and sends
+    the changed options for all widgets as a single Tcl script, so a theme
+    switch is one round trip however many tabs are open.
+    """
+
+    def __init__(self, root, roles=THEME_ROLES):
+        self.root = root
+        self.roles = roles
+        self.targets = collections.defaultdict(list)  # Role -> Tcl command prefixes
+        self.current = {}  # Role -> {option: value} on screen
+        self._compiled = {}  # Palette items -> compiled roles
+
+    def compile(self, palette):
+        key = tuple(sorted(palette.items()))
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            fallback = palette.get("text")
+            compiled = {role: {option: palette.get(color_key, fallback)
+                               for option, color_key in options.items()}
+                        for role, options in self.roles.items()}
+            self._compiled[key] = compiled
+        return compiled
+
+    @staticmethod
+    def _script(prefix, options):
+        # Colors are validated hex or Tk names, so brace quoting is enough
+        return prefix + "".join(f" {option} {{{value}}}" for option, value in options.items())
+
+    def register(self, *targets):
+        """Theme (role, Tcl command prefix) targets, e.g. ("text", ".!text configure")"""
+        lines = []
+        for role, prefix in targets:
+            self.targets[role].append(prefix)
+            if self.current.get(role):
+                lines.append(self._script(prefix, self.current[role]))
+        if lines:
+            self.root.tk.eval("\n".join(lines))
+
+    def forget(self, widget):
+        """Drop every target of a widget that is being destroyed"""
+        widget = str(widget) + " "
+        for prefixes in self.targets.values():
+            prefixes[:] = [prefix for prefix in prefixes if not prefix.startswith(widget)]
+
+    def apply(self, palette):
+        compiled = self.compile(palette)
+        lines = []
+        for role, options in compiled.items():
+            current = self.current.get(role, {})
+            changed = {option: value for option, value in options.items() if current.get(option) != value}
+            if changed:
+                lines.extend(self._script(prefix, changed) for prefix in self.targets[role])
+        self.current = compiled
+        if lines:
+            self.root.tk.eval("\n".join(lines))
+
+
+# Font catalog: every installed family and whether it is monospace. Built
+# once, in the background, and cached on disk until a font directory changes.
+FONT_CATALOG_DELAY_MS = 3000   # Let startup and a file opened on the command line go first
+FONT_CATALOG_SLICE_MS = 10     # Max time spent measuring fonts per main loop tick
+FONT_CATALOG_VERSION = 1
+FONT_MONOSPACE_PROBE = "iMW0."  # A family is monospace if these all measure the same
+
+
+def font_dirs():
+    """Directories the platform's font system loads fonts from."""
+    system = platform.system()
+    if system == "Windows":
+        dirs = [os.path.join(os.environ.get("WINDIR", "C:\\Windows"), "Fonts")]
+        if os.environ.get("LOCALAPPDATA"):
+            dirs.append(os.path.join(os.environ["LOCALAPPDATA"], "Microsoft", "Windows", "Fonts"))
+        return dirs
+    if system == "Darwin":
+        return ["/System/Library/Fonts", "/Library/Fonts", os.path.expanduser("~/Library/Fonts")]
+    data_home = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+    return ["/usr/share/fonts", "/usr/local/share/fonts",
+            os.path.expanduser("~/.fonts"), os.path.join(data_home, "fonts")]
+
+def font_dirs_fingerprint(salt=""):
+    """Digest of the font directory trees. Installing or removing a font
+    changes the modification time of the directory it is in, so only the
+    directories are stat()ed, never the font files themselves."""
+    entries = [salt]
+    for top in font_dirs():
+        for path, _, _ in os.walk(top):
+            try:
+                entries.append(f"{path}\0{os.stat(path).st_mtime_ns}")
+            except OSError:
+                pass
+    data = "\n".join(entries).encode("utf-8", "surrogateescape")
+    return f"{len(entries)}-{zlib.crc32(data):08x}-{zlib.adler32(data):08x}"
+
+
+class FontCatalog:
+    """The installed font families, with the monospace ones marked.
+
+    Listing the families and measuring each one can take seconds with
+    thousands of fonts installed, so it is done once, after startup, in
+    small slices on the main loop (Tk fonts can't be used from another
+    thread). The result is saved and reused as long as the fingerprint of
+    the font directories, computed on a worker thread, still matches.
+    """
+
+    def __init__(self, root, path):
+        self.root = root
+        self.path = path
+        self.families = None  # [(family, monospace)] sorted by name, once ready
+        self._listeners = []
+        self._state = "idle"  # -> waiting -> checking -> measuring -> ready
+        self._job = None
+        self._cached = None  # (fingerprint, families or None) from the worker thread
+        self._fingerprint = None
+        self._pending = None  # Families still to measure
+        self._measured = []
+
+    @property
+    def ready(self):
+        return self._state == "ready"
+
+    def start(self, delay_ms=FONT_CATALOG_DELAY_MS):
+        """Load or build the catalog in the background; a shorter delay
+        brings forward a start that is already scheduled"""
+        if self._state == "waiting" and delay_ms < FONT_CATALOG_DELAY_MS:
+            self.root.after_cancel(self._job)
+            self._state = "idle"
+        if self._state == "idle":
+            self._state = "waiting"
+            self._job = self.root.after(delay_ms, self._check_cache)
+
+    def when_ready(self, callback):
+        """Call callback once the catalog is ready (now, if it already is)"""
+        if self.ready:
+            callback()
+        else:
+            self._listeners.append(callback)
+            self.start(0)
+
+    def ordered(self):
+        """Family names, monospace ones first"""
+        return ([family for family, mono in self.families if mono] +
+                [family for family, mono in self.families if not mono])
+
+    @property
+    def monospace_count(self):
+        return sum(1 for _, mono in self.families if mono)
+
+    def _check_cache(self):
+        self._state = "checking"
+        # Tk's font system and version decide which families it reports
+        salt = f"{self.root.tk.call('tk', 'windowingsystem')} {self.root.tk.call('info', 'patchlevel')}"
+        threading.Thread(target=self._read_cache, args=(salt,), name="zen-fonts", daemon=True).start()
+        self._job = self.root.after(50, self._poll_cache)
+
+    def _read_cache(self, salt):
+        fingerprint = font_dirs_fingerprint(salt)
+        families = None
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+            if (data.get("version") == FONT_CATALOG_VERSION and data.get("fingerprint") == fingerprint):
+                families = [(str(family), bool(mono)) for family, mono in data["families"]]
+        except (OSError, ValueError, TypeError, KeyError, AttributeError):
+            pass  # Missing, stale or damaged: rebuild it
+        self._cached = (fingerprint, families)
+
+    def _poll_cache(self):
+        if self._cached is None:
+            self._job = self.root.after(50, self._poll_cache)
+            return
+        self._fingerprint, families = self._cached
+        self._cached = None
+        if families is not None:
+            self._finish(families)
+            return
+        names = {name for name in self.root.tk.splitlist(self.root.tk.call("font", "families"))
+                 if not name.startswith("@")}  # "@" families are Windows' vertical variants
+        self._pending = collections.deque(sorted(names, key=str.casefold))
+        self._measured = []
+        self._state = "measuring"
+        self._job = self.root.after_idle(self._measure)
+
+    def _is_monospace(self, family):
+        spec = (family, -16)  # Pixels, so the result doesn't depend on the display's scaling
+        widths = {self.root.tk.call("font", "measure", spec, char * 8) for char in FONT_MONOSPACE_PROBE}
+        return len(widths) == 1
+
+    def _measure(self):
+        deadline = time.perf_counter() + FONT_CATALOG_SLICE_MS / 1000
+        while self._pending and time.perf_counter() < deadline:
+            family = self._pending.popleft()
+            try:
+                self._measured.append((family, self._is_monospace(family)))
+            except tk.TclError:
+                pass
+        if self._pending:
+            self._job = self.root.after_idle(self._measure)
+        else:
+            self._finish(self._measured)
+            self._save()
+
+    def _finish(self, families):
+        self._job = None
+        self._pending = None
+        self._measured = []
+        self.families = families
+        self._state = "ready"
+        listeners, self._listeners = self._listeners, []
+        for callback in listeners:
+            callback()
+
+    def _save(self):
+        text = json.dumps({"version": FONT_CATALOG_VERSION, "fingerprint": self._fingerprint,
+                           "families": self.families})
+        threading.Thread(target=self._write, args=(text,), name="zen-fonts", daemon=True).start()
+
+    def _write(self, text):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            BackgroundWriter.write_atomic(self.path, text)
+        except OSError:
+            pass  # The catalog is rebuilt next time
+
+
+# Tabs. Only the active tab and the most recently used ones keep a Text
+# widget; the others are held as compressed snapshots until shown again.
+TAB_MATERIALIZED = 4            # Tabs with a live Text widget, the active one included
+TAB_SNAPSHOT_MEMORY_MB = 256    # Compressed background buffers kept in memory; the rest spill to disk
+TAB_SNAPSHOT_BLOCK_CHARS = 1024 * 1024  # Compression (and restore) unit
+# Next/previous tab; X11 reports Shift+Tab as ISO_Left_Tab
+TAB_CYCLE_KEYS = (("<Control-Tab>", 1), ("<Control-Shift-Tab>", -1), ("<Control-ISO_Left_Tab>", -1))
+
+
+def _text_blocks(snapshot, size):
+    """Yield a DocumentSnapshot's text in blocks of about size characters"""
+    pending, pending_size = [], 0
+    for chunk in snapshot.chunks():
+        for start in range(0, len(chunk), size):
+            piece = chunk[start:start + size]
+            pending.append(piece)
+            pending_size += len(piece)
+            if pending_size >= size:
+                yield "".join(pending)
+                pending, pending_size = [], 0
+    if pending:
+        yield "".join(pending)
+
+
+class BufferSnapshot:
+    """Compressed copy of a background tab's document.
+
+    The document snapshot is compressed block by block on a worker thread.
+    Blocks are kept in memory up to a budget shared by all tabs and written
+    to a temp file beyond it. Until compression is done, reads come from
+    the original snapshot instead.
+    """
+
+    _budget_lock = threading.Lock()
+    memory = 0  # Compressed bytes held in memory by all snapshots
+
+    def __init__(self, snapshot):
+        self.length = len(snapshot)
+        self._source = snapshot
+        self._blocks = []  # bytes, or (position, size) in the spill file
+        self._memory = 0
+        self._spill = None
+        self._released = False
+        self._lock = threading.Lock()
+        threading.Thread(target=self._compress, name="zen-tab-snapshot", daemon=True).start()
+
+    def _compress(self):
+        blocks, spill_end = [], 0
+        for text in _text_blocks(self._source, TAB_SNAPSHOT_BLOCK_CHARS):
+            data = zlib.compress(text.encode("utf-8", "surrogatepass"), 1)
+            with self._budget_lock:
+                if self._released:
+                    return
+                in_memory = BufferSnapshot.memory + len(data) <= TAB_SNAPSHOT_MEMORY_MB * 1024 * 1024
+                if in_memory:
+                    BufferSnapshot.memory += len(data)
+                    self._memory += len(data)
+            if in_memory:
+                blocks.append(data)
+                continue
+            with self._lock:
+                if self._released:
+                    return
+                if self._spill is None:
+                    self._spill = tempfile.TemporaryFile(prefix="zen-tab-")
+                self._spill.seek(spill_end)
+                self._spill.write(data)
+            blocks.append((spill_end, len(data)))
+            spill_end += len(data)
+        with self._lock:
+            if not self._released:
+                self._blocks = blocks
+                self._source = None  # The pieces can be freed now
+
+    def texts(self):
+        """Yield the document in blocks; safe to call from a worker thread"""
+        with self._lock:
+            source, blocks = self._source, self._blocks
+        if source is not None:
+            yield from _text_blocks(source, TAB_SNAPSHOT_BLOCK_CHARS)
+            return
+        for block in blocks:
+            if isinstance(block, tuple):
+                position, size = block
+                with self._lock:
+                    self._spill.seek(position)
+                    block = self._spill.read(size)
+            yield zlib.decompress(block).decode("utf-8", "surrogatepass")
+
+    def release(self):
+        with self._budget_lock:
+            self._released = True
+            BufferSnapshot.memory -= self._memory
+            self._memory = 0
+        with self._lock:
+            self._blocks, self._source = [], None
+            if self._spill is not None:
+                self._spill.close()
+                self._spill = None
+
+
+class SnapshotReader(ChunkedFileReader):
+    """Streams a BufferSnapshot back into a tab's new Text widget.
+
+    Works like ChunkedFileReader, so restoring a background tab reuses the
+    open-file machinery: the UI stays responsive however big the buffer is.
+    """
+
+    restoring = True
+
+    def __init__(self, snapshot, file_path=None):
+        self.snapshot = snapshot
+        self.file_path = file_path
+        self.encoding = None  # The tab keeps its own format
+        self.bom = False
+        self.newline = None
+        self.total_bytes = snapshot.length  # Progress is counted in characters
+        self.bytes_read = 0
+        self.chars_read = 0
+        self.poll_ms = STREAM_POLL_MS
+        self.chunks = queue.Queue(maxsize=STREAM_QUEUE_DEPTH)
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="zen-restore", daemon=True)
+
+    def fallback_encoding(self):
+        return None
+
+    def _run(self):
+        try:
+            for data in self.snapshot.texts():
+                if self._cancelled.is_set():
+                    return
+                starts = LineIndex.scan(data, self.chars_read)
+                self.chars_read += len(data)
+                self.bytes_read = self.chars_read
+                if not self._put(("data", (data, starts, self.chars_read))):
+                    return
+            self._put(("done", None))
+        except Exception as e:
+            self._put(("error", e))
+
+
+class FormattedReader(ChunkedFileReader):
+    """Streams the result of Format JSON into the tab it was made from.
+
+    Replacing the text in one Text call would block the UI for as long as
+    Tk takes to lay out the new document, so it goes through the open-file
+    machinery instead. The tab keeps its file, format and watch; the text
+    is new, so it ends up unsaved. The old text is gone once streaming
+    starts, so it can't be cancelled.
+    """
+
+    formatted = True
+    cancel_label = None
+
+    def __init__(self, text, tab, chunk_chars=STREAM_CHUNK_BYTES):
+        super().__init__(None, tab.encoding, chunk_chars)
+        self.text = text
+        self.file_path = tab.current_file_path
+        self.bom = tab.has_bom
+        self.newline = tab.newline
+        self.compression = tab.compression
+        self.disk_state = tab.disk_state  # The file itself is untouched
+        self.total_bytes = len(text)  # Progress is counted in characters
+        self._thread.name = "zen-format"
+
+    def fallback_encoding(self):
+        return None
+
+    def _run(self):
+        try:
+            last_char = " "
+            for position in range(0, len(self.text), self.chunk_bytes):
+                if self._cancelled.is_set():
+                    return
+                data = self.text[position:position + self.chunk_bytes]
+                starts = LineIndex.scan(data, self.chars_read)
+                self.words += DocumentStats.count_words(data, last_char)
+                self.encoded += len(data.encode(self.encoding, "replace"))
+                last_char = data[-1]
+                self.chars_read += len(data)
+                self.bytes_read = self.chars_read
+                if not self._put(("data", (data, starts, self.chars_read))):
+                    return
+            self._put(("done", None))
+        except Exception as e:
+            self._put(("error", e))
+
+
+class DocumentTab:
+    """Everything that belongs to one open document.
+
+    The editor reaches these through _TabField attributes, so self.text,
+    self.document and friends always mean the active tab's. A background
+    tab may have no Text widget: its text then lives in a BufferSnapshot,
+    or for a large file, just its path and scroll offset.
+    """
+
+    def __init__(self, editor):
+        self.text = None
+        self._text_orig = None  # The Text's real Tcl command behind the edit hook proxy
+        self.current_file_path = None
+        self.loader = None
+        self.large_view = None
+        self.line_index = LineIndex()
+        self.document = PieceTable()
+        self.encoding = "utf-8"
+        self.has_bom = False
+        self.newline = os.linesep
+        self.compression = None  # (format, options) the file is recompressed with on save
+        self.undo = UndoManager(editor, editor.undo_memory_mb)
+        self.journal = editor.new_journal()  # None: crash recovery is unavailable
+        self.stats = DocumentStats(self.encoding)
+        self.highlighter = None
+        self._after_load = None
+        self.disk_state = None  # file_state of the file as the buffer last matched it
+        self.disk_changed = False  # The watcher saw the file change; not yet dealt with
+        self.follower = None  # LogFollower while the tab follows its file
+        self.long_lines = False  # Has lines over LONG_LINE_CHARS: shown unwrapped
+        self.fold_long_lines = True  # ...and folded, unless the user unfolded them
+        # Kept while the tab is in the background
+        self.insert = "1.0"
+        self.yview = 0.0
+        self.saved_modified = False
+        self.snapshot = None
+        self.large_path = None
+        self.large_offset = 0
+
+    @property
+    def path(self):
+        """The file shown in the tab, whether editable, mapped read-only or still loading"""
+        if self.large_view is not None:
+            return self.large_view.mapped.file_path
+        if self.loader is not None:
+            return self.loader.file_path
+        return self.current_file_path or self.large_path
+
+    @property
+    def title(self):
+        return os.path.basename(self.path) if self.path else "Untitled"
+
+    @property
+    def modified(self):
+        if self.large_view is not None or self.large_path is not None:
+            return False  # Read-only
+        if self.loader is not None:
+            return self.loader.restoring and self.saved_modified
+        if self.text is None:
+            return self.saved_modified
+        return self.text.tk.getboolean(self.text.edit_modified())
+
+
+class _TabField:
+    """Editor attribute that reads and writes the active DocumentTab's"""
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, editor, owner=None):
+        if editor is None:
+            return self
+        return getattr(editor.tab, self.name)
+
+    def __set__(self, editor, value):
+        setattr(editor.tab, self.name, value)
+
+
 class ZenScriptEditor:
-    def __init__(self, root):
+    # Per-document state lives on the active DocumentTab
+    text = _TabField()
+    _text_orig = _TabField()
+    current_file_path = _TabField()  # Track file path for save state fix
+    loader = _TabField()  # Active ChunkedFileReader while a file streams in
+    large_view = _TabField()  # LargeFileView when a huge file is mapped
+    line_index = _TabField()  # Character offset of each line in self.text
+    document = _TabField()  # Mirror of self.text for snapshots and slices
+    encoding = _TabField()  # Encoding, BOM and line ending the document is saved with
+    has_bom = _TabField()
+    newline = _TabField()
+    compression = _TabField()
+    undo = _TabField()
+    stats = _TabField()  # Word and byte counts for the status bar
+    journal = _TabField()  # EditJournal, or None without crash recovery
+    highlighter = _TabField()
+    _after_load = _TabField()  # Called once the file being streamed in is complete
+    follower = _TabField()  # LogFollower while the tab follows its file
+
+    def __init__(self, root, profiler=None):
         self.root = root
+        self.profiler = profiler or StartupProfiler()
         self.root.title("zen.script")
-        self.current_file_path = None  # Track file path for save state fix
+        self.tabs = []  # DocumentTab per open document, in tab bar order
+        self.tab = None  # The active one
+        self._materialized = []  # Tabs with a Text widget, least recently used first
+        self._evict_job = None
+        self._load_job = None
+        self.wrap_mode = "word"  # User's wrap preference (large files always show unwrapped)
+        self.undo_memory_mb = UNDO_MEMORY_MB
+        self.status_message = ""
+        self.position_text = ""  # "Ln/Col" and counts readout appended to the status message
+        self._position_job = None
+        self._selection_counts = (None, "")  # (key, text) of the last selection counted
+        self._pending_edits = []
+        self.edit_count = 0  # Bumped on every edit or document swap; lets snapshots detect staleness
+        self.find_bar = None  # Built on first use
+        self.find_in_files = None
+        self._process_pool = None
+        self._watcher = None
+        self._disk_prompt = False  # A "changed on disk" question is on screen
+        self._follow_job = None
+        self._format_job = None  # (tab, edit_count, future) of a Format JSON in the pool
+        self._viewport_job = None
+        self.writer = BackgroundWriter()
+        self.recovery_dir = os.path.join(get_user_data_dir(), "recovery")
+        self._tab_ids = itertools.count(1)  # Names each tab's journal
+        self.edit_listeners = []  # The active tab's journal and highlighter, and the find bar
+        self.viewport_listeners = []  # Called (coalesced) whenever the visible region moves
+        self.viewport_listeners.append(lambda: self.highlighter.on_viewport())
+        self._compact_job = None
+        self._save_poll_job = None
         self.application_path = get_application_path()
-        self.settings_file = os.path.join(self.application_path, ".zenscript_settings.json")
-        self.available_fonts = None  # Cache for system fonts
+        # Earlier versions kept their settings next to the script or executable
+        legacy = {os.path.join(path, ".zenscript_settings.json")
+                  for path in (self.application_path, os.path.dirname(os.path.abspath(sys.argv[0])))}
+        self.settings = SettingsStore(self.root, os.path.join(get_user_config_dir(), "settings.json"),
+                                      legacy_paths=sorted(legacy))
+        self.fonts = FontCatalog(self.root, os.path.join(get_user_data_dir(), "fonts.json"))
+        self._ttk_styled = False  # ttk styles are configured when a dialog first needs them
+        self.perf = PerfMonitor(self)
+        self.theme = ThemeEngine(self.root)
+        self.profiler.mark("editor state")
         self.setup_methods()
         self.setup_ui()
-        self.apply_catppuccin_mocha_theme()
-        self.configure_ttk_styles()  # Configure ttk styles after theme setup
-        self.load_settings()  # Load saved settings after applying default theme
+        self.profiler.mark("widgets")
         self.set_monospace_font()
+        self.reset_colors()
+        self.load_settings()  # Saved settings override the defaults above
+        self.profiler.mark("font, settings")
+        self._new_tab()
+        self.apply_current_theme()
+        self.profiler.mark("first tab, theme")
         self.setup_keybindings()
+        self.profiler.mark("keybindings")
+        if not self.profiler.enabled:  # A startup profile must not stop at a dialog
+            self.root.after_idle(self._offer_recovery)
+            self.fonts.start()
     
     def setup_methods(self):
         """Initialize all methods that will be called by UI elements"""
         self.new_file = lambda: self._new_file()
         self.open_file = lambda: self._open_file()
         self.save_file = lambda e=None: self._save_file(e)
+        self.close_tab = lambda: self._close_tab()
+        self.toggle_follow = lambda: self._toggle_follow()
+        self.format_json = lambda: self._format_json()
+        self.toggle_long_lines = lambda: self._toggle_long_lines()
         self.cut_text = lambda: self._cut_text()
         self.copy_text = lambda: self._copy_text()
         self.paste_text = lambda: self._paste_text()
         self.select_all = lambda e=None: self._select_all(e)
         self.custom_theme_dialog = lambda: self._custom_theme_dialog()
         self.font_options_dialog = lambda: self._font_options_dialog()
+        self.goto_offset_dialog = lambda: self._goto_offset_dialog()
+        self.goto_line_dialog = lambda: self._goto_line_dialog()
+        self.quit_app = lambda: self._quit_app()
+        self.find_text = lambda: self._show_find_bar()
+        self.replace_text = lambda: self._show_find_bar(replace=True)
+        self.find_in_files_dialog = lambda: self._find_in_files_dialog()
+        self.undo_edit = lambda: self._undo()
+        self.redo_edit = lambda: self._redo()
+        self.toggle_perf_hud = lambda: self.perf.toggle()
+        self.export_perf_trace = lambda: self._export_perf_trace()
 
     def configure_ttk_styles(self):
         """Configure ttk widget styles to match the Catppuccin Mocha theme"""
+        if self._ttk_styled:
+            return  # Styles only use menu_colors, which never change
+        self._ttk_styled = True
         style = ttk.Style()
         
         # Configure Combobox style
@@ -80,13 +3917,29 @@ class ZenScriptEditor:
 
     def setup_ui(self):
         """Setup the user interface"""
-        self.text = tk.Text(self.root, wrap="word", undo=True, borderwidth=0)
-        self.text.pack(expand=True, fill="both", padx=5, pady=5)
+        # Only packed while more than one document is open
+        self.tab_bar = tk.Frame(self.root, bg="#181825")
+        # Holds the active tab's Text widget (see _create_text_widget)
+        self.text_area = tk.Frame(self.root, bg="#1e1e2e")
+        self.text_area.pack(expand=True, fill="both")
         self.bottom_frame = tk.Frame(self.root, bg="#181825")
         self.bottom_frame.pack(side="bottom", fill="x")
         self.status = tk.Label(self.bottom_frame, text="", anchor="w", bg="#181825", fg="#a6adc8")
         self.status.pack(side="left", fill="x", padx=5, pady=(0, 2), expand=True)
+        # Only packed while a file is streaming in
+        self.cancel_btn = tk.Button(self.bottom_frame, text="Cancel", command=self._cancel_loading,
+                                    bg="#313244", fg="#cdd6f4", activebackground="#45475a",
+                                    activeforeground="#89b4fa", borderwidth=0, relief=tk.FLAT,
+                                    padx=8)
+        # Only packed while a large file is mapped
+        self.large_scrollbar = tk.Scrollbar(self.text_area, orient="vertical", borderwidth=0,
+                                            troughcolor="#181825", bg="#313244",
+                                            activebackground="#45475a")
         self.create_custom_menu_bar(self.bottom_frame)
+        self.theme.register(("background", f"{self.root} configure"),
+                            ("background", f"{self.text_area} configure"),
+                            ("status", f"{self.status} configure"),
+                            ("chrome", f"{self.bottom_frame} configure"))
         made_with = tk.Label(self.bottom_frame, text="wabi-sabi (侘び寂び) | made with ♡", 
                              anchor="e", fg="#6c7086", bg="#181825")
         made_with.pack(side="right", padx=5, pady=(0, 2))
@@ -108,7 +3961,12 @@ class ZenScriptEditor:
         file_menu.add_command(label="New", command=self.new_file, accelerator="Ctrl+N")
         file_menu.add_command(label="Open", command=self.open_file, accelerator="Ctrl+O")
         file_menu.add_command(label="Save", command=self.save_file, accelerator="Ctrl+S")
-        file_menu.add_command(label="Exit", command=self.root.quit, accelerator="Alt+F4")
+        file_menu.add_command(label="Close Tab", command=self.close_tab, accelerator="Ctrl+W")
+        file_menu.add_command(label="Follow (tail -f)", command=self.toggle_follow,
+                              accelerator="Ctrl+Shift+L")
+        file_menu.add_command(label="Find in Files", command=self.find_in_files_dialog,
+                              accelerator="Ctrl+Shift+F")
+        file_menu.add_command(label="Exit", command=self.quit_app, accelerator="Alt+F4")
         file_btn.config(menu=file_menu)
         # Edit menu
         edit_btn = tk.Menubutton(self.menu_frame, text="Edit", bg="#181825", fg="#cdd6f4",
@@ -118,12 +3976,17 @@ class ZenScriptEditor:
         edit_menu = tk.Menu(edit_btn, tearoff=0, bg="#181825", fg="#cdd6f4",
                             activebackground="#313244", activeforeground="#89b4fa",
                             relief=tk.FLAT, bd=0)
-        edit_menu.add_command(label="Undo", command=self.text.edit_undo, accelerator="Ctrl+Z")
-        edit_menu.add_command(label="Redo", command=self.text.edit_redo, accelerator="Ctrl+Y")
+        edit_menu.add_command(label="Undo", command=self.undo_edit, accelerator="Ctrl+Z")
+        edit_menu.add_command(label="Redo", command=self.redo_edit, accelerator="Ctrl+Y")
         edit_menu.add_command(label="Cut", command=self.cut_text, accelerator="Ctrl+X")
         edit_menu.add_command(label="Copy", command=self.copy_text, accelerator="Ctrl+C")
         edit_menu.add_command(label="Paste", command=self.paste_text, accelerator="Ctrl+V")
         edit_menu.add_command(label="Select All", command=self.select_all, accelerator="Ctrl+A")
+        edit_menu.add_command(label="Find", command=self.find_text, accelerator="Ctrl+F")
+        edit_menu.add_command(label="Replace", command=self.replace_text, accelerator="Ctrl+H")
+        edit_menu.add_command(label="Go To Line", command=self.goto_line_dialog, accelerator="Ctrl+G")
+        edit_menu.add_command(label="Go To Offset", command=self.goto_offset_dialog, accelerator="Ctrl+J")
+        edit_menu.add_command(label="Format JSON", command=self.format_json)
         edit_btn.config(menu=edit_menu)
         # Options menu (removed "Customize All Colors" option)
         options_btn = tk.Menubutton(self.menu_frame, text="Options", bg="#181825", fg="#cdd6f4",
@@ -136,56 +3999,1312 @@ class ZenScriptEditor:
         options_menu.add_command(label="Catppuccin Mocha", command=self.apply_catppuccin_mocha_theme)
         options_menu.add_command(label="Custom Theme", command=self.custom_theme_dialog)
         options_menu.add_command(label="Font & Text Options", command=self.font_options_dialog)
+        options_menu.add_command(label="Fold Long Lines", command=self.toggle_long_lines)
+        options_menu.add_command(label="Performance HUD", command=self.toggle_perf_hud,
+                                 accelerator="Ctrl+Shift+P")
+        options_menu.add_command(label="Export Performance Trace", command=self.export_perf_trace)
         options_btn.config(menu=options_menu)
+        self.theme.register(("chrome", f"{self.menu_frame} configure"),
+                            *(("menubutton", f"{button} configure")
+                              for button in (file_btn, edit_btn, options_btn)))
+
+    def text_widgets(self):
+        """The Text widgets of every tab that currently has one"""
+        return [tab.text for tab in self.tabs if tab.text is not None]
+
+    def _create_text_widget(self, tab):
+        """Build and show a Text for tab with the editor's font, wrap, theme and bindings"""
+        # Undo is handled by UndoManager, not Tk's unbounded per-edit stack
+        text = tk.Text(self.text_area, wrap="none" if tab.long_lines else self.wrap_mode, undo=False,
+                       borderwidth=0, highlightthickness=0, relief=tk.FLAT, font=self.custom_font)
+        text.tag_configure(LONG_LINE_TAG, elide=True)
+        text.configure(yscrollcommand=self._on_text_yview)
+        tab.text = text
+        tab._text_orig = self.install_edit_hooks(tab)
+        # Tag priority: syntax below find matches, the selection above both
+        for tag in ("find_match", "find_current"):
+            text.tag_configure(tag)
+        for kind in SYNTAX_COLORS:
+            text.tag_configure(f"syn_{kind}")
+            text.tag_lower(f"syn_{kind}")
+        text.tag_raise(tk.SEL)
+        self.theme.register(("text", f"{text} configure"),
+                            *((role, f"{text} tag configure {role[4:]}")
+                              for role in THEME_ROLES if role.startswith("tag ")))
+        bind = self.perf.bind  # Handlers are timed while the performance HUD is on
+        # The Text class binds these virtual events to its own (disabled) undo
+        bind(text, '<<Undo>>', lambda e: self._undo())
+        bind(text, '<<Redo>>', lambda e: self._redo())
+        # Also bound on the root; here so the Text's Emacs-style Ctrl+F/Ctrl+H and
+        # focus-traversing Ctrl+Tab don't fire too
+        bind(text, '<Control-f>', lambda e: self._show_find_bar())
+        bind(text, '<Control-h>', lambda e: self._show_find_bar(replace=True))
+        for sequence, step in TAB_CYCLE_KEYS:
+            bind(text, sequence, lambda e, step=step: self._cycle_tab(step))
+        bind(text, '<KeyRelease>', lambda e: self._schedule_position_update(), add="+")
+        bind(text, '<ButtonRelease-1>', lambda e: self._schedule_position_update(), add="+")
+        bind(text, '<<Selection>>', lambda e: self._schedule_position_update(), add="+")
+        text.bind('<<Modified>>', lambda e: self._render_tabs())
+        if self.perf.enabled:
+            self.perf.attach(text)
+        text.pack(expand=True, fill="both", padx=5, pady=5)
+        tab.highlighter = SyntaxHighlighter(self)
+
+    def _destroy_text(self, tab):
+        widget = str(tab.text)
+        self.theme.forget(widget)
+        tab.text.destroy()
+        self.root.tk.call("interp", "alias", "", widget, "")  # The edit hook proxy
+        tab.text = tab._text_orig = tab.highlighter = None
+
+    def new_journal(self):
+        """A fresh EditJournal for a new tab, or None if the state directory isn't writable"""
+        try:
+            journal = EditJournal(self.recovery_dir, next(self._tab_ids))
+        except OSError:
+            return None  # Run without crash recovery
+        journal.start()
+        return journal
+
+    def _new_tab(self):
+        """Open an empty Untitled tab and switch to it"""
+        tab = DocumentTab(self)
+        self.tabs.append(tab)
+        self._switch_tab(tab)
+        return tab
+
+    def _switch_tab(self, tab):
+        if tab is self.tab:
+            return
+        if self.tab is not None:
+            self._suspend_tab()
+        self.tab = tab
+        self._resume_tab()
+
+    def _suspend_tab(self):
+        """Take the active tab off screen; a load in progress waits until it is shown again"""
+        tab = self.tab
+        if self._load_job is not None:
+            self.root.after_cancel(self._load_job)
+            self._load_job = None
+        if self._follow_job is not None:
+            self.root.after_cancel(self._follow_job)
+            self._follow_job = None
+        self.cancel_btn.pack_forget()
+        self.large_scrollbar.pack_forget()
+        if tab.text is not None:
+            tab.insert = tab.text.index(tk.INSERT)
+            tab.yview = tab.text.yview()[0]
+            tab.text.pack_forget()
+        for listener in (tab.highlighter, tab.journal):
+            if listener in self.edit_listeners:
+                self.edit_listeners.remove(listener)
+        if (tab.journal and tab.journal.records and tab.loader is None
+                and tab.large_view is None and tab.follower is None):
+            # Fold the log into a snapshot while the document is at hand; the
+            # journal then stays as it is for as long as the tab is in the background
+            tab.journal.compact(tab.document.snapshot(), tab.current_file_path)
+
+    def _resume_tab(self):
+        tab = self.tab
+        if tab.text is None:
+            self._materialize(tab)
+        else:
+            tab.text.pack(expand=True, fill="both", padx=5, pady=5)
+            if tab.large_view is not None:
+                self.large_scrollbar.configure(command=tab.large_view.on_scrollbar)
+                self.large_scrollbar.pack(side="right", fill="y", before=tab.text)
+                tab.large_view.update_scrollbar()
+            elif tab.loader is not None:
+                if not tab.loader.restoring and tab.loader.cancel_label:
+                    self.cancel_btn.configure(text=tab.loader.cancel_label)
+                    self.cancel_btn.pack(side="left", padx=(0, 5), pady=(0, 2), before=self.status)
+                self._load_job = self.root.after(1, self._drain_loader)
+            self._update_title()
+        self.edit_listeners.append(tab.highlighter)
+        if tab.journal:
+            self.edit_listeners.append(tab.journal)
+        self._touch_tab(tab)
+        self.position_text = ""
+        self._schedule_position_update()
+        self._document_replaced()
+        tab.text.focus_set()
+        self.root.after_idle(self._check_disk)  # Its file may have changed while in the background
+        if tab.follower is not None and tab.loader is None:
+            self._schedule_follow()
+
+    def _touch_tab(self, tab):
+        if tab in self._materialized:
+            self._materialized.remove(tab)
+        self._materialized.append(tab)
+        if len(self._materialized) > TAB_MATERIALIZED and self._evict_job is None:
+            # After the switch has been drawn: destroying a big Text takes a while
+            self._evict_job = self.root.after_idle(self._evict_tabs)
+
+    def _evict_tabs(self):
+        self._evict_job = None
+        for tab in list(self._materialized):
+            if len(self._materialized) <= TAB_MATERIALIZED:
+                break
+            if tab is not self.tab and tab.loader is None:  # A paused load keeps its widget
+                self._dematerialize(tab)
+
+    def _materialize(self, tab):
+        """Give a background tab its Text widget back and refill it"""
+        tab.line_index, tab.document = LineIndex(), PieceTable()
+        self._create_text_widget(tab)
+        if tab.large_path is not None:
+            file_path, offset = tab.large_path, tab.large_offset
+            tab.large_path = None
+            try:
+                self._open_large_file(file_path)
+            except Exception as e:
+                self._update_title()
+                messagebox.showerror("Open Error", f"Could not open file:\n{e}")
+                return
+            self.large_view.goto_offset(offset)
+        elif tab.snapshot is not None:
+            self._start_loading(SnapshotReader(tab.snapshot, tab.current_file_path))
+        else:
+            self._update_title()
+
+    def _dematerialize(self, tab):
+        """Drop a background tab's Text widget, keeping its document as a compressed snapshot"""
+        if tab.large_view is not None:
+            tab.large_path, tab.large_offset = tab.large_view.mapped.file_path, tab.large_view.top
+            tab.large_view.detach()
+            tab.large_view = None
+        else:
+            tab.saved_modified = tab.modified
+            if tab.snapshot is not None:
+                tab.snapshot.release()
+            tab.snapshot = BufferSnapshot(tab.document.snapshot())
+            tab.undo.spill()
+        self._destroy_text(tab)
+        tab.line_index = tab.document = None
+        self._materialized.remove(tab)
+
+    def _finish_restore(self):
+        """A background tab's snapshot is back in its widget: put the view back as it was"""
+        tab = self.tab
+        tab.snapshot.release()
+        tab.snapshot = None
+        self.text.edit_modified(tab.saved_modified)
+        self.text.mark_set(tk.INSERT, tab.insert)
+        self.text.yview_moveto(tab.yview)
+        self.highlighter.set_language(self.highlighter.language_for(self.current_file_path))
+        self._update_title()
+        self.set_status("")
+        self._document_replaced()
+        self._schedule_position_update()
+        if tab.follower is not None:
+            self.text.configure(state="disabled")  # Read-only again after the refill
+            self.undo.recording = False
+            self._schedule_follow()
+        self._check_disk()
+
+    def _close_tab(self, tab=None):
+        tab = tab or self.tab
+        if tab.modified and not messagebox.askyesno(
+                "Close Tab", f"{tab.title} has unsaved changes.\n\nClose it anyway?"):
+            return "break"
+        index = self.tabs.index(tab)
+        active = tab is self.tab
+        if active:
+            self._suspend_tab()
+        self._discard_tab(tab)
+        self.tabs.remove(tab)
+        if active:
+            self.tab = None
+            if self.tabs:
+                self._switch_tab(self.tabs[min(index, len(self.tabs) - 1)])
+            else:
+                self._new_tab()
+        else:
+            self._render_tabs()
+        return "break"
+
+    def _discard_tab(self, tab):
+        self._drop_follower(tab)
+        self._unwatch_file(tab)
+        if tab.loader is not None:
+            tab.loader.cancel()
+            tab.loader = None
+        if tab.large_view is not None:
+            tab.large_view.detach()
+            tab.large_view = None
+        if tab.text is not None:
+            self._destroy_text(tab)
+            self._materialized.remove(tab)
+        if tab.snapshot is not None:
+            tab.snapshot.release()
+            tab.snapshot = None
+        tab.undo.clear()
+        if tab.journal:
+            # Closed on purpose: its changes are not to be recovered
+            tab.journal.discard()
+            tab.journal.close(timeout=0)
+
+    def _cycle_tab(self, step):
+        index = self.tabs.index(self.tab)
+        self._switch_tab(self.tabs[(index + step) % len(self.tabs)])
+        return "break"
+
+    def _find_tab(self, file_path):
+        file_path = os.path.abspath(file_path)
+        for tab in self.tabs:
+            if tab.path and os.path.abspath(tab.path) == file_path:
+                return tab
+        return None
+
+    def _tab_for_open(self):
+        """Reuse the active tab if it is an untouched Untitled one, else open a new tab"""
+        tab = self.tab
+        if (tab.path is not None or tab.loader is not None or tab.modified
+                or len(tab.document)):
+            self._new_tab()
+
+    def _restart_journal(self):
+        """Base the active tab's journal on its document again (after follow mode)"""
+        if not self.journal:
+            return
+        tab = self.tab
+        if tab.loader is not None or tab.large_view is not None or tab.follower is not None:
+            # Finishing the load restarts it; large files and followed logs aren't journaled
+            self.journal.discard()
+        elif (tab.modified or self.writer.busy
+              or (tab.current_file_path and not os.path.exists(tab.current_file_path))):
+            # Unsaved (or not yet saved) changes: base the journal on the buffer itself
+            self.journal.compact(self.document.snapshot(), self.current_file_path)
+        else:
+            self.journal.start(self.current_file_path)
+
+    def _update_title(self):
+        tab = self.tab
+        suffix = (" (read-only)" if tab.large_view is not None
+                  else " (following)" if tab.follower is not None
+                  else f" (reading {tab.loader.source})" if tab.loader is not None and tab.loader.source
+                  else " (formatting)" if tab.loader is not None and tab.loader.formatted
+                  else " (loading)" if tab.loader is not None and not tab.loader.restoring else "")
+        self.root.title(f"zen.script - {tab.title}{suffix}")
+
+    def _render_tabs(self):
+        """Rebuild the tab bar; it is only shown while more than one document is open"""
+        for child in self.tab_bar.winfo_children():
+            child.destroy()
+        if len(self.tabs) < 2:
+            self.tab_bar.pack_forget()
+            return
+        colors = self.menu_colors
+        self.tab_bar.configure(bg=colors["menu_bg"])
+        for tab in self.tabs:
+            background = colors["menu_surface"] if tab is self.tab else colors["menu_bg"]
+            cell = tk.Frame(self.tab_bar, bg=background)
+            cell.pack(side="left", padx=(0, 1))
+            label = tk.Label(cell, text=tab.title + (" •" if tab.modified else ""), bg=background,
+                             fg=colors["menu_blue"] if tab is self.tab else colors["menu_text"],
+                             padx=8, pady=2)
+            label.pack(side="left")
+            label.bind("<Button-1>", lambda e, t=tab: self._switch_tab(t))
+            close = tk.Label(cell, text="✕", bg=background, fg=colors["menu_text"], padx=4)
+            close.pack(side="left")
+            close.bind("<Button-1>", lambda e, t=tab: self._close_tab(t))
+        self.tab_bar.pack(side="top", fill="x", before=self.text_area)
+
+    def install_edit_hooks(self, tab):
+        """Route a tab's Text widget's Tcl command through a proxy that reports edits
+
+        Every insert, delete and replace (including undo/redo, which Tk replays
+        through the widget command) is resolved to line/column positions before
+        it runs and applied to the line index after it succeeds. The proxy is
+        written in Tcl so errors from the real command still reach the caller.
+        Returns the name the real command was renamed to.
+        """
+        widget = str(tab.text)
+        orig = widget + "_orig"
+        # Registered on the widget, so the callback goes away when it is destroyed
+        hook = tab.text.register(lambda phase, *args: self._edit_hook(tab, phase, *args))
+        self.root.tk.eval("""
+            proc ::zen_text_proxy {orig hook cmd args} {
+                if {$cmd in {insert delete replace} && [$hook before $cmd {*}$args]} {
+                    set result [$orig $cmd {*}$args]
+                    $hook after
+                    return $result
+                }
+                $orig $cmd {*}$args
+            }""")
+        self.root.tk.call("rename", widget, orig)
+        self.root.tk.call("interp", "alias", "", widget, "", "::zen_text_proxy", orig, hook)
+        return orig
+
+    def _edit_hook(self, tab, phase, *args):
+        if tab is not self.tab:
+            return 0  # Only the active tab is edited; its models are the ones in use
+        try:
+            if phase == "after":
+                self._apply_pending_edits()
+                return 0
+            return self._prepare_edit(args[0], args[1:])
+        except Exception:
+            # Never let a bookkeeping bug break editing; resync from the widget instead
+            if phase == "after":
+                self._resync_models()
+                return 0
+            self._pending_edits = [("rebuild",)]
+            return 1
+
+    def _prepare_edit(self, command, args):
+        """Resolve an edit's indices before Tk changes the text; returns 1 to track it"""
+        self._pending_edits = []
+        if self.loader is not None or self.large_view is not None:
+            return 0  # These modes manage the widget contents themselves
+        orig = lambda *a: str(self.root.tk.call(self._text_orig, *a))
+        compare = lambda *a: self.root.tk.getboolean(self.root.tk.call(self._text_orig, "compare", *a))
+        if orig("cget", "-state") == "disabled":
+            return 0
+        if command == "insert":
+            index = orig("index", args[0])
+            if compare(index, ">=", "end"):
+                index = orig("index", "end-1c")
+            self._pending_edits = [("insert", index, "".join(args[1::2]))]
+        elif len(args) > 2 and command == "delete":
+            self._pending_edits = [("rebuild",)]  # Multi-range delete: let Tk sort it out
+        else:
+            first = orig("index", args[0])
+            last = orig("index", args[1] if len(args) > 1 else f"{first}+1c")
+            # Mirror Tk: deletes never remove the final newline, and a range of
+            # whole lines ending at "end" takes the newline before it instead
+            if compare(last, ">=", "end"):
+                last = orig("index", "end-1c")
+                if first.endswith(".0") and first != "1.0":
+                    first = orig("index", f"{first}-1c")
+            if compare(first, "<", last):
+                self._pending_edits.append(("delete", first, last))
+            if command == "replace":
+                self._pending_edits.append(("insert", first, "".join(args[2::2])))
+        return 1
+
+    def _apply_pending_edits(self):
+        edits, self._pending_edits = self._pending_edits, []
+        for edit in edits:
+            index = self.line_index
+            if edit[0] == "insert":
+                line, col = map(int, edit[1].split("."))
+                offset = index.offset(line, col)
+                index.insert(line, col, edit[2])
+                self.document.insert(offset, edit[2])
+                self.stats.inserted(self.document, offset, edit[2])
+                if self.undo.recording:
+                    self.undo.record_insert(offset, edit[2])
+                for listener in self.edit_listeners:
+                    listener.on_insert(offset, edit[2])
+            elif edit[0] == "delete":
+                line, col = map(int, edit[1].split("."))
+                end_line, end_col = map(int, edit[2].split("."))
+                offset = index.offset(line, col)
+                length = index.offset(end_line, end_col) - offset
+                removed = self.document.slice(offset, offset + length)
+                if self.undo.recording:
+                    self.undo.record_delete(offset, removed)
+                index.delete(line, col, length, end_line - line)
+                self.document.delete(offset, length)
+                self.stats.deleted(self.document, offset, removed)
+                for listener in self.edit_listeners:
+                    listener.on_delete(offset, length)
+            else:
+                self._resync_models()
+                self.undo.clear()  # Offsets in the history can no longer be trusted
+                self._schedule_journal_compaction(force=True)
+        if edits:
+            self.edit_count += 1
+            self._schedule_position_update()
+            self._schedule_journal_compaction()
+
+    def _resync_models(self):
+        """Rebuild the line index and document model from the widget (slow path)"""
+        content = self.root.tk.call(self._text_orig, "get", "1.0", "end-1c")
+        self.line_index = LineIndex()
+        self.line_index.feed(content)
+        self.document = PieceTable(content)
+        self.stats.recount(self.document, self.encoding)
+
+    def _schedule_journal_compaction(self, force=False):
+        journal = self.journal
+        if journal is None or self._compact_job is not None:
+            return
+        if force or journal.records >= EditJournal.COMPACT_RECORDS:
+            self._compact_job = self.root.after_idle(self._compact_journal)
+
+    def _compact_journal(self):
+        self._compact_job = None
+        if self.loader is None and self.large_view is None and self.follower is None:
+            self.journal.compact(self.document.snapshot(), self.current_file_path)
+
+    def _offer_recovery(self):
+        """Offer to replay journals left behind by a zen.script that didn't exit cleanly"""
+        found = []
+        for path in EditJournal.orphans(self.recovery_dir):
+            try:
+                header, base_text, records = EditJournal.read(path)
+            except Exception:
+                os.remove(path)
+                continue
+            if not records and not base_text:
+                os.remove(path)
+                continue
+            found.append((path, header, base_text, records))
+        if not found:
+            return
+        names = "\n".join(os.path.basename(header.get("path") or "") or "Untitled"
+                          for _, header, _, _ in found)
+        if not messagebox.askyesno("Recover Unsaved Changes",
+                                   f"zen.script closed unexpectedly with unsaved changes to:\n\n"
+                                   f"{names}\n\nRecover them now?"):
+            for path, _, _, _ in found:
+                os.remove(path)
+            return
+        for journal in found:  # Each one into a tab of its own
+            self._recover_journal(*journal)
+
+    def _recover_journal(self, path, header, base_text, records):
+        file_path = header.get("path")
+        if base_text is None:
+            try:
+                stat = os.stat(file_path)
+                unchanged = (stat.st_size, stat.st_mtime_ns) == (header.get("size"), header.get("mtime_ns"))
+            except OSError:
+                unchanged = False
+            if not unchanged:
+                messagebox.showwarning("Recovery",
+                                       f"{file_path} has changed since the unsaved edits were made, "
+                                       f"so they can't be replayed onto it.")
+                os.remove(path)
+                return
+            if stat.st_size >= LARGE_FILE_THRESHOLD:
+                messagebox.showwarning("Recovery",
+                                       f"{file_path} is {stat.st_size / 1048576:.0f} MB, and files that "
+                                       f"large open read-only, so its unsaved edits can't be replayed.")
+                os.remove(path)
+                return
+            self._open_file(file_path)
+            if self.loader is not None and self.loader.file_path == file_path:
+                self._after_load = lambda: self._replay_journal(path, records)
+        else:
+            self._tab_for_open()
+            self.text.insert("1.0", base_text)
+            self.current_file_path = file_path
+            self._replay_journal(path, records)
+
+    def _replay_journal(self, path, records):
+        def position(offset):
+            line = self.line_index.line_of(offset)
+            return f"{line}.{offset - self.line_index.line_start(line)}"
+
+        for op, offset, payload in records:
+            if op == "i":
+                self.text.insert(position(offset), payload)
+            else:
+                self.text.delete(position(offset), position(offset + payload))
+        os.remove(path)
+        # The recovered document now lives in this session's journal
+        self._schedule_journal_compaction(force=True)
+        name = os.path.basename(self.current_file_path) if self.current_file_path else "Untitled"
+        self.root.title(f"zen.script - {name}")
+        self.set_status(f"Recovered {len(records)} unsaved edit(s) - save to keep them")
+
+    def _document_replaced(self):
+        """The whole buffer changed without edit events (open, large file mode)"""
+        self.edit_count += 1
+        if self.find_bar is not None and self.find_bar.visible:
+            self.find_bar.schedule_search(delay=0)
+        self._render_tabs()  # The tab's name may have changed too
+
+    def _on_text_yview(self, first, last):
+        if self._viewport_job is None:
+            self._viewport_job = self.root.after_idle(self._notify_viewport)
+
+    def _notify_viewport(self):
+        self._viewport_job = None
+        for listener in self.viewport_listeners:
+            listener()
+
+    def process_pool(self):
+        """Shared worker processes for CPU-bound jobs such as Find in Files"""
+        if self._process_pool is None:
+            # Spawn, not fork: forking a process that runs Tk and worker threads is unsafe
+            self._process_pool = futures.ProcessPoolExecutor(
+                max_workers=os.cpu_count() or 2, mp_context=multiprocessing.get_context("spawn"))
+        return self._process_pool
+
+    def file_watcher(self):
+        """Shared FileWatcher for the open files, started when the first one is watched"""
+        if self._watcher is None:
+            self._watcher = FileWatcher()
+            self._watcher.attach(self.root, self._on_disk_changes)
+        return self._watcher
+
+    def _watch_file(self, tab, state):
+        """The tab's buffer matches its file as of state: watch for changes from there"""
+        tab.disk_state = state
+        tab.disk_changed = False
+        if state is not None:
+            self.file_watcher().watch(tab.current_file_path, state)
+
+    def _unwatch_file(self, tab):
+        """Stop watching the tab's file; call before its path changes"""
+        if tab.disk_state is not None and self._watcher is not None:
+            self._watcher.unwatch(tab.current_file_path)
+        tab.disk_state = None
+        tab.disk_changed = False
+
+    def _on_disk_changes(self, changes):
+        for file_path in changes:
+            tab = self._find_tab(file_path)
+            if tab is not None and tab.disk_state is not None:
+                tab.disk_changed = True  # Background tabs are asked about when shown
+        self._check_disk()
+
+    def _check_disk(self):
+        """Offer to reload the active tab's file if another program changed it"""
+        tab = self.tab
+        if not tab.disk_changed or tab.disk_state is None or tab.loader is not None or self._disk_prompt:
+            return
+        if tab.follower is not None:
+            tab.disk_changed = False
+            self._schedule_follow()  # Followed files just take in what was appended
+            return
+        if self.writer.busy or not self.writer.results.empty():
+            return  # Most likely our own save; _poll_saves checks again once it lands
+        tab.disk_changed = False
+        state = file_state(tab.current_file_path)
+        if state == tab.disk_state:
+            return
+        if state is None:
+            self.set_status(f"{tab.title} was deleted or moved by another program - save to write it back")
+            return
+        question = f"{tab.title} was changed by another program.\n\n"
+        question += "Reload it and lose your unsaved changes?" if tab.modified else "Reload it?"
+        self._disk_prompt = True
+        try:
+            reload = messagebox.askyesno("File Changed", question)
+        finally:
+            self._disk_prompt = False
+        if tab is not self.tab or tab.disk_state is None:
+            return  # Closed, or replaced by another file, while the question was up
+        if reload:
+            self._reload_from_disk()
+        else:
+            # Keep the buffer: it no longer matches the file, so it is unsaved
+            self._watch_file(tab, state)
+            self.text.edit_modified(True)
+
+    def _reload_from_disk(self):
+        """Bring the active tab up to date with its file. If the file only
+        grew, just the new bytes are read and appended; otherwise it is
+        loaded again, keeping the cursor and scroll position."""
+        tab = self.tab
+        old, state = tab.disk_state, file_state(tab.current_file_path)
+        if (state is not None and not tab.modified and tab.compression is None and state[:2] == old[:2]
+                and old[2] < state[2] <= old[2] + WATCH_APPEND_MAX_BYTES
+                and self._append_from_disk(old[2], state[2])):
+            return
+        insert, yview = self.text.index(tk.INSERT), self.text.yview()[0]
+
+        def restore_view():
+            self.text.mark_set(tk.INSERT, insert)
+            self.text.yview_moveto(yview)
+            self._schedule_position_update()
+
+        try:
+            reader = ChunkedFileReader(tab.current_file_path)
+        except OSError as e:
+            messagebox.showerror("Reload Error", f"Could not reload file:\n{e}")
+            return
+        self._start_loading(reader)
+        self._after_load = restore_view
+
+    def _append_from_disk(self, start, end):
+        """Append bytes start:end of the active tab's file; False if they can't be decoded alone"""
+        tab = self.tab
+        try:
+            with open(tab.current_file_path, "rb") as file:
+                file.seek(start)
+                data = file.read(end - start)
+                stat = os.fstat(file.fileno())
+            text = data.decode(self.encoding)
+        except (OSError, UnicodeDecodeError):
+            return False  # E.g. a character cut in half at the old end: reload it all
+        if (stat.st_dev, stat.st_ino) != tab.disk_state[:2]:
+            return False  # Replaced since it was checked
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+        # Goes through the edit hook so the models, highlighting and find
+        # matches follow incrementally, but isn't an edit to undo
+        recording, self.undo.recording = self.undo.recording, False
+        try:
+            self.text.insert(tk.END, text)
+        finally:
+            self.undo.recording = recording
+        self.text.edit_modified(False)
+        if self.journal:
+            self.journal.start(tab.current_file_path)
+        self._watch_file(tab, (stat.st_dev, stat.st_ino, start + len(data), stat.st_mtime_ns))
+        self.set_status(f"Reloaded: {tab.current_file_path} ({len(data):,} new bytes)")
+        return True
+
+    def _toggle_follow(self):
+        """Follow mode: show what is appended to the file as it happens, read-only"""
+        tab = self.tab
+        if tab.follower is not None:
+            self._stop_following()
+            return "break"
+        if tab.disk_state is None or tab.loader is not None:
+            self.set_status("Follow needs a file that has finished opening")
+            return "break"
+        if tab.modified:
+            self.set_status("Save or undo your changes before following this file")
+            return "break"
+        if tab.compression is not None:
+            self.set_status("Compressed files can't be followed")
+            return "break"
+        tab.follower = LogFollower(tab.current_file_path, self.encoding, tab.disk_state)
+        self.undo.clear()  # Nothing to undo in a read-only, trimmed view
+        self.undo.recording = False
+        self.text.configure(state="disabled")
+        self.text.mark_set(tk.INSERT, tk.END)
+        self.text.see(tk.END)
+        self._restart_journal()
+        self._update_title()
+        self.set_status(f"Following: {tab.current_file_path}")
+        self._follow()
+        return "break"
+
+    def _stop_following(self):
+        tab = self.tab
+        follower = tab.follower
+        self._drop_follower(tab)
+        self.text.configure(state="normal")
+        self.undo.recording = True
+        self._update_title()
+        state = file_state(tab.current_file_path)
+        if (follower.dropped or state is None or state[:2] != follower.identity
+                or state[2] != follower.offset):
+            # The buffer is no longer the file: load the file again to edit it
+            self._start_loading(ChunkedFileReader(tab.current_file_path))
+            self._after_load = lambda: self.text.see(tk.END)
+            return
+        self._watch_file(tab, state)
+        self._restart_journal()
+        self.set_status(f"Stopped following: {tab.current_file_path}")
+
+    def _drop_follower(self, tab):
+        if tab.follower is None:
+            return
+        tab.follower.close()
+        tab.follower = None
+        if tab is self.tab and self._follow_job is not None:
+            self.root.after_cancel(self._follow_job)
+            self._follow_job = None
+
+    def _schedule_follow(self):
+        if self._follow_job is None:
+            self._follow_job = self.root.after_idle(self._follow)
+
+    def _follow(self):
+        """Insert what was appended to the followed file and trim the oldest lines"""
+        self._follow_job = None
+        follower = self.follower
+        if follower is None or self.loader is not None:
+            return
+        text, event, more = follower.read()
+        if event is not None:
+            self.set_status(f"{self.tab.title} was {event} - following it from the start")
+        if text:
+            at_end = self.text.yview()[1] >= 1.0
+            self.text.configure(state="normal")
+            try:
+                self.text.insert(tk.END, text)
+                # Trim in batches, so the delete doesn't run on every append
+                excess = len(self.line_index) - FOLLOW_MAX_LINES
+                if excess > FOLLOW_MAX_LINES // 10:
+                    self.text.delete("1.0", f"{excess + 1}.0")
+                    follower.dropped = True
+            finally:
+                self.text.configure(state="disabled")
+            self.text.edit_modified(False)
+            if at_end:
+                self.text.mark_set(tk.INSERT, tk.END)
+                self.text.see(tk.END)
+        if more:
+            self._follow_job = self.root.after(1, self._follow)
+
+    def _find_in_files_dialog(self):
+        if self.find_in_files is None:
+            self.find_in_files = FindInFilesPanel(self)
+        else:
+            self.find_in_files.window.deiconify()
+            self.find_in_files.window.lift()
+        self.find_in_files.pattern_entry.focus_set()
+        return "break"
+
+    def open_file_at(self, file_path, line, col=0, byte_offset=None):
+        """Open file_path (unless it is already open) and put the cursor at line/col"""
+        def jump():
+            self.text.mark_set(tk.INSERT, f"{line}.{col}")
+            self.text.see(tk.INSERT)
+            self.text.focus_set()
+            self._schedule_position_update()
+
+        same = file_path == self.current_file_path and self.loader is None
+        if not same:
+            self._open_file(file_path)
+        if self.large_view is not None:
+            if self.large_view.mapped.file_path == file_path and byte_offset is not None:
+                self.large_view.goto_offset(byte_offset)
+        elif self.loader is not None:
+            self._after_load = jump
+        elif self.current_file_path == file_path:
+            jump()
+
+    def open_files(self, paths):
+        """Open paths in tabs (a new empty one if there are none) and bring the window up"""
+        self.root.deiconify()
+        self.root.lift()
+        self.root.focus_force()
+        if not paths:
+            self._new_file()
+        for file_path in paths:
+            self._open_file(file_path)
+
+    def _show_find_bar(self, replace=False):
+        if self.large_view is not None:
+            self.set_status("Find is not available in large file mode")
+            return "break"
+        if self.find_bar is None:
+            self.find_bar = FindBar(self)
+            self.edit_listeners.append(self.find_bar)
+            self.viewport_listeners.append(self.find_bar.refresh_highlights)
+        self.find_bar.show(replace)
+        return "break"
+
+    def set_status(self, message):
+        """Show a message in the status bar, keeping the cursor readout after it"""
+        self.status_message = message
+        self._render_status()
+
+    def _render_status(self):
+        parts = [part for part in (self.status_message, self.position_text, self._format_text()) if part]
+        self.status.config(text="  |  ".join(parts))
+
+    def _format_text(self):
+        """Encoding and line ending readout for the status bar, e.g. UTF-16 LE BOM, CRLF"""
+        if self.loader is not None or self.large_view is not None:
+            return ""
+        name = self.encoding.upper().replace("-LE", " LE").replace("-BE", " BE")
+        if self.has_bom:
+            name += " BOM"
+        readout = f"{name}, {NEWLINE_NAMES.get(self.newline, 'LF')}"
+        return f"{readout}, {self.compression[0]}" if self.compression else readout
+
+    def _set_format(self, encoding="utf-8", bom=False, newline=None, compression=None):
+        self.encoding, self.has_bom, self.compression = encoding, bom, compression
+        self.newline = newline or os.linesep  # No line breaks yet: use the platform's
+
+    def _schedule_position_update(self):
+        # Coalesce bursts of keystrokes, edits and selection drags into one readout per frame
+        if self._position_job is None:
+            self._position_job = self.root.after(STATUS_FRAME_MS, self._update_position)
+
+    def _update_position(self):
+        """Cursor position, document counts and selection counts for the status bar"""
+        self._position_job = None
+        if self.loader is not None or self.large_view is not None:
+            return
+        line, col = self.text.index(tk.INSERT).split(".")
+        lines = len(self.line_index)
+        stats = self.stats
+        size = stats.saved_bytes(stats.encoded, lines - 1, self.newline, self.has_bom)
+        parts = [f"Ln {int(line):,}/{lines:,}, Col {int(col) + 1}",
+                 f"{stats.words:,} words, {len(self.document):,} chars, {size:,} bytes"]
+        selection = self._count_selection()
+        if selection:
+            parts.append(selection)
+        self.position_text = "  |  ".join(parts)
+        self._render_status()
+
+    def _count_selection(self):
+        """Readout of the selection's counts; recounted only when the selection or text changed"""
+        ranges = self.text.tag_ranges(tk.SEL)
+        if not ranges:
+            return ""
+        first, last = str(ranges[0]), str(ranges[-1])
+        key = (self.tab, self.edit_count, first, last)
+        if self._selection_counts[0] == key:
+            return self._selection_counts[1]
+        first_line, first_col = map(int, first.split("."))
+        last_line, last_col = map(int, last.split("."))
+        start = self.line_index.offset(first_line, first_col)
+        end = self.line_index.offset(last_line, last_col)
+        lines = last_line - first_line + (last_col > 0)
+        readout = f"Selected {lines:,} lines, "
+        if end - start <= SELECTION_COUNT_CHARS:
+            text, stats = self.document.slice(start, end), self.stats
+            size = stats.saved_bytes(stats.encoded_length(text), text.count("\n"), self.newline, False)
+            readout += f"{DocumentStats.count_words(text):,} words, {end - start:,} chars, {size:,} bytes"
+        else:
+            readout += f"{end - start:,} chars"  # Too big to count words and bytes on every change
+        self._selection_counts = (key, readout)
+        return readout
 
     def setup_keybindings(self):
         """Configure keyboard shortcuts"""
+        bind = self.perf.bind  # Handlers are timed while the performance HUD is on
         # File operations
-        self.root.bind('<Control-s>', lambda e: self._save_file(e))
-        self.root.bind('<Control-n>', lambda e: self._new_file())
-        self.root.bind('<Control-o>', lambda e: self._open_file())
+        bind(self.root, '<Control-s>', lambda e: self._save_file(e))
+        bind(self.root, '<Control-n>', lambda e: self._new_file())
+        bind(self.root, '<Control-o>', lambda e: self._open_file())
+        bind(self.root, '<Control-w>', lambda e: self._close_tab())
+        bind(self.root, '<Control-L>', lambda e: self._toggle_follow())
+        for sequence, step in TAB_CYCLE_KEYS:
+            bind(self.root, sequence, lambda e, step=step: self._cycle_tab(step))
         
         # Edit operations
-        self.root.bind('<Control-a>', lambda e: self._select_all(e))
-        self.root.bind('<Control-z>', lambda e: self.text.edit_undo())
-        self.root.bind('<Control-y>', lambda e: self.text.edit_redo())
-        self.root.bind('<Control-x>', lambda e: self._cut_text())
-        self.root.bind('<Control-c>', lambda e: self._copy_text())
+        bind(self.root, '<Control-a>', lambda e: self._select_all(e))
+        bind(self.root, '<Control-z>', lambda e: self._undo())
+        bind(self.root, '<Control-y>', lambda e: self._redo())
+        bind(self.root, '<Control-x>', lambda e: self._cut_text())
+        bind(self.root, '<Control-c>', lambda e: self._copy_text())
+        bind(self.root, '<Escape>', lambda e: self._cancel_loading())
+        self.root.protocol("WM_DELETE_WINDOW", self._quit_app)
+        bind(self.root, '<Control-j>', lambda e: self._goto_offset_dialog())
+        bind(self.root, '<Control-g>', lambda e: self._goto_line_dialog())
+        bind(self.root, '<Control-F>', lambda e: self._find_in_files_dialog())
+        # Also bound on each Text (see _create_text_widget)
+        bind(self.root, '<Control-f>', lambda e: self._show_find_bar())
+        bind(self.root, '<Control-h>', lambda e: self._show_find_bar(replace=True))
+        bind(self.root, '<F3>', lambda e: self.find_bar.find_next() if self.find_bar else None)
+        bind(self.root, '<Shift-F3>', lambda e: self.find_bar.find_previous() if self.find_bar else None)
+        bind(self.root, '<Control-P>', lambda e: self.perf.toggle())
         
         # Mac-specific bindings
         if platform.system() == "Darwin":
-            self.root.bind('<Command-s>', lambda e: self._save_file(e))
-            self.root.bind('<Command-n>', lambda e: self._new_file())
-            self.root.bind('<Command-o>', lambda e: self._open_file())
-            self.root.bind('<Command-a>', lambda e: self._select_all(e))
-            self.root.bind('<Command-z>', lambda e: self.text.edit_undo())
-            self.root.bind('<Command-y>', lambda e: self.text.edit_redo())
-            self.root.bind('<Command-x>', lambda e: self._cut_text())
-            self.root.bind('<Command-c>', lambda e: self._copy_text())
+            bind(self.root, '<Command-s>', lambda e: self._save_file(e))
+            bind(self.root, '<Command-n>', lambda e: self._new_file())
+            bind(self.root, '<Command-o>', lambda e: self._open_file())
+            bind(self.root, '<Command-w>', lambda e: self._close_tab())
+            bind(self.root, '<Command-L>', lambda e: self._toggle_follow())
+            bind(self.root, '<Command-a>', lambda e: self._select_all(e))
+            bind(self.root, '<Command-z>', lambda e: self._undo())
+            bind(self.root, '<Command-y>', lambda e: self._redo())
+            bind(self.root, '<Command-x>', lambda e: self._cut_text())
+            bind(self.root, '<Command-c>', lambda e: self._copy_text())
+            bind(self.root, '<Command-j>', lambda e: self._goto_offset_dialog())
+            bind(self.root, '<Command-g>', lambda e: self._goto_line_dialog())
+            bind(self.root, '<Command-f>', lambda e: self._show_find_bar())
+            bind(self.root, '<Command-P>', lambda e: self.perf.toggle())
 
     def _new_file(self):
-        self.text.delete(1.0, tk.END)
-        self.current_file_path = None  # Reset file path
-        self.status.config(text="New file")
-        self.root.title("zen.script - Untitled")
+        self._new_tab()
+        self.set_status("New file")
 
-    def _open_file(self):
-        file_path = filedialog.askopenfilename(
-            filetypes=[("Text Files", "*.txt"), ("All Files", "*.*")]
-        )
+    def _open_file(self, file_path=None):
+        if file_path is None:
+            file_path = filedialog.askopenfilename(
+                filetypes=[("Text Files", "*.txt"), ("All Files", "*.*")]
+            )
         if file_path:
+            tab = self._find_tab(file_path)
+            if tab is not None:
+                self._switch_tab(tab)  # Already open
+                return
             try:
-                with open(file_path, "r", encoding="utf-8") as file:
-                    self.text.delete(1.0, tk.END)
-                    self.text.insert(tk.END, file.read())
-                self.current_file_path = file_path  # FIX: Store file path for save state
-                self.status.config(text=f"Opened: {file_path}")
-                self.root.title(f"zen.script - {os.path.basename(file_path)}")
+                if os.path.getsize(file_path) >= LARGE_FILE_THRESHOLD and not self._is_compressed(file_path):
+                    self._tab_for_open()
+                    self._open_large_file(file_path)
+                    return
+                reader = ChunkedFileReader(file_path)
             except Exception as e:
                 messagebox.showerror("Open Error", f"Could not open file:\n{e}")
+                return
+            self._tab_for_open()
+            self._start_loading(reader)
+
+    @staticmethod
+    def _is_compressed(file_path):
+        with open(file_path, "rb") as file:
+            return detect_compression(file.read(COMPRESSION_HEAD_BYTES)) is not None
+
+    def _start_loading(self, reader):
+        """Clear the buffer and start streaming the reader's chunks into it"""
+        self._cancel_loading(quiet=True)
+        self._close_large_file()
+        # Loading is not an edit: keep it out of the undo history and read-only
+        if not reader.restoring:
+            self.undo.clear()  # A restored tab keeps its history
+            self._drop_follower(self.tab)
+            self._unwatch_file(self.tab)
+            self.current_file_path = None
+            self._reset_long_lines()
+        self.undo.recording = False
+        self.text.configure(state="normal")
+        self.text.delete(1.0, tk.END)
+        self.text.configure(state="disabled")
+        self.line_index = LineIndex()
+        self.document = PieceTable()
+        self.position_text = ""
+        self.loader = reader.start()
+        self._update_title()
+        if not reader.restoring and reader.cancel_label:  # Cancelling a restore would lose the document
+            self.cancel_btn.configure(text=reader.cancel_label)
+            self.cancel_btn.pack(side="left", padx=(0, 5), pady=(0, 2), before=self.status)
+        self._load_job = self.root.after(1, self._drain_loader)
+
+    def _drain_loader(self):
+        """Insert queued chunks in one batch, bounded by a per-tick time budget"""
+        reader = self.loader
+        self._load_job = None
+        if reader is None:
+            return
+        deadline = time.perf_counter() + STREAM_BATCH_BUDGET_MS / 1000
+        batch = []
+        finished = error = None
+        received = False
+        first_line = len(self.line_index)  # The last line so far may still grow
+        while time.perf_counter() < deadline:
+            try:
+                kind, payload = reader.chunks.get_nowait()
+            except queue.Empty:
+                break
+            received = True
+            if kind == "data":
+                data, starts, size = payload
+                self.line_index.extend(starts, size)
+                self.document.append(data)
+                batch.append(data)
+                if len(batch) >= 4:  # Flush so the time budget accounts for Tk's insert cost
+                    self._insert_loaded("".join(batch))
+                    batch = []
+            elif kind == "done":
+                finished = True
+                break
+            else:
+                error = payload
+                break
+        if batch:
+            self._insert_loaded("".join(batch))
+        if received:
+            self._fold_long_lines(first_line)  # Before Tk gets to lay the line out
+        if error is not None:
+            self._stop_loading()
+            retry = reader.fallback_encoding() if isinstance(error, UnicodeDecodeError) else None
+            if retry is not None and not reader.cancelled:
+                # The sniffed encoding failed further into the file: start over
+                self._start_loading(ChunkedFileReader(reader.file_path, encoding=retry))
+                return
+            self._after_load = None
+            self.root.title("zen.script - Untitled")
+            self.set_status("Open failed")
+            messagebox.showerror("Open Error", f"Could not read {reader.source or 'file'}:\n{error}")
+        elif finished and reader.restoring:
+            self._stop_loading()
+            self._finish_restore()
+            callback, self._after_load = self._after_load, None
+            if callback is not None:
+                callback()
+        elif finished:
+            self._stop_loading()
+            self.current_file_path = reader.file_path  # FIX: Store file path for save state
+            self._set_format(reader.encoding, reader.bom, reader.newline, reader.compression)
+            self.stats.reset(reader.words, reader.encoded, reader.encoding)
+            self._watch_file(self.tab, reader.disk_state)
+            if reader.formatted:
+                if self.journal:  # Recovered, it still saves to the file
+                    self.journal.start(reader.file_path, text=self.document.snapshot())
+                self.text.mark_set(tk.INSERT, "1.0")
+                self.text.see(tk.INSERT)
+                self._keep_stream(reader, f"Formatted JSON: {len(self.line_index):,} lines")
+            elif reader.source is not None:
+                if self.journal:
+                    self.journal.start(text=self.document.snapshot())
+                self._keep_stream(reader, f"Read {reader.bytes_read / 1048576:.1f} MB from {reader.source}")
+            else:
+                if self.journal:
+                    self.journal.start(reader.file_path)
+                self.set_status(f"Opened: {reader.file_path}")
+            self._update_title()
+            self._document_replaced()
+            self.highlighter.set_language(self.highlighter.language_for(reader.file_path))
+            if self.tab.long_lines and not reader.formatted:  # A single value can still be that long
+                self.root.after_idle(self._offer_json_format, self.tab)
+            callback, self._after_load = self._after_load, None
+            if callback is not None:
+                callback()
+        else:
+            if reader.total_bytes:
+                percent = min(100, reader.bytes_read * 100 // reader.total_bytes)
+                verb = "Restoring" if reader.restoring else "Formatting" if reader.formatted else "Opening"
+                self.set_status(f"{verb} {self.tab.title}... "
+                                        f"{percent}% ({reader.bytes_read / 1048576:.1f} of "
+                                        f"{reader.total_bytes / 1048576:.1f} MB)")
+            elif reader.source is not None:
+                self.set_status(f"Reading {reader.source}, still open... "
+                                f"{reader.bytes_read / 1048576:.1f} MB so far")
+            # Back off while nothing arrives, so a stalled pipe doesn't keep the UI busy
+            reader.poll_ms = STREAM_POLL_MS if received else min(reader.poll_ms * 2, STREAM_IDLE_POLL_MS)
+            self._load_job = self.root.after(reader.poll_ms, self._drain_loader)
+
+    def _insert_loaded(self, data):
+        self.text.configure(state="normal")
+        self.text.insert(tk.END, data)
+        self.text.configure(state="disabled")
+
+    def _stop_loading(self):
+        """Tear down the active load and hand the buffer back to the user"""
+        if self._load_job is not None:
+            self.root.after_cancel(self._load_job)
+            self._load_job = None
+        reader, self.loader = self.loader, None
+        self.cancel_btn.pack_forget()
+        self.text.configure(state="normal")
+        self.undo.recording = True
+        if reader is None or not reader.restoring:
+            self.undo.clear()
+        self.text.edit_modified(False)
+
+    def _cancel_loading(self, quiet=False):
+        reader = self.loader
+        if reader is None or reader.restoring or (reader.cancel_label is None and not quiet):
+            return
+        reader.cancel()
+        self._stop_loading()
+        self._after_load = None
+        if self.journal:
+            self.journal.start(text=self.document.snapshot())
+        self.highlighter.set_language(self.highlighter.language_for(reader.file_path))
+        self._set_format(reader.encoding or "utf-8", reader.bom, reader.newline)
+        self.stats.recount(self.document, self.encoding)  # Only part of what was read got in
+        if reader.source is not None:
+            self._keep_stream(reader, f"Stopped reading {reader.source}: kept what had arrived")
+            self._update_title()
+        elif not quiet:
+            # Partial content stays visible but is detached from the file so
+            # a later save can't truncate it
+            self.root.title("zen.script - Untitled (partial)")
+            self.set_status(f"Cancelled loading: {reader.file_path}")
+
+    def _fold_long_lines(self, first=1):
+        """Switch the tab to long-line mode if a line from first on is over
+        LONG_LINE_CHARS, and fold those lines; the text itself is untouched"""
+        lines = self.line_index.long_lines(LONG_LINE_CHARS, first)
+        if not lines:
+            return False
+        tab = self.tab
+        if not tab.long_lines:
+            tab.long_lines = True
+            self.text.configure(wrap="none")  # Wrapping re-lays out the whole line on every change
+        if tab.fold_long_lines:
+            self.text.tag_add(LONG_LINE_TAG, *itertools.chain.from_iterable(
+                (f"{line}.{LONG_LINE_SHOWN}", f"{line}.end") for line in lines))
+        return True
+
+    def _reset_long_lines(self):
+        """Leave long-line mode: a new document starts with the user's wrap setting"""
+        tab = self.tab
+        tab.long_lines, tab.fold_long_lines = False, True
+        self.text.tag_remove(LONG_LINE_TAG, "1.0", tk.END)
+        self.text.configure(wrap=self.wrap_mode)
+
+    def _toggle_long_lines(self):
+        tab = self.tab
+        if self.large_view is not None:
+            self.set_status("Large files always show long lines as segments")
+            return
+        if not tab.long_lines:
+            self.set_status(f"No lines over {LONG_LINE_CHARS:,} characters to fold")
+            return
+        tab.fold_long_lines = not tab.fold_long_lines
+        if tab.fold_long_lines:
+            self._fold_long_lines()
+            self.set_status(f"Long lines folded after {LONG_LINE_SHOWN:,} characters")
+        else:
+            self.text.tag_remove(LONG_LINE_TAG, "1.0", tk.END)
+            self.set_status("Long lines unfolded: editing them may be slow")
+
+    def _offer_json_format(self, tab):
+        if tab is not self.tab or not tab.long_lines or self.loader is not None:
+            return
+        self.set_status(f"Lines over {LONG_LINE_CHARS:,} characters are folded and shown unwrapped "
+                        "(Options > Fold Long Lines)")
+        looks_json = (self.highlighter.language_for(self.current_file_path) == "json"
+                      or self.document.slice(0, 64).lstrip()[:1] in ("{", "["))
+        if looks_json and messagebox.askyesno(
+                "Long Lines", f"{tab.title} has lines over {LONG_LINE_CHARS:,} characters.\n\n"
+                "Pretty-print it as JSON? It is formatted in the background; "
+                "the file is left as it is until you save."):
+            self._format_json()
+
+    def _format_json(self):
+        """Pretty-print the document in a worker process, then stream the result in
+        like a file being opened; the undo history starts over from there"""
+        if self.loader is not None or self.large_view is not None or self.tab.follower is not None:
+            self.set_status("Format JSON needs an editable document that has finished loading")
+            return
+        if self._format_job is not None:
+            self.set_status("Already formatting JSON...")
+            return
+        future = self.process_pool().submit(format_json_worker, self.document.snapshot())
+        self._format_job = (self.tab, self.edit_count, future)
+        self.set_status("Formatting JSON...")
+        self.root.after(JSON_FORMAT_POLL_MS, self._poll_format_json)
+
+    def _poll_format_json(self):
+        tab, edit_count, future = self._format_job
+        if not future.done():
+            self.root.after(JSON_FORMAT_POLL_MS, self._poll_format_json)
+            return
+        self._format_job = None
+        try:
+            text = future.result()
+        except Exception as e:
+            self.set_status("Format JSON failed")
+            messagebox.showerror("Format JSON", f"Could not format the document as JSON:\n{e}")
+            return
+        if tab is not self.tab or edit_count != self.edit_count or self.loader is not None:
+            self.set_status("Document changed while formatting; nothing was replaced")
+            return
+        self._start_loading(FormattedReader(text, tab))
+
+    def _keep_stream(self, reader, message):
+        """A stream has been read into an Untitled buffer: it exists nowhere else, so it is unsaved"""
+        self.text.edit_modified(True)
+        self.set_status(message)
+
+    def open_stdin(self, stream):
+        """Stream stdin (a binary stream) into a new tab as it arrives"""
+        self._tab_for_open()
+        self._start_loading(StdinReader(stream))
+
+    def _open_large_file(self, file_path):
+        """Map a file too big for the Text widget and show it read-only"""
+        self._cancel_loading(quiet=True)
+        self._close_large_file()
+        mapped = MappedFile(file_path)
+        self._drop_follower(self.tab)
+        self._unwatch_file(self.tab)
+        self.current_file_path = None  # Read-only: never save over a mapped file
+        if self.journal:
+            self.journal.discard()
+        self.highlighter.set_language(None)
+        self.root.title(f"zen.script - {os.path.basename(file_path)} (read-only)")
+        self.large_scrollbar.pack(side="right", fill="y", before=self.text)
+        self.position_text = ""
+        self.large_view = LargeFileView(self, mapped)
+        self.text.update_idletasks()  # Realize the widget so the viewport has a height
+        self.large_view.attach(self.large_scrollbar)
+        if self.find_bar is not None and self.find_bar.visible:
+            self.find_bar.hide()
+        self._document_replaced()
+
+    def _close_large_file(self):
+        if self.large_view is None:
+            return
+        self.large_view.detach()
+        self.large_view = None
+        self.line_index = LineIndex()
+        self.document = PieceTable()
+        self.stats.reset()
+        self._document_replaced()
+        self.highlighter.reset()
+        self.large_scrollbar.pack_forget()
+        self.text.configure(wrap=self.wrap_mode)
+        self.undo.clear()
+
+    def _goto_line_dialog(self):
+        if self.loader is not None:
+            self.set_status("Go To Line is available once the file has finished loading")
+            return
+        view = self.large_view
+        index = view.line_index if view is not None else self.line_index
+
+        def jump(value):
+            line = int(value)
+            if view is not None and not view.indexed:
+                raise ValueError(f"Still indexing lines ({view.index_progress()}%), try again shortly.")
+            if not 1 <= line <= len(index):
+                raise ValueError(f"Line must be between 1 and {len(index):,}.")
+            if view is not None:
+                view.goto_line(line)
+            else:
+                self.text.mark_set(tk.INSERT, f"{line}.0")
+                self.text.see(tk.INSERT)
+                self._schedule_position_update()
+
+        self._prompt_dialog("Go To Line", f"Line number (1 - {len(index):,}):", jump)
+
+    def _goto_offset_dialog(self):
+        if self.large_view is None:
+            self.set_status("Go To Offset is available for large files")
+            return
+
+        def jump(value):
+            offset = int(value, 0)
+            if not 0 <= offset <= self.large_view.mapped.size:
+                raise ValueError(f"Offset must be between 0 and {self.large_view.mapped.size:,}.")
+            self.large_view.goto_offset(offset)
+
+        self._prompt_dialog("Go To Offset", "Byte offset (decimal or 0x hex):", jump)
+
+    def _prompt_dialog(self, title_text, label_text, on_submit, initial=""):
+        """Small themed single-field dialog; on_submit raises ValueError to reject input"""
+        dialog = tk.Toplevel(self.root)
+        dialog.title(title_text)
+        dialog.geometry("320x140")
+        dialog.resizable(False, False)
+        center_window(dialog)
+        dialog.configure(bg=self.menu_colors["menu_bg"])
+        dialog.transient(self.root)
+
+        tk.Label(dialog, text=label_text,
+                bg=self.menu_colors["menu_bg"], fg=self.menu_colors["menu_text"]).pack(
+                    anchor="w", padx=20, pady=(15, 3))
+        entry = tk.Entry(dialog, bg=self.menu_colors["menu_surface"], fg=self.menu_colors["menu_text"],
+                         insertbackground=self.menu_colors["menu_text"],
+                         borderwidth=1, font=("Consolas", 10))
+        entry.pack(fill="x", padx=20)
+        entry.insert(0, initial)
+        entry.select_range(0, tk.END)
+        entry.focus_set()
+
+        def submit(event=None):
+            try:
+                on_submit(entry.get().strip())
+            except ValueError as e:
+                messagebox.showerror(title_text, str(e) or "Invalid value.", parent=dialog)
+                return
+            dialog.destroy()
+            self.text.focus_set()
+
+        entry.bind("<Return>", submit)
+        entry.bind("<Escape>", lambda e: dialog.destroy())
+        go_btn = tk.Button(dialog, text="Go", command=submit,
+                           bg=self.menu_colors["menu_blue"], fg="#ffffff",
+                           borderwidth=0, relief=tk.FLAT, font=("Arial", 10, "bold"),
+                           padx=20, pady=4)
+        go_btn.pack(pady=12)
 
     def _save_file(self, event=None):
-        content = self.text.get(1.0, tk.END)
+        if self.large_view is not None:
+            self.set_status("Large files open read-only and cannot be saved")
+            return "break"
+        if self.follower is not None:
+            # Old lines may have been dropped: saving would cut them from the file
+            self.set_status("Stop following (Ctrl+Shift+L) before saving")
+            return "break"
+        if self.loader is not None:
+            self.set_status("Still loading, save is unavailable until the file is open")
+            return "break"
+        # An immutable snapshot of the document model: no copy of the text is
+        # made here, the writer thread streams the pieces straight to disk
+        content = self.document.snapshot()
         
         # FIX: If file was opened from disk, save to same location
         if self.current_file_path:
@@ -198,16 +5317,100 @@ class ZenScriptEditor:
             )
         
         if file_path:
+            # The snapshot is written on the writer thread; editing can go on
+            # Rebased once the write lands, if the tab still has this journal
+            token = (self.journal, self.journal.mark()) if self.journal else None
+            self.writer.submit(file_path, content, self.encoding, token=token,
+                               newline=self.newline, bom=self.has_bom, compression=self.compression)
+            if file_path != self.current_file_path:
+                self._unwatch_file(self.tab)  # Watched again under the new name once saved
+                self.highlighter.set_language(self.highlighter.language_for(file_path))
+            self.current_file_path = file_path  # Update current file path
+            self.text.edit_modified(False)  # Set again below if the save fails
+            self._render_tabs()
+            self.set_status(f"Saving: {file_path}...")
+            self.root.title(f"zen.script - {os.path.basename(file_path)}")
+            if self._save_poll_job is None:
+                self._save_poll_job = self.root.after(50, self._poll_saves)
+        return "break"
+
+    def _poll_saves(self):
+        """Report finished background saves; keeps polling while any are in flight"""
+        self._save_poll_job = None
+        while True:
             try:
-                with open(file_path, "w", encoding="utf-8") as file:
-                    file.write(content)
-                self.current_file_path = file_path  # Update current file path
-                self.status.config(text=f"Saved: {file_path}")
-                self.root.title(f"zen.script - {os.path.basename(file_path)}")
-            except Exception as e:
-                messagebox.showerror("Save Error", f"Could not save file:\n{e}")
+                file_path, error, token = self.writer.results.get_nowait()
+            except queue.Empty:
+                break
+            if error is None:
+                tab = self._find_tab(file_path)
+                if token is not None and tab is not None and tab.journal is token[0]:
+                    token[0].rebase(token[1], file_path)
+                if tab is not None and tab.current_file_path == file_path:
+                    self._watch_file(tab, file_state(file_path))  # Our own write isn't a change
+                if not self.writer.busy:
+                    self.set_status(f"Saved: {file_path}")
+            else:
+                tab = self._find_tab(file_path)
+                if tab is not None and tab.text is not None:
+                    tab.text.edit_modified(True)
+                elif tab is not None:
+                    tab.saved_modified = True
+                self.set_status(f"Save failed: {file_path}")
+                messagebox.showerror("Save Error", f"Could not save file:\n{error}")
+        if self.writer.busy or not self.writer.results.empty():
+            self._save_poll_job = self.root.after(50, self._poll_saves)
+        else:
+            self._check_disk()  # Changes noticed while saving
+
+    def _quit_app(self):
+        # Let an in-flight save land before the process (and its daemon writer) exits
+        if self.writer.busy:
+            self.set_status("Finishing save...")
+            self.root.update_idletasks()
+            self.writer.flush(timeout=30)
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+        self.settings.flush()
+        for tab in self.tabs:
+            if tab.journal:
+                # A deliberate exit is not a crash: nothing to recover next time
+                tab.journal.discard()
+                tab.journal.close()
+        self.root.quit()
+
+    def _undo(self):
+        self._replay_history(self.undo.undo, "Undo")
+        return "break"
+
+    def _redo(self):
+        self._replay_history(self.undo.redo, "Redo")
         return "break"
 
+    def _replay_history(self, replay, name):
+        if self.loader is not None or self.large_view is not None:
+            return
+        if replay():
+            self.set_status(f"{name}: {self.undo.footprint()}")
+        else:
+            self.set_status(f"Nothing to {name.lower()}")
+
+    def _export_perf_trace(self):
+        if not self.perf.events:
+            self.set_status("Nothing recorded yet: turn on Options > Performance HUD first")
+            return
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".json", initialfile="zen_script_trace.json",
+            filetypes=[("Chrome Trace", "*.json"), ("All Files", "*.*")]
+        )
+        if file_path:
+            try:
+                self.perf.export_trace(file_path)
+            except Exception as e:
+                messagebox.showerror("Export Error", f"Could not export trace:\n{e}")
+                return
+            self.set_status(f"Trace exported: {file_path} ({len(self.perf.events):,} events)")
+
     def _cut_text(self):
         # FIX: Use tkinter's native clipboard operations to prevent duplication
         try:
@@ -304,6 +5507,7 @@ class ZenScriptEditor:
         save_btn.pack(pady=(0, 15))
 
     def _font_options_dialog(self):
+        self.configure_ttk_styles()  # First use of ttk: style the combo boxes
         dialog = tk.Toplevel(self.root)
         dialog.title("Font & Text Options")
         dialog.geometry("450x380")
@@ -329,15 +5533,42 @@ class ZenScriptEditor:
                 bg=self.menu_colors["menu_bg"], fg=self.menu_colors["menu_text"],
                 font=("Arial", 10, "bold")).pack(anchor="w", pady=(0, 3))
         
-        # Get available fonts (cached for speed)
-        if self.available_fonts is None:
-            self.available_fonts = sorted(list(font.families()))
-        
-        # Create searchable combobox for fonts with themed style
+        # Create searchable combobox for fonts with themed style; the families
+        # come from the font catalog, which may still be scanning
         font_var = tk.StringVar(value=self.custom_font.actual("family"))
-        font_combo = ttk.Combobox(font_frame, textvariable=font_var, values=self.available_fonts, 
+        font_combo = ttk.Combobox(font_frame, textvariable=font_var, values=(), 
                                  state="normal", font=("Consolas", 10), style='Themed.TCombobox')
         font_combo.pack(fill="x", pady=(0, 5))
+        font_info = tk.Label(font_frame, text="Scanning installed fonts...",
+                             bg=self.menu_colors["menu_bg"], fg=self.menu_colors["menu_text"],
+                             font=("Arial", 9))
+        font_info.pack(anchor="w")
+        font_list = {"all": [], "shown": [], "query": None}
+        
+        def filter_fonts(event):
+            if event.keysym not in ("BackSpace", "Delete") and not (event.char and event.char.isprintable()):
+                return  # Arrows, Return etc. don't change what was typed
+            query = font_var.get().strip().casefold()
+            previous = font_list["query"]
+            if previous is None or query == previous:
+                return
+            # Typing more narrows the current matches instead of rescanning every family
+            pool = font_list["shown"] if query.startswith(previous) else font_list["all"]
+            font_list["shown"] = [family for family in pool if query in family.casefold()]
+            font_list["query"] = query
+            font_combo.configure(values=font_list["shown"])
+        
+        def fill_fonts():
+            if not font_combo.winfo_exists():
+                return  # Dialog closed before the scan finished
+            font_list["all"] = font_list["shown"] = self.fonts.ordered()
+            font_list["query"] = ""  # The current family is shown, but nothing typed yet
+            font_combo.configure(values=font_list["all"])
+            font_info.configure(text=f"{len(font_list['all'])} fonts, "
+                                     f"{self.fonts.monospace_count} monospace (listed first)")
+        
+        font_combo.bind("<KeyRelease>", filter_fonts)
+        self.fonts.when_ready(fill_fonts)
         
         # Font size section
         size_frame = tk.Frame(main_frame, bg=self.menu_colors["menu_bg"])
@@ -359,7 +5590,7 @@ class ZenScriptEditor:
         tk.Label(wrap_frame, text="Text Wrap:", 
                 bg=self.menu_colors["menu_bg"], fg=self.menu_colors["menu_text"],
                 font=("Arial", 10, "bold")).pack(anchor="w", pady=(0, 3))
-        wrap_var = tk.StringVar(value=self.text.cget("wrap"))
+        wrap_var = tk.StringVar(value=self.wrap_mode)
         wrap_combo = ttk.Combobox(wrap_frame, textvariable=wrap_var, 
                                  values=["word", "char", "none"], state="readonly",
                                  font=("Consolas", 10), style='Themed.TCombobox')
@@ -375,13 +5606,15 @@ class ZenScriptEditor:
                     messagebox.showerror("Invalid Size", "Font size must be between 6 and 72.")
                     return
                     
-                self.custom_font.config(family=new_family, size=new_size)
-                self.text.configure(font=self.custom_font)
+                self.custom_font.config(family=new_family, size=new_size)  # Shared by every tab
                 self.status.configure(font=(new_family, 10))
                 
                 wrap_value = wrap_var.get()
                 if wrap_value in ["word", "char", "none"]:
-                    self.text.config(wrap=wrap_value)
+                    self.wrap_mode = wrap_value
+                    for tab in self.tabs:
+                        if tab.text is not None and tab.large_view is None and not tab.long_lines:
+                            tab.text.config(wrap=wrap_value)
                 
                 self.save_settings()  # Save settings after applying
                 dialog.destroy()
@@ -398,33 +5631,29 @@ class ZenScriptEditor:
         apply_btn.pack(pady=10)
 
     def save_settings(self):
-        """Save current theme and font settings to file"""
+        """Save current theme and font settings (written shortly after, see SettingsStore)"""
         try:
-            settings = {
-                "theme": {
+            self.settings.update(
+                theme={
                     "base": self.colors["base"],
                     "text": self.colors["text"]
                 },
-                "font": {
+                font={
                     "family": self.custom_font.actual("family"),
                     "size": self.custom_font.actual("size")
                 },
-                "text_wrap": self.text.cget("wrap")
-            }
-            
-            with open(self.settings_file, 'w') as f:
-                json.dump(settings, f, indent=2)
+                text_wrap=self.wrap_mode,
+                undo_memory_mb=self.undo_memory_mb
+            )
         except Exception as e:
             # Silently fail if we can't save settings
             pass
 
     def load_settings(self):
-        """Load saved theme and font settings from file"""
+        """Load saved theme and font settings"""
         try:
-            if os.path.exists(self.settings_file):
-                with open(self.settings_file, 'r') as f:
-                    settings = json.load(f)
-                
+            settings = self.settings.data  # Parsed once, when the store was created
+            if settings:
                 # Load theme settings
                 if "theme" in settings:
                     theme = settings["theme"]
@@ -440,21 +5669,20 @@ class ZenScriptEditor:
                     size = font_settings.get("size", 12)
                     try:
                         self.custom_font.config(family=family, size=size)
-                        self.text.configure(font=self.custom_font)
                         self.status.configure(font=(family, 10))
                     except Exception:
                         pass  # Keep default font if loading fails
                 
+                # Load the undo memory budget
+                budget = settings.get("undo_memory_mb")
+                if isinstance(budget, int) and budget > 0:
+                    self.undo_memory_mb = budget
+
                 # Load text wrap setting
                 if "text_wrap" in settings:
                     wrap_value = settings["text_wrap"]
                     if wrap_value in ["word", "char", "none"]:
-                        self.text.config(wrap=wrap_value)
-                
-                # Apply the loaded theme
-                self.apply_current_theme()
-                # Reconfigure ttk styles after loading settings
-                self.configure_ttk_styles()
+                        self.wrap_mode = wrap_value
                 
         except Exception as e:
             # Silently fail if we can't load settings
@@ -479,10 +5707,14 @@ class ZenScriptEditor:
         else:
             font_family = "DejaVu Sans Mono"
         self.custom_font = font.Font(family=font_family, size=font_size)
-        self.text.configure(font=self.custom_font)
         self.status.configure(font=(font_family, 10))
 
     def apply_catppuccin_mocha_theme(self):
+        self.reset_colors()
+        self.apply_current_theme()
+        self.save_settings()  # Save when switching to default theme
+
+    def reset_colors(self):
         # Always reset to default Catppuccin Mocha colors
         self.colors = {
             "base": "#1e1e2e",
@@ -491,7 +5723,14 @@ class ZenScriptEditor:
             "surface0": "#313244",
             "blue": "#89b4fa",
             "subtext0": "#a6adc8",
-            "overlay0": "#6c7086"
+            "overlay0": "#6c7086",
+            # Syntax highlighting accents (see SYNTAX_COLORS)
+            "mauve": "#cba6f7",
+            "sky": "#89dceb",
+            "yellow": "#f9e2af",
+            "green": "#a6e3a1",
+            "peach": "#fab387",
+            "red": "#f38ba8"
         }
         # Separate menu colors that won't change with custom themes
         self.menu_colors = {
@@ -500,39 +5739,9 @@ class ZenScriptEditor:
             "menu_surface": "#313244",
             "menu_blue": "#89b4fa"
         }
-        self.apply_current_theme()
-        self.configure_ttk_styles()  # Reconfigure styles after theme change
-        self.save_settings()  # Save when switching to default theme
 
     def apply_current_theme(self):
-        self.root.configure(bg=self.colors["base"])
-        self.text.configure(
-            bg=self.colors["base"],
-            fg=self.colors["text"],
-            insertbackground=self.colors.get("blue", "#89b4fa"),
-            selectbackground=self.colors.get("surface0", "#313244"),
-            selectforeground=self.colors["text"],
-            inactiveselectbackground=self.colors.get("surface0", "#313244"),
-            highlightthickness=0,
-            relief=tk.FLAT
-        )
-        # Keep UI elements with original colors
-        self.status.configure(
-            bg=self.menu_colors.get("menu_bg", "#181825"),
-            fg=self.colors.get("subtext0", "#a6adc8")
-        )
-        self.bottom_frame.configure(bg=self.menu_colors.get("menu_bg", "#181825"))
-        
-        if hasattr(self, 'menu_frame'):
-            self.menu_frame.configure(bg=self.menu_colors.get("menu_bg", "#181825"))
-            for child in self.menu_frame.winfo_children():
-                if isinstance(child, tk.Menubutton):
-                    child.configure(
-                        bg=self.menu_colors.get("menu_bg", "#181825"),
-                        fg=self.menu_colors.get("menu_text", "#cdd6f4"),
-                        activebackground=self.menu_colors.get("menu_surface", "#313244"),
-                        activeforeground=self.menu_colors.get("menu_blue", "#89b4fa")
-                    )
+        self.theme.apply(dict(self.colors, **self.menu_colors))
 
 def center_window(window, width=None, height=None):
     """Centers a tkinter window. If width/height are provided, it sets the size."""
@@ -550,13 +5759,242 @@ def center_window(window, width=None, height=None):
     y = (screen_height // 2) - (height // 2)
     window.geometry(f'{width}x{height}+{x}+{y}')
 
+class StartupProfiler:
+    """Wall-clock time of each startup phase, reported by --profile-startup.
+
+    mark() is cheap enough to leave in the startup path unconditionally.
+    """
+
+    TIMEOUT_MS = 10000  # Report anyway if the window is never drawn
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.phases = []
+        self._last = time.perf_counter()
+        self._reported = False
+
+    def mark(self, phase):
+        """Record the time since the previous mark as phase"""
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    def report(self):
+        lines = ["Startup phases                      ms"]
+        for phase, seconds in self.phases:
+            lines.append(f"  {phase:<28}{seconds * 1000:8.1f}")
+        total = sum(seconds for _, seconds in self.phases)
+        lines.append(f"  {'total':<28}{total * 1000:8.1f}")
+        return "\n".join(lines)
+
+    def report_on_first_frame(self, widget, on_done):
+        """Print the report once widget has been drawn, then call on_done"""
+        def drawn(event=None):
+            if self._reported:
+                return
+            self._reported = True
+            self.mark("first frame")
+            print(self.report(), flush=True)
+            on_done()
+
+        widget.bind("<Expose>", drawn, add="+")
+        widget.after(self.TIMEOUT_MS, drawn)
+
+
+def import_time_table(importtime_log, limit=15):
+    """Summarize `python -X importtime` output: the slowest top-level imports"""
+    rows = []
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if name.startswith("  "):
+            continue  # Nested import, already counted in its parent's cumulative time
+        rows.append((int(cumulative), name.strip()))
+    rows.sort(reverse=True)
+    lines = ["Imports (cumulative)                ms"]
+    for cumulative, name in rows[:limit]:
+        lines.append(f"  {name:<28}{cumulative / 1000:8.1f}")
+    lines.append(f"  {f'total ({len(rows)} top-level)':<28}{sum(c for c, _ in rows) / 1000:8.1f}")
+    return "\n".join(lines)
+
+
+def profile_startup():
+    """Relaunch under -X importtime and print the phase and import reports"""
+    import subprocess
+    child = subprocess.run([sys.executable, "-X", "importtime", os.path.abspath(__file__),
+                            "--profile-startup"], capture_output=True, text=True)
+    print(child.stdout, end="")
+    other = [line for line in child.stderr.splitlines() if not line.startswith("import time:")]
+    if other:
+        print("\n".join(other), file=sys.stderr)
+    print()
+    print(import_time_table(child.stderr))
+    return child.returncode
+
+
+# Single instance: a later launch hands its files to the running editor over a
+# per-user Unix domain socket instead of paying for a second cold start.
+INSTANCE_CONNECT_TIMEOUT = 2.0  # Seconds to wait for the running editor to acknowledge
+
+
+def instance_socket_path():
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")  # Per-user, private, cleared at logout
+    base = os.path.join(runtime_dir, "zen.script") if runtime_dir else get_user_data_dir()
+    return os.path.join(base, "instance.sock")
+
+
+def single_instance_supported():
+    # Tk can only watch sockets for us where it can watch file descriptors
+    return hasattr(socket, "AF_UNIX") and platform.system() != "Windows"
+
+
+def send_to_instance(paths):
+    """Ask a running zen.script to open paths; returns False if none answered"""
+    if not single_instance_supported():
+        return False
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(INSTANCE_CONNECT_TIMEOUT)
+            client.connect(instance_socket_path())
+            client.sendall(json.dumps({"files": paths}).encode("utf-8") + b"\n")
+            return client.recv(16) == b"ok\n"
+    except OSError:
+        return False  # No socket, a stale one, or an editor too busy to answer
+
+
+class InstanceServer:
+    """Receives file lists from later launches (see send_to_instance).
+
+    The listening socket and its connections are watched by Tk's event
+    loop, so requests are handled as soon as they arrive, without polling.
+    """
+
+    MAX_REQUEST = 1024 * 1024
+
+    def __init__(self, editor, path):
+        self.editor = editor
+        self.path = path
+        self.tk = editor.root.tk
+        self.pending = {}  # Connection -> bytes received so far
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        import fcntl
+        # Launches racing for the socket take turns: each one checks for a
+        # live editor and binds while no other can remove or bind the path
+        with open(os.open(path + ".lock", os.O_WRONLY | os.O_CREAT, 0o600), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self._remove_stale(path)
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                self.sock.bind(path)
+                os.chmod(path, 0o600)
+                self.sock.listen(8)
+            except OSError:
+                self.sock.close()
+                raise
+        self.sock.setblocking(False)
+        self.tk.createfilehandler(self.sock, tk.READABLE, self._accept)
+
+    @staticmethod
+    def _remove_stale(path):
+        """Remove a socket left behind by a crashed editor; raise if an editor still serves it"""
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            probe.settimeout(INSTANCE_CONNECT_TIMEOUT)
+            try:
+                probe.connect(path)
+            except (FileNotFoundError, ConnectionRefusedError):
+                pass  # No socket, or nobody listening on it
+            else:
+                # Alive, just slow to answer the launch that found it
+                raise FileExistsError(f"Another editor is serving {path}")
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    @classmethod
+    def listen(cls, editor):
+        """Start serving, or return None if single-instance mode is unavailable"""
+        if not single_instance_supported():
+            return None
+        try:
+            return cls(editor, instance_socket_path())
+        except OSError:
+            return None  # Another editor won the race, or no writable runtime dir
+
+    def _accept(self, sock, mask):
+        try:
+            connection, _ = self.sock.accept()
+        except OSError:
+            return
+        connection.setblocking(False)
+        self.pending[connection] = b""
+        self.tk.createfilehandler(connection, tk.READABLE, self._read)
+
+    def _read(self, connection, mask):
+        try:
+            data = connection.recv(65536)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        received = self.pending[connection] + data
+        if data and b"\n" not in received and len(received) < self.MAX_REQUEST:
+            self.pending[connection] = received
+            return
+        self.tk.deletefilehandler(connection)
+        del self.pending[connection]
+        try:
+            files = [str(path) for path in json.loads(received.split(b"\n", 1)[0])["files"]]
+            connection.sendall(b"ok\n")  # Before opening: the sender can exit right away
+        except (ValueError, KeyError, TypeError, OSError):
+            return
+        finally:
+            connection.close()
+        self.editor.open_files(files)
+
+    def close(self):
+        for connection in list(self.pending):
+            self.tk.deletefilehandler(connection)
+            connection.close()
+        self.pending.clear()
+        self.tk.deletefilehandler(self.sock)
+        self.sock.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
 if __name__ == "__main__":
+    if getattr(sys, "frozen", False):
+        multiprocessing.freeze_support()  # Process-pool workers in the PyInstaller build
+    import argparse
+    parser = argparse.ArgumentParser(prog="zen_script", description="zen.script text editor")
+    parser.add_argument("files", nargs="*", help="files to open; - reads standard input")
+    parser.add_argument("--new-instance", action="store_true",
+                        help="start a separate editor instead of handing the files to a running one")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="print startup phase and import timings, then exit")
+    args = parser.parse_args()
+    profiling = args.profile_startup
+    if profiling and "importtime" not in sys._xoptions and not getattr(sys, "frozen", False):
+        sys.exit(profile_startup())
+    read_stdin = "-" in args.files
+    if read_stdin and sys.stdin is None:
+        parser.error("there is no standard input to read (windowed build)")
+    files = [os.path.abspath(path) for path in args.files if path != "-"]
+    # Standard input can't be handed to another process: read it in a separate editor
+    single_instance = not (args.new_instance or profiling or read_stdin)
+    if single_instance and send_to_instance(files):
+        sys.exit(0)  # The running editor has them
+    profiler = StartupProfiler(enabled=profiling)
     root = tk.Tk()
+    profiler.mark("Tk root")
     center_window(root, 800, 600)
     # Windows-specific theming fixes
     if platform.system() == "Windows":
         try:
-            import ctypes
             ctypes.windll.shcore.SetProcessDpiAwareness(1)
         except Exception:
             pass  # Ignore DPI errors
@@ -576,6 +6014,17 @@ if __name__ == "__main__":
     except Exception:
         # Silently fail if the icon can't be loaded.
         pass
+    profiler.mark("window, icon")
     
-    editor = ZenScriptEditor(root)
-    root.mainloop()
\ No newline at end of file
+    editor = ZenScriptEditor(root, profiler)
+    server = InstanceServer.listen(editor) if single_instance else None
+    if files:
+        root.after_idle(editor.open_files, files)
+    if read_stdin:
+        # After the window is up: the producer may be slow or never finish
+        root.after_idle(editor.open_stdin, sys.stdin.buffer)
+    if profiling:
+        profiler.report_on_first_frame(editor.text, editor.quit_app)
+    root.mainloop()
+    if server is not None:
+        server.close()
\ No newline at end of file